@@ -57,8 +57,11 @@ a = Analysis(
         'PIL.ImageTk',
         'cv2',
         'numpy',
+        'mss',
         'win32gui',
         'win32con',
+        'win32clipboard',
+        'win32process',
         'win32com',
         'win32com.client',
         'pythoncom',
@@ -8,18 +8,25 @@ Production API endpoints
 
 Requirements:
     pip install pywebview pyautogui requests SpeechRecognition pyttsx3 pyaudio psutil pytesseract Pillow pywin32
+    Optional: pip install mss (faster screen capture)
+    Optional: a local llama.cpp server (llama-server -m model.gguf --port 8080)
+              answers suggestions and recovery prompts; see MISTAI_LOCAL_LLM_URL
 """
 
 # ==========================================
 # CRITICAL: UTF-8 SETUP MUST BE FIRST
 # ==========================================
 import sys
+import time
+
+_MODULE_T0 = time.perf_counter()
 # ==========================================
 # NOW IMPORT EVERYTHING ELSE
 # ==========================================
 import os
 import warnings
 import logging
+import abc
 
 # Suppress warnings AFTER importing
 warnings.filterwarnings("ignore")
@@ -29,38 +36,266 @@ os.environ["PYTHONWARNINGS"] = "ignore"
 logging.basicConfig(level=logging.CRITICAL)
 logging.getLogger("pywebview").setLevel(logging.CRITICAL)
 
-# Now import the rest
-import webview
-import pyautogui
-import requests
-import speech_recognition as sr
-import pyttsx3
-import time
+# Now import the rest - stdlib only. Heavy third-party modules are loaded
+# on first use through LazyModule so the window can appear first.
 import threading
+import asyncio
+import functools
+import importlib
+from concurrent.futures import ThreadPoolExecutor
 import json
 from datetime import datetime
-import psutil
 from queue import Queue
-import tkinter as tk
-from tkinter import font as tkfont
 import difflib
+import re
+import hashlib
+from collections import deque
+
+
+class Tracer:
+    """Lightweight span recorder backed by a fixed-size ring buffer
+
+    Spans are (name, category, start, duration) plus thread and free-form
+    args. Recording is a deque append under a lock, so it is cheap enough
+    for the hot paths; the UI reads aggregates through Api.get_perf_stats()
+    and a full dump can be exported as Chrome trace JSON (chrome://tracing,
+    Perfetto).
+    """
+
+    def __init__(self, capacity=4096):
+        self.origin = _MODULE_T0
+        self.spans = deque(maxlen=capacity)
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+
+    def span(self, name, cat="app", **args):
+        return _TraceSpan(self, name, cat, args)
+
+    def add(self, name, cat, start, duration, args=None):
+        thread = threading.current_thread()
+        with self.lock:
+            self.spans.append((name, cat, start, duration, thread.ident, thread.name, args or {}))
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.spans)
+
+    def stats(self):
+        """Per-span-name count / avg / p50 / p95 / max in milliseconds"""
+        durations = {}
+        for name, cat, _, duration, _, _, _ in self.snapshot():
+            durations.setdefault((name, cat), []).append(duration * 1000)
+
+        stats = []
+        for (name, cat), values in durations.items():
+            values.sort()
+            count = len(values)
+            stats.append({
+                "name": name,
+                "cat": cat,
+                "count": count,
+                "avg_ms": round(sum(values) / count, 1),
+                "p50_ms": round(values[count // 2], 1),
+                "p95_ms": round(values[min(count - 1, int(count * 0.95))], 1),
+                "max_ms": round(values[-1], 1),
+                "total_ms": round(sum(values), 1),
+            })
+        stats.sort(key=lambda s: s["total_ms"], reverse=True)
+        return stats
+
+    def recent(self, limit=50):
+        return [
+            {
+                "name": name,
+                "cat": cat,
+                "start_ms": round((start - self.origin) * 1000, 1),
+                "ms": round(duration * 1000, 1),
+                "thread": thread_name,
+                "args": args,
+            }
+            for name, cat, start, duration, _, thread_name, args in self.snapshot()[-limit:]
+        ]
+
+    def chrome_trace(self):
+        events = []
+        threads = {}
+        for name, cat, start, duration, tid, thread_name, args in self.snapshot():
+            threads[tid] = thread_name
+            events.append({
+                "name": name,
+                "cat": cat,
+                "ph": "X",
+                "ts": round((start - self.origin) * 1e6, 1),
+                "dur": round(duration * 1e6, 1),
+                "pid": self.pid,
+                "tid": tid,
+                "args": {k: str(v) for k, v in args.items()},
+            })
+        for tid, thread_name in threads.items():
+            events.append({
+                "name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid,
+                "args": {"name": thread_name},
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export_chrome_trace(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f)
+        return path
+
+
+class _TraceSpan:
+    __slots__ = ("tracer", "name", "cat", "args", "start")
+
+    def __init__(self, tracer, name, cat, args):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def set(self, **args):
+        """Attach result details to the span while it is open"""
+        self.args.update(args)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer.add(self.name, self.cat, self.start, time.perf_counter() - self.start, self.args)
+        return False
+
+
+TRACER = Tracer()
+
+
+class StartupProfile:
+    """Records how long each startup phase takes"""
+
+    def __init__(self):
+        self.origin = _MODULE_T0
+        self.phases = []  # (name, start offset, duration, thread name)
+        self.lock = threading.Lock()
+
+    def phase(self, name):
+        return _StartupPhase(self, name)
+
+    def record(self, name, start, duration):
+        with self.lock:
+            self.phases.append((name, start - self.origin, duration, threading.current_thread().name))
+        TRACER.add(name, "startup", start, duration)
+
+    def summary(self):
+        with self.lock:
+            return [
+                {"phase": name, "start_ms": round(start * 1000, 1), "ms": round(duration * 1000, 1), "thread": thread}
+                for name, start, duration, thread in self.phases
+            ]
+
+    def report(self):
+        log_startup.info("Startup profile:")
+        for entry in self.summary():
+            log_startup.info("%-28s +%8.1f ms  %8.1f ms  (%s)", entry['phase'], entry['start_ms'], entry['ms'], entry['thread'])
+
+
+class _StartupPhase:
+    def __init__(self, profile, name):
+        self.profile = profile
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
 
-# Optional OCR imports
-try:
-    import cv2
-    import numpy as np
-    import pytesseract
-    from PIL import Image
-    OCR_AVAILABLE = True
-except:
-    OCR_AVAILABLE = False
+    def __exit__(self, *exc):
+        self.profile.record(self.name, self.start, time.perf_counter() - self.start)
+        return False
+
+
+STARTUP = StartupProfile()
+
+
+class LazyModule:
+    """Module proxy that imports the real module on first attribute access"""
+
+    def __init__(self, name, on_load=None):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_on_load", on_load)
+        object.__setattr__(self, "_module", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def _load(self):
+        module = object.__getattribute__(self, "_module")
+        if module is not None:
+            return module
+        with object.__getattribute__(self, "_lock"):
+            module = object.__getattribute__(self, "_module")
+            if module is None:
+                name = object.__getattribute__(self, "_name")
+                with STARTUP.phase(f"import {name}"):
+                    module = importlib.import_module(name)
+                on_load = object.__getattribute__(self, "_on_load")
+                if on_load:
+                    on_load(module)
+                object.__setattr__(self, "_module", module)
+        return module
+
+    def available(self):
+        """True if the module can be imported"""
+        try:
+            self._load()
+            return True
+        except Exception:
+            return False
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        return f"<LazyModule {object.__getattribute__(self, '_name')}>"
+
+
+def _configure_pyautogui(module):
+    module.FAILSAFE = True
+    module.PAUSE = 0.2
+
+
+webview = LazyModule("webview")
+pyautogui = LazyModule("pyautogui", on_load=_configure_pyautogui)
+requests = LazyModule("requests")
+sr = LazyModule("speech_recognition")
+pyttsx3 = LazyModule("pyttsx3")
+pyaudio = LazyModule("pyaudio")
+psutil = LazyModule("psutil")
+tk = LazyModule("tkinter")
+tkfont = LazyModule("tkinter.font")
+
+# Optional OCR stack - see ocr_available()
+cv2 = LazyModule("cv2")
+np = LazyModule("numpy")
+pytesseract = LazyModule("pytesseract")
+Image = LazyModule("PIL.Image")
 
 VERSION = "1.5.1"
 
-def show_splash_screen():
-    """Show splash screen before launching assistant"""
+SPLASH_MAX_SECONDS = 20  # close even if a subsystem never reports ready
+
+
+def show_splash_screen(ready_event=None, progress_queue=None):
+    """Show splash screen while startup runs in the background
+
+    Closes as soon as ready_event is set (after at most the fade-in) instead
+    of holding for a fixed time. progress_queue receives
+    (done, total, label) tuples that drive the stage text and progress bar.
+    """
     try:
-        from tkinter import Tk, Label
+        from tkinter import Tk, Label, Canvas
         from PIL import Image, ImageTk
         
         root = Tk()
@@ -74,47 +309,74 @@ def show_splash_screen():
             image_width, image_height = img.size
             photo = ImageTk.PhotoImage(img)
         except Exception as e:
-            print(f"[Splash] Could not load splash.png: {e}")
+            log_ui.warning("Could not load splash.png: %s", e)
             root.destroy()
             return
         
-        # Center window
+        # Center window (image plus the progress strip)
+        strip_height = 34
         screen_width = root.winfo_screenwidth()
         screen_height = root.winfo_screenheight()
         x = (screen_width // 2) - (image_width // 2)
-        y = (screen_height // 2) - (image_height // 2)
-        root.geometry(f"{image_width}x{image_height}+{x}+{y}")
+        y = (screen_height // 2) - ((image_height + strip_height) // 2)
+        root.geometry(f"{image_width}x{image_height + strip_height}+{x}+{y}")
         
         # Display image
         label = Label(root, image=photo, bg="black")
         label.pack()
         label.image = photo  # Keep reference
+
+        # Progress stage text and bar
+        stage_label = Label(root, text="Starting...", fg="#a5b4fc", bg="black", font=("Segoe UI", 9))
+        stage_label.pack(fill="x")
+        bar = Canvas(root, height=4, bg="#1e1b4b", highlightthickness=0)
+        bar.pack(fill="x")
+        bar_fill = bar.create_rectangle(0, 0, 0, 4, fill="#667eea", width=0)
         
         # Fade in
         root.attributes("-alpha", 0)
+        started = time.time()
+
+        def close():
+            try:
+                root.destroy()
+            except:
+                pass
+
+        def poll_progress():
+            if progress_queue is not None:
+                while not progress_queue.empty():
+                    done, total, stage = progress_queue.get_nowait()
+                    stage_label.config(text=stage)
+                    bar.coords(bar_fill, 0, 0, int(image_width * done / max(total, 1)), 4)
+
+            ready = ready_event is None or ready_event.is_set()
+            if ready or time.time() - started > SPLASH_MAX_SECONDS:
+                root.attributes("-alpha", 1)
+                root.after(150, close)
+            else:
+                root.after(40, poll_progress)
         
         def fade_in(alpha=0):
+            if ready_event is not None and ready_event.is_set():
+                return  # poll_progress closes the window
             alpha += 0.05
             if alpha > 1:
                 alpha = 1
             root.attributes("-alpha", alpha)
             if alpha < 1:
                 root.after(50, fade_in, alpha)
-            else:
-                root.after(3000, root.destroy)  # Close after 3 seconds
         
         fade_in()
+        poll_progress()
         root.mainloop()
         
     except Exception as e:
-        print(f"[Splash] Error: {e}")
+        log_ui.error("Splash error: %s", e)
         # If splash fails, just continue
 
 def setup_bundled_tesseract():
     """Setup Tesseract - checks bundled version first, then system install"""
-    if not OCR_AVAILABLE:
-        return False
-    
     # Detect if running as PyInstaller bundle
     if getattr(sys, 'frozen', False):
         # Running as compiled .exe - use bundled Tesseract
@@ -122,7 +384,7 @@ def setup_bundled_tesseract():
         bundled_tesseract_exe = os.path.join(base_path, 'Tesseract-OCR', 'tesseract.exe')
         bundled_tessdata = os.path.join(base_path, 'Tesseract-OCR', 'tessdata')
         
-        print(f"Looking for bundled Tesseract at: {bundled_tesseract_exe}")
+        log_vision.debug("Looking for bundled Tesseract at: %s", bundled_tesseract_exe)
         
         if os.path.exists(bundled_tesseract_exe):
             # Set Tesseract executable path
@@ -131,25 +393,25 @@ def setup_bundled_tesseract():
             # Set tessdata path environment variable
             os.environ['TESSDATA_PREFIX'] = os.path.join(base_path, 'Tesseract-OCR')
             
-            print(f"Using bundled Tesseract")
-            print(f"EXE: {bundled_tesseract_exe}")
-            print(f"TESSDATA: {bundled_tessdata}")
+            log_vision.info("Using bundled Tesseract")
+            log_vision.debug("EXE: %s", bundled_tesseract_exe)
+            log_vision.debug("TESSDATA: %s", bundled_tessdata)
             
             # Verify tessdata exists
             if os.path.exists(bundled_tessdata):
                 eng_file = os.path.join(bundled_tessdata, 'eng.traineddata')
                 if os.path.exists(eng_file):
-                    print(f"English language data found")
+                    log_vision.debug("English language data found")
                 else:
-                    print(f"WARNING: eng.traineddata not found")
+                    log_vision.warning("eng.traineddata not found")
             
             return True
         else:
-            print(f"Bundled Tesseract not found at expected location")
-            print(f"Falling back to system installation...")
+            log_vision.info("Bundled Tesseract not found at expected location")
+            log_vision.debug("Falling back to system installation...")
     
     # Not bundled OR bundled version not found - check system installation
-    print("Checking for system Tesseract installation...")
+    log_vision.debug("Checking for system Tesseract installation...")
 
     possible_paths = [
         r"C:\Program Files\Tesseract-OCR\tesseract.exe",
@@ -161,22 +423,174 @@ def setup_bundled_tesseract():
     for path in possible_paths:
         if os.path.exists(path):
             pytesseract.pytesseract.tesseract_cmd = path
-            print(f"Using system Tesseract: {path}")
+            log_vision.info("Using system Tesseract: %s", path)
             return True
     
     return False
 
-# Initialize Tesseract
-if OCR_AVAILABLE:
-    tesseract_found = setup_bundled_tesseract()
-    if not tesseract_found:
-        OCR_AVAILABLE = False
+_ocr_state = {"available": None}
+_ocr_lock = threading.Lock()
+
+
+def ocr_available():
+    """Import the OCR stack and locate Tesseract on first use"""
+    if _ocr_state["available"] is None:
+        with _ocr_lock:
+            if _ocr_state["available"] is None:
+                with STARTUP.phase("ocr init"):
+                    _ocr_state["available"] = (
+                        all(m.available() for m in (cv2, np, pytesseract, Image))
+                        and setup_bundled_tesseract()
+                    )
+    return _ocr_state["available"]
 
 # Configuration - PRODUCTION URLS
-API_URL = "https://mist-ai.fly.dev/api/chat"
-STATUS_URL = "https://mist-ai.fly.dev/api/status"
+API_URL = os.environ.get("MISTAI_API_URL", "https://mist-ai.fly.dev/api/chat")
+STATUS_URL = os.environ.get("MISTAI_STATUS_URL", "https://mist-ai.fly.dev/api/status")
 MODEL = "mistral"
+# Optional local model: a llama.cpp (or other OpenAI-compatible) server
+LOCAL_LLM_URL = os.environ.get("MISTAI_LOCAL_LLM_URL", "http://127.0.0.1:8080")
+LOCAL_LLM_MODEL = os.environ.get("MISTAI_LOCAL_LLM_MODEL", "local")
+LOCAL_LLM_ENABLED = os.environ.get("MISTAI_LOCAL_LLM", "1") != "0"
 DEBUG_MODE = False  # Set to False for production
+DATA_DIR = os.path.join(os.path.expanduser("~"), "MistAI")
+HISTORY_TOKEN_BUDGET = 300  # estimated tokens of past turns per prompt
+SCREEN_SUMMARY_CHARS = 600  # layout summary sent with each prompt
+OCR_UPSCALE = 2  # full-frame OCR runs on a 2x upscale
+PREFETCH_WAIT = 5  # seconds a request waits for an in-flight screen prefetch
+
+# ==========================================
+# LOGGING
+# ==========================================
+# Every subsystem logs through a child of the "mistai" logger. Records are
+# handed to a queue and written by a listener thread, so the wake loop and
+# vision code never block on disk or console I/O. Verbosity is configured
+# without touching code:
+#   MISTAI_LOG_LEVEL=DEBUG                    global level (default INFO)
+#   MISTAI_LOG_LEVELS=vision=DEBUG,wake=WARNING
+#   MISTAI_LOG_CONSOLE=0|1                    console echo (default: on unless frozen)
+# or the same keys ("level", "levels", "console") in ~/MistAI/logging.json.
+LOG_DIR = os.path.join(DATA_DIR, "logs")
+LOG_FILE_MAX_BYTES = 2 * 1024 * 1024
+LOG_FILE_BACKUPS = 5
+
+log = logging.getLogger("mistai")
+log_startup = logging.getLogger("mistai.startup")
+log_wake = logging.getLogger("mistai.wake")
+log_voice = logging.getLogger("mistai.voice")
+log_vision = logging.getLogger("mistai.vision")
+log_action = logging.getLogger("mistai.action")
+log_llm = logging.getLogger("mistai.llm")
+log_ui = logging.getLogger("mistai.ui")
+log_commands = logging.getLogger("mistai.commands")
+log_memory = logging.getLogger("mistai.memory")
+
+_logging_state = {"listener": None}
+
+
+class JsonLogFormatter(logging.Formatter):
+    """One JSON object per line: easy to grep, tail and load into tools"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def _parse_log_level(value, default=logging.INFO):
+    if isinstance(value, int):
+        return value
+    level = logging.getLevelName(str(value).strip().upper())
+    return level if isinstance(level, int) else default
+
+
+def _load_logging_config():
+    config = {}
+    try:
+        with open(os.path.join(DATA_DIR, "logging.json"), "r", encoding="utf-8") as f:
+            config = json.load(f)
+    except:
+        pass
+    if os.environ.get("MISTAI_LOG_LEVEL"):
+        config["level"] = os.environ["MISTAI_LOG_LEVEL"]
+    levels = dict(config.get("levels") or {})
+    for item in os.environ.get("MISTAI_LOG_LEVELS", "").split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level
+    config["levels"] = levels
+    if os.environ.get("MISTAI_LOG_CONSOLE"):
+        config["console"] = os.environ["MISTAI_LOG_CONSOLE"] not in ("0", "false", "no")
+    return config
+
+
+def setup_logging():
+    """Attach the queue handler and start the background log writer (idempotent)"""
+    if _logging_state["listener"] is not None:
+        return
+    import atexit
+    import logging.handlers
+
+    config = _load_logging_config()
+    log.setLevel(_parse_log_level(config.get("level", "INFO")))
+    log.propagate = False
+    for name, level in config["levels"].items():
+        logging.getLogger(f"mistai.{name}").setLevel(_parse_log_level(level))
+
+    handlers = []
+    try:
+        os.makedirs(LOG_DIR, exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            os.path.join(LOG_DIR, "mistai.log"),
+            maxBytes=LOG_FILE_MAX_BYTES,
+            backupCount=LOG_FILE_BACKUPS,
+            encoding="utf-8",
+        )
+        file_handler.setFormatter(JsonLogFormatter())
+        handlers.append(file_handler)
+    except Exception:
+        pass
+    console = config.get("console", not getattr(sys, "frozen", False))
+    if console and sys.stderr is not None:
+        console_handler = logging.StreamHandler(sys.stderr)
+        console_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)-7s %(name)s: %(message)s", "%H:%M:%S"))
+        handlers.append(console_handler)
+
+    log_queue = Queue(-1)
+    log.addHandler(logging.handlers.QueueHandler(log_queue))
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _logging_state["listener"] = listener
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread"""
+    listener = _logging_state["listener"]
+    if listener is not None:
+        _logging_state["listener"] = None
+        listener.stop()
+
+
+_http_state = {"session": None}
+_http_lock = threading.Lock()
+
+
+def http_session():
+    """Shared requests session so backend calls reuse one warm connection"""
+    if _http_state["session"] is None:
+        with _http_lock:
+            if _http_state["session"] is None:
+                _http_state["session"] = requests.Session()
+    return _http_state["session"]
+
 
 # Wake words with phonetic alternatives
 WAKE_WORDS = ["mist", "hey mist", "mistai", "mist ai"]
@@ -208,7 +622,7 @@ def fuzzy_match_wake_word(text):
     for wake_word, alternatives in WAKE_WORD_ALTERNATIVES.items():
         for alt in alternatives:
             if alt in text_lower:
-                print(f"   Fuzzy match: '{alt}' -> '{wake_word}'")
+                log_wake.debug("Fuzzy match: '%s' -> '%s'", alt, wake_word)
                 # Extract command after the alternative word
                 command = text_lower.split(alt, 1)[-1].strip()
                 return wake_word, command
@@ -220,7 +634,7 @@ def fuzzy_match_wake_word(text):
         if len(word) >= 3 and len(word) <= 6:
             similarity = difflib.SequenceMatcher(None, word, "mist").ratio()
             if similarity >= 0.75:  # 75% similar
-                print(f"   Similarity match: '{word}' -> 'mist' ({similarity:.0%})")
+                log_wake.debug("Similarity match: '%s' -> 'mist' (%.0f%%)", word, similarity * 100)
                 word_index = words.index(word)
                 command = " ".join(words[word_index + 1 :])
                 return "mist", command
@@ -236,266 +650,3944 @@ def get_resource_path(relative_path):
         base_path = os.path.abspath(".")
     return os.path.join(base_path, relative_path)
 
-class SimpleCaptionWindow:
-    """Simple, reliable Tkinter caption overlay"""
 
-    def __init__(self):
-        self.root = None
-        self.label = None
-        self.is_ready = False
-        self.message_queue = Queue()
-        self.running = True
+# ==========================================
+# TEXT INJECTION
+# ==========================================
+# Backends in order of preference per target app. "sendinput" and "xdotool"
+# send the whole string as one batch, "clipboard" pastes it, "typewrite" is
+# the old per-character pyautogui path and is always tried last. Keys are
+# process names (without .exe); a window title only matches on whole words.
+_TYPE_ONLY = ["sendinput", "xdotool", "typewrite"]
+TEXT_INJECTION_PROFILES = {
+    # Terminals treat Ctrl+V differently (or not at all) - type instead
+    "cmd": _TYPE_ONLY,
+    "powershell": _TYPE_ONLY,
+    "pwsh": _TYPE_ONLY,
+    "windowsterminal": _TYPE_ONLY,
+    "conhost": _TYPE_ONLY,
+    "terminal": _TYPE_ONLY,
+    "console": _TYPE_ONLY,
+    # Start menu search drops pasted text while the search box is animating in
+    "start": _TYPE_ONLY,
+    "searchhost": _TYPE_ONLY,
+    "searchapp": _TYPE_ONLY,
+    "startmenuexperiencehost": _TYPE_ONLY,
+    # Calculator ignores unicode key events but accepts paste
+    "calculator": ["clipboard", "typewrite"],
+    "calculatorapp": ["clipboard", "typewrite"],
+}
+DEFAULT_TEXT_INJECTION = ["clipboard", "sendinput", "xdotool", "typewrite"]
 
-        self.thread = threading.Thread(target=self._run_tk, daemon=True)
-        self.thread.start()
 
-        # Wait for window to be ready
-        timeout = 5
-        start = time.time()
-        while not self.is_ready and time.time() - start < timeout:
-            time.sleep(0.1)
+class PartialInjection(Exception):
+    """A backend stopped part-way; retrying with another would duplicate text"""
 
-    def _run_tk(self):
-        """Run Tkinter in its own thread"""
-        self.root = tk.Tk()
-        self.root.overrideredirect(True)
-        self.root.attributes("-topmost", True)
-        self.root.attributes("-alpha", 0.0)
-        self.root.configure(bg="black")
-
-        if os.name == "nt":
-            self.root.attributes("-transparentcolor", "black")
-
-        # Position at bottom of screen
-        sw = self.root.winfo_screenwidth()
-        sh = self.root.winfo_screenheight()
-        w = int(sw * 0.7)
-        h = 100
-        x = (sw - w) // 2
-        y = sh - 200
-        self.root.geometry(f"{w}x{h}+{x}+{y}")
-
-        # Create label
-        font_ = tkfont.Font(family="Segoe UI", size=15, weight="bold")
-        self.label = tk.Label(
-            self.root,
-            text="",
-            font=font_,
-            fg="white",
-            bg="#1a1a2e",
-            wraplength=w - 40,
-            padx=20,
-            pady=15,
-            justify="center",
-        )
-        self.label.pack(fill="both", expand=True)
 
-        self.is_ready = True
-        self.root.after(50, self._process_queue)
-        self.root.mainloop()
+class TextInjector:
+    """Send whole strings to the focused window instead of typing per character"""
 
-    def _process_queue(self):
-        """Process messages from queue"""
-        try:
-            while not self.message_queue.empty():
-                text, kind, duration = self.message_queue.get_nowait()
-                self._display(text, kind, duration)
-        except:
-            pass
+    SENDINPUT_BATCH = 64  # characters per SendInput call
 
-        if self.running:
-            self.root.after(50, self._process_queue)
+    def __init__(self, typing_interval=0.06):
+        self.typing_interval = typing_interval
+        self.last_backend = None
 
-    def _display(self, text, kind, duration):
-        """Display a caption"""
-        colors = {
-            "assistant": ("#10b981", "white"),
-            "system": ("#fbbf24", "black"),
-            "suggestion": ("#8b5cf6", "white"),
-        }
-        bg, fg = colors.get(kind, ("#1a1a2e", "white"))
+    def backends_for(self, app_hint):
+        """Pick backend order for a process name or window title"""
+        hint = (app_hint or "").lower().strip()
+        if hint.endswith(".exe"):
+            hint = hint[:-4]
+        if hint in TEXT_INJECTION_PROFILES:
+            return TEXT_INJECTION_PROFILES[hint]
+        words = set(re.findall(r"[a-z0-9]+", hint))
+        for key, order in TEXT_INJECTION_PROFILES.items():
+            if key in words:
+                return order
+        return DEFAULT_TEXT_INJECTION
 
-        self.label.config(text=text, bg=bg, fg=fg)
-        self.root.attributes("-alpha", 0.95)
-        self.root.update_idletasks()
+    def type_text(self, text, app_hint=""):
+        """Inject text, verify it landed and fall back to the next backend"""
+        text = str(text)
+        if not text:
+            return True
 
-        if duration > 0:
-            self.root.after(int(duration * 1000), self._hide)
+        for backend in self.backends_for(app_hint):
+            injector = getattr(self, f"_inject_{backend}", None)
+            if not injector:
+                continue
 
-    def _hide(self):
-        """Hide the window"""
+            before = self._read_focused_text()
+            try:
+                injected = injector(text)
+            except PartialInjection as e:
+                log_action.warning("%s stopped part-way, not retrying: %s", backend, e)
+                return False
+            except Exception as e:
+                log_action.warning("%s injection failed: %s", backend, e)
+                injected = False
+
+            if not injected:
+                # A backend can fail after some keystrokes landed
+                if self._changed(before):
+                    log_action.warning("%s failed after a partial write, not retrying", backend)
+                    return False
+                continue
+
+            if backend == "typewrite" or self._verify(text, before):
+                self.last_backend = backend
+                log_action.debug("Injected %d chars via %s", len(text), backend)
+                return True
+
+            # Slow apps apply input late; typing again would double it
+            if self._changed(before, settle=0.3):
+                self.last_backend = backend
+                log_action.debug("Injected %d chars via %s (late)", len(text), backend)
+                return True
+
+            log_action.warning("%s injection not verified, falling back", backend)
+
+        return False
+
+    # ---------- verification ----------
+
+    def _read_focused_text(self):
+        """Text of the focused edit control, or None if it can't be read"""
+        if os.name != "nt":
+            return None
         try:
-            self.root.attributes("-alpha", 0.0)
-            self.root.update_idletasks()
+            import ctypes
+            import win32gui, win32con, win32process
+            from ctypes import wintypes
+
+            class GUITHREADINFO(ctypes.Structure):
+                _fields_ = [
+                    ("cbSize", wintypes.DWORD),
+                    ("flags", wintypes.DWORD),
+                    ("hwndActive", wintypes.HWND),
+                    ("hwndFocus", wintypes.HWND),
+                    ("hwndCapture", wintypes.HWND),
+                    ("hwndMenuOwner", wintypes.HWND),
+                    ("hwndMoveSize", wintypes.HWND),
+                    ("hwndCaret", wintypes.HWND),
+                    ("rcCaret", wintypes.RECT),
+                ]
+
+            foreground = win32gui.GetForegroundWindow()
+            thread_id, _ = win32process.GetWindowThreadProcessId(foreground)
+            info = GUITHREADINFO(cbSize=ctypes.sizeof(GUITHREADINFO))
+            if not ctypes.windll.user32.GetGUIThreadInfo(thread_id, ctypes.byref(info)):
+                return None
+            if not info.hwndFocus:
+                return None
+
+            length = win32gui.SendMessage(info.hwndFocus, win32con.WM_GETTEXTLENGTH, 0, 0)
+            if length <= 0:
+                return ""
+            buffer = win32gui.PyMakeBuffer((length + 1) * 2)
+            win32gui.SendMessage(info.hwndFocus, win32con.WM_GETTEXT, length + 1, buffer)
+            return buffer.tobytes().decode("utf-16-le", errors="ignore").split("\x00", 1)[0]
         except:
-            pass
+            return None
 
-    def show(self, text, kind="system", duration=6):
-        """Show a caption (thread-safe)"""
-        if self.is_ready:
-            self.message_queue.put((text, kind, duration))
+    def _verify(self, text, before):
+        """Check the focused control now contains the injected text"""
+        time.sleep(0.05)
+        after = self._read_focused_text()
+        if after is None:
+            # Browsers, Electron apps and UWP don't expose their edit text -
+            # trust the backend rather than retyping and doubling the input
+            return True
+        if text in after:
+            return True
+        # Some fields reformat input (masks, autocomplete) - any change counts,
+        # an untouched control means the keystrokes went nowhere
+        return after != before
+
+    def _changed(self, before, settle=0.05):
+        """Whether the focused control's text differs from before (False if unreadable)"""
+        time.sleep(settle)
+        after = self._read_focused_text()
+        return after is not None and after != before
+
+    # ---------- backends ----------
+
+    def _inject_clipboard(self, text):
+        """Paste via clipboard, restoring whatever was there before
+
+        Only text can be saved and put back, so the backend is skipped when
+        the clipboard holds an image, files or anything it cannot read.
+        """
+        restorable, saved = self._get_clipboard()
+        if not restorable:
+            log_action.debug("Clipboard holds non-text data, not pasting")
+            return False
+        if not self._set_clipboard(text):
+            return False
+        try:
+            modifier = "command" if sys.platform == "darwin" else "ctrl"
+            pyautogui.hotkey(modifier, "v")
+            # Give the target app time to read the clipboard before restoring
+            time.sleep(0.15)
+        finally:
+            self._set_clipboard(saved)
+        return True
+
+    def _inject_sendinput(self, text):
+        """Windows SendInput with KEYEVENTF_UNICODE, batched"""
+        if os.name != "nt":
+            return False
 
-    def destroy(self):
-        """Clean up"""
-        self.running = False
-        if self.root:
-            try:
-                self.root.quit()
-            except:
-                pass
+        import ctypes
+        from ctypes import wintypes
 
+        INPUT_KEYBOARD = 1
+        KEYEVENTF_KEYUP = 0x0002
+        KEYEVENTF_UNICODE = 0x0004
 
-class Api:
-    """Backend API for MistAI Desktop Assistant"""
+        class KEYBDINPUT(ctypes.Structure):
+            _fields_ = [
+                ("wVk", wintypes.WORD),
+                ("wScan", wintypes.WORD),
+                ("dwFlags", wintypes.DWORD),
+                ("time", wintypes.DWORD),
+                ("dwExtraInfo", ctypes.POINTER(wintypes.ULONG)),
+            ]
 
-    def __init__(self):
-        self.recognizer = sr.Recognizer()
-        self.microphone = sr.Microphone()
-        self.is_listening = False
+        class MOUSEINPUT(ctypes.Structure):
+            _fields_ = [
+                ("dx", wintypes.LONG),
+                ("dy", wintypes.LONG),
+                ("mouseData", wintypes.DWORD),
+                ("dwFlags", wintypes.DWORD),
+                ("time", wintypes.DWORD),
+                ("dwExtraInfo", ctypes.POINTER(wintypes.ULONG)),
+            ]
 
-        # Initialize TTS
-        self.engine = pyttsx3.init()
-        self.engine.setProperty("rate", 175)
-        self.engine.setProperty("volume", 1.0)
+        class _INPUTUNION(ctypes.Union):
+            # MOUSEINPUT is the largest member and sets sizeof(INPUT)
+            _fields_ = [("ki", KEYBDINPUT), ("mi", MOUSEINPUT)]
+
+        class INPUT(ctypes.Structure):
+            _fields_ = [("type", wintypes.DWORD), ("u", _INPUTUNION)]
+
+        # Newlines go through as Enter key presses, everything else as UTF-16 units
+        units = []
+        for char in text.replace("\r\n", "\n"):
+            if char == "\n":
+                units.append(("vk", 0x0D))
+                continue
+            encoded = char.encode("utf-16-le")
+            for i in range(0, len(encoded), 2):
+                units.append(("scan", int.from_bytes(encoded[i:i + 2], "little")))
+
+        send_input = ctypes.windll.user32.SendInput
+        for start in range(0, len(units), self.SENDINPUT_BATCH):
+            batch = units[start:start + self.SENDINPUT_BATCH]
+            events = (INPUT * (len(batch) * 2))()
+            for i, (kind, code) in enumerate(batch):
+                for j, up in enumerate((0, KEYEVENTF_KEYUP)):
+                    event = events[i * 2 + j]
+                    event.type = INPUT_KEYBOARD
+                    if kind == "vk":
+                        event.u.ki.wVk = code
+                        event.u.ki.dwFlags = up
+                    else:
+                        event.u.ki.wScan = code
+                        event.u.ki.dwFlags = KEYEVENTF_UNICODE | up
+            sent = send_input(len(events), events, ctypes.sizeof(INPUT))
+            if sent != len(events):
+                if start or sent:
+                    raise PartialInjection(f"SendInput sent {start * 2 + sent} of {len(units) * 2} events")
+                return False
+        return True
+
+    def _inject_xdotool(self, text):
+        """X11 XTest injection through xdotool"""
+        if not sys.platform.startswith("linux") or not os.environ.get("DISPLAY"):
+            return False
 
-        # Speech queue
-        self.speech_queue = Queue()
-        self.speech_thread = threading.Thread(target=self._speech_worker, daemon=True)
-        self.speech_thread.start()
+        import shutil
+        import subprocess
 
-        # Test PyAutoGUI
-        print("\nTESTING PYAUTOGUI:")
-        try:
-            pyautogui.FAILSAFE = True
-            pyautogui.PAUSE = 0.2
-            pos = pyautogui.position()
-            print(f"PyAutoGUI working! Mouse: {pos} | Screen: {pyautogui.size()}")
-        except Exception as e:
-            print(f"PYAUTOGUI ERROR: {e}")
+        if not shutil.which("xdotool"):
+            return False
 
-        # Memory system
-        self.conversation_active = False
-        self.last_interaction_time = 0
-        self.conversation_timeout = 45  # seconds
-        self.conversation_history = []
-        self.actions_performed = []
-        self.opened_apps = set()
-        self.active_window = None
-        self.last_screenshot_text = ""
-        self.context = {
-            "last_action": None,
-            "last_app_opened": None,
-            "session_start": datetime.now().isoformat(),
-        }
+        result = subprocess.run(
+            ["xdotool", "type", "--clearmodifiers", "--delay", "0", "--", text],
+            capture_output=True,
+            timeout=10,
+        )
+        return result.returncode == 0
 
-        # Wake word detection
-        self.wake_word_active = False
-        self.wake_word_thread = None
-        self.stop_wake_word = threading.Event()
+    def _inject_typewrite(self, text):
+        """Per-character fallback (slow, ASCII only)"""
+        pyautogui.write(text, interval=self.typing_interval)
+        return True
 
-        # Proactive mode
-        self.proactive_mode = False
-        self.proactive_thread = None
-        self.stop_proactive = threading.Event()
-        self.last_screen_check = time.time()
-        self.last_suggestion_time = time.time()
-        self.suggestion_cooldown = 45
-        self.last_suggestion = ""
+    # ---------- clipboard helpers ----------
 
-        # Caption system
-        self.captions_enabled = False
-        self.caption_window = None
-        self.tts_lock = threading.Lock()
+    def _get_clipboard(self):
+        """(restorable, text): text is None for an empty clipboard
 
-    def minimize_window(self):
-        """Minimize MistAI window"""
+        restorable is False when the clipboard holds non-text data or could
+        not be read, since putting back only its text would lose the rest.
+        """
         try:
-            if hasattr(self, "window") and self.window:
-                self.window.minimize()
-            return {"success": True}
-        except Exception as e:
-            return {"success": False, "error": str(e)}
+            if os.name == "nt":
+                import win32clipboard, win32con
 
-    def _speech_worker(self):
-        """Background thread for TTS"""
-        while True:
-            text = self.speech_queue.get()
-            if text:
-                if self.captions_enabled and self.caption_window:
-                    self.caption_window.show(f"🤖 {text}", "assistant", duration=8)
+                text_formats = {win32con.CF_UNICODETEXT, win32con.CF_TEXT, win32con.CF_OEMTEXT, win32con.CF_LOCALE}
+                win32clipboard.OpenClipboard()
+                try:
+                    formats, fmt = [], win32clipboard.EnumClipboardFormats(0)
+                    while fmt:
+                        formats.append(fmt)
+                        fmt = win32clipboard.EnumClipboardFormats(fmt)
+                    if not formats:
+                        return True, None
+                    if any(f not in text_formats for f in formats):
+                        return False, None
+                    return True, win32clipboard.GetClipboardData(win32con.CF_UNICODETEXT)
+                finally:
+                    win32clipboard.CloseClipboard()
+
+            import subprocess
+
+            if sys.platform.startswith("linux"):
+                try:
+                    targets = subprocess.run(
+                        ["xclip", "-selection", "clipboard", "-t", "TARGETS", "-o"], capture_output=True, timeout=2
+                    )
+                    listed = targets.stdout.decode("utf-8", errors="ignore").split()
+                    if targets.returncode == 0 and any(t.startswith("image/") or t == "text/uri-list" for t in listed):
+                        return False, None
+                except FileNotFoundError:
+                    pass
 
-                with self.tts_lock:
-                    self.engine.say(text)
-                    self.engine.runAndWait()
+            for cmd in (["pbpaste"], ["xclip", "-selection", "clipboard", "-o"], ["xsel", "-b", "-o"]):
+                try:
+                    result = subprocess.run(cmd, capture_output=True, timeout=2)
+                    if result.returncode == 0:
+                        return True, result.stdout.decode("utf-8", errors="ignore") or None
+                except FileNotFoundError:
+                    continue
+        except:
+            pass
+        return False, None
 
-            self.speech_queue.task_done()
+    def _set_clipboard(self, text):
+        """Put text on the clipboard; None empties it"""
+        try:
+            if os.name == "nt":
+                import win32clipboard, win32con
 
-    def speak_now(self, text, interrupt=False):
-        """Queue text to be spoken"""
-        if not text:
-            return
+                win32clipboard.OpenClipboard()
+                try:
+                    win32clipboard.EmptyClipboard()
+                    if text is not None:
+                        win32clipboard.SetClipboardData(win32con.CF_UNICODETEXT, text)
+                finally:
+                    win32clipboard.CloseClipboard()
+                return True
 
-        if interrupt:
-            while not self.speech_queue.empty():
+            import subprocess
+
+            for cmd in (["pbcopy"], ["xclip", "-selection", "clipboard"], ["xsel", "-b", "-i"]):
                 try:
-                    self.speech_queue.get_nowait()
-                except:
-                    break
+                    result = subprocess.run(cmd, input=(text or "").encode("utf-8"), timeout=2)
+                    if result.returncode == 0:
+                        return True
+                except FileNotFoundError:
+                    continue
+        except:
+            pass
+        return False
 
-        self.speech_queue.put(text)
 
-    # ============================================
-    # CAPTION SYSTEM
-    # ============================================
+# ==========================================
+# SCREEN CAPTURE
+# ==========================================
+class CoordTransform:
+    """Affine map from an image's pixels to screen (pyautogui) coordinates.
+
+    screen = image * scale + offset. Every derived image gets its own
+    transform: crop() for a sub-image, resize() for a rescaled copy. A box
+    found in any of them then maps straight back to a click position, and
+    display scaling is applied exactly once.
+    """
+
+    __slots__ = ("sx", "sy", "ox", "oy")
+
+    def __init__(self, sx=1.0, sy=None, ox=0.0, oy=0.0):
+        self.sx = float(sx)
+        self.sy = float(sx if sy is None else sy)
+        self.ox = float(ox)
+        self.oy = float(oy)
+
+    def crop(self, x, y):
+        """Transform for the sub-image starting at (x, y) of this image"""
+        return CoordTransform(self.sx, self.sy, self.ox + x * self.sx, self.oy + y * self.sy)
+
+    def resize(self, fx, fy=None):
+        """Transform for this image resized by (fx, fy)"""
+        fy = fx if fy is None else fy
+        return CoordTransform(self.sx / fx, self.sy / fy, self.ox, self.oy)
+
+    def point(self, x, y):
+        return (int(round(x * self.sx + self.ox)), int(round(y * self.sy + self.oy)))
+
+    def box(self, x, y, w, h):
+        """(x, y, w, h) in image pixels -> screen box; edges are rounded, not sizes"""
+        x0, y0 = self.point(x, y)
+        x1, y1 = self.point(x + w, y + h)
+        return (x0, y0, x1 - x0, y1 - y0)
+
+    def inverse_point(self, x, y):
+        return (int(round((x - self.ox) / self.sx)), int(round((y - self.oy) / self.sy)))
+
+    def inverse_box(self, x, y, w, h):
+        x0, y0 = self.inverse_point(x, y)
+        x1, y1 = self.inverse_point(x + w, y + h)
+        return (x0, y0, x1 - x0, y1 - y0)
+
+    def inverse_rect(self, left, top, right, bottom):
+        """Screen (left, top, right, bottom) -> image coordinates (unclipped)"""
+        return self.inverse_point(left, top) + self.inverse_point(right, bottom)
+
+    def key(self):
+        return (self.sx, self.sy, self.ox, self.oy)
+
+    def __repr__(self):
+        return f"CoordTransform(sx={self.sx:g}, sy={self.sy:g}, ox={self.ox:g}, oy={self.oy:g})"
+
+
+class ScreenCapture:
+    """Screen grabber that writes frames into reusable numpy buffers.
+
+    With mss installed, frames come straight from the OS grab as a BGRA
+    view (no PIL image) and are converted once into a preallocated buffer,
+    usually directly to grayscale. Without mss it falls back to
+    pyautogui.screenshot(). MISTAI_CAPTURE_BACKEND=pyautogui forces the
+    fallback.
+
+    Returned arrays belong to a per-thread buffer named by `slot` and are
+    overwritten by the next grab with the same slot on the same thread.
+    Copy a frame to keep it. grab_monitors() returns frames the caller owns.
+
+    Regions are (left, top, width, height) in capture pixels. These can
+    differ from pyautogui's coordinates under Windows display scaling when
+    the process is not DPI aware, and each monitor can have its own
+    factor. transform(region) returns the CoordTransform that maps a frame
+    of that region to screen coordinates using the scale of the monitor
+    holding it. monitor_at() and region_for_screen_rect() take screen
+    coordinates. MISTAI_DISPLAY_SCALE overrides the measured factor, one
+    value for all monitors or a comma-separated list, primary first.
+    """
+
+    def __init__(self, backend=None):
+        self._local = threading.local()
+        self._backend = backend or os.environ.get("MISTAI_CAPTURE_BACKEND")
+        self._monitors = None
+        self._scale = None
+        self._screen_rects = None  # per monitor (left, top, right, bottom) in screen units
+        self._geometry = None
+        self._pool = None
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            try:
+                importlib.import_module("mss")
+                self._backend = "mss"
+            except ImportError:
+                self._backend = "pyautogui"
+            log_vision.info("Screen capture backend: %s", self._backend)
+        return self._backend
+
+    def _mss(self):
+        # mss handles are not shareable across threads
+        sct = getattr(self._local, "sct", None)
+        if sct is None:
+            sct = importlib.import_module("mss").mss()
+            self._local.sct = sct
+        return sct
+
+    def _buffer(self, slot, shape):
+        buffers = getattr(self._local, "buffers", None)
+        if buffers is None:
+            buffers = self._local.buffers = {}
+        buf = buffers.get(slot)
+        if buf is None or buf.shape != shape:
+            buf = buffers[slot] = np.empty(shape, np.uint8)
+        return buf
+
+    def monitors(self):
+        """Physical monitors as (left, top, width, height) capture regions, primary first"""
+        if self._monitors is None:
+            if self.backend == "mss":
+                mons = self._mss().monitors[1:]
+                regions = [(m["left"], m["top"], m["width"], m["height"]) for m in mons]
+                # mss lists monitors in OS enumeration order; the primary is the one at the origin
+                regions.sort(key=lambda r: (r[0], r[1]) != (0, 0))
+                self._monitors = regions
+            else:
+                # The grab can be larger than pyautogui.size() under display scaling
+                width, height = pyautogui.screenshot().size
+                self._monitors = [(0, 0, width, height)]
+        return list(self._monitors)
+
+    def primary_region(self):
+        return self.monitors()[0]
+
+    def scale(self):
+        """Screen (pyautogui) units per captured pixel"""
+        if self._scale is None:
+            factors = self._scale_override()
+            if factors:
+                # One factor per monitor, primary first; scale() is the primary's
+                self._scale = 1.0 / factors[0]
+            else:
+                try:
+                    screen_width = pyautogui.size()[0]
+                    scale = screen_width / float(self.primary_region()[2])
+                    self._scale = 1.0 if abs(scale - 1.0) < 0.01 else scale
+                except Exception:
+                    self._scale = 1.0
+            if self._scale != 1.0:
+                log_vision.info("Display scaling: %.2f capture pixels per screen unit", 1 / self._scale)
+        return self._scale
+
+    def geometry(self):
+        """[(capture region, scale, screen left, screen top)] per monitor, primary first
+
+        Without per-monitor information every monitor gets scale() and its
+        screen origin is its capture origin times that scale, rounded.
+        """
+        if self._geometry is None:
+            monitors = self.monitors()
+            screen_rects = self._screen_rects
+            if screen_rects is None:
+                screen_rects = self._measure_screen_rects(monitors)
+            if screen_rects and len(screen_rects) == len(monitors):
+                self._geometry = [
+                    (region, (right - left) / float(region[2]), left, top)
+                    for region, (left, top, right, bottom) in zip(monitors, screen_rects)
+                ]
+            else:
+                s = self.scale()
+                # Monitor rects are whole screen units
+                self._geometry = [(region, s, int(round(region[0] * s)), int(round(region[1] * s))) for region in monitors]
+        return list(self._geometry)
+
+    @staticmethod
+    def _scale_override():
+        """Display factors from MISTAI_DISPLAY_SCALE ("1.5" or "1.5,1.0"), or None"""
+        override = os.environ.get("MISTAI_DISPLAY_SCALE", "").strip()
+        if not override:
+            return None
+        try:
+            factors = [float(v) for v in override.split(",")]
+        except ValueError:
+            factors = []
+        if not factors or min(factors) <= 0:
+            log_vision.warning("Ignoring invalid MISTAI_DISPLAY_SCALE=%r", override)
+            return None
+        return factors
+
+    def _measure_screen_rects(self, monitors):
+        """Screen-unit rects matching monitors, from overrides or win32; None if unknown"""
+        factors = self._scale_override()
+        if factors and len(factors) > 1:
+            if len(factors) != len(monitors):
+                return None
+            return self._stack_rects(monitors, [1.0 / f for f in factors])
+        if factors or len(monitors) < 2:
+            return None
+        try:
+            import win32api
 
-    def toggle_captions(self, enabled):
-        """Toggle caption system"""
-        self.captions_enabled = enabled
+            rects = [tuple(info[2]) for info in win32api.EnumDisplayMonitors()]
+        except Exception:
+            return None
+        if len(rects) != len(monitors):
+            return None
+        # Both lists hold the primary at the origin; pair the rest by position
+        rects.sort(key=lambda r: ((r[0], r[1]) != (0, 0), r[0], r[1]))
+        order = sorted(range(1, len(monitors)), key=lambda i: (monitors[i][0], monitors[i][1]))
+        paired = [None] * len(monitors)
+        paired[0] = rects[0]
+        for index, rect in zip(order, rects[1:]):
+            paired[index] = rect
+        return paired
+
+    @staticmethod
+    def _stack_rects(monitors, scales):
+        """Screen rects for per-monitor scales with monitors kept edge to edge
+
+        Offsets right of or below the primary are in the primary's units;
+        a monitor left of or above it ends at 0, so its offset is in its own.
+        """
+        rects = []
+        for (left, top, width, height), s in zip(monitors, scales):
+            x = int(round(left * (s if left < 0 else scales[0])))
+            y = int(round(top * (s if top < 0 else scales[0])))
+            rects.append((x, y, x + int(round(width * s)), y + int(round(height * s))))
+        return rects
+
+    def _monitor_for_region(self, region):
+        """Geometry entry of the monitor holding region's top-left pixel"""
+        geometry = self.geometry()
+        for entry in geometry:
+            left, top, width, height = entry[0]
+            if left <= region[0] < left + width and top <= region[1] < top + height:
+                return entry
+        return geometry[0]
+
+    def transform(self, region):
+        """CoordTransform from a frame of region to screen coordinates"""
+        (left, top, _, _), s, screen_left, screen_top = self._monitor_for_region(region)
+        return CoordTransform(s, s, screen_left + (region[0] - left) * s, screen_top + (region[1] - top) * s)
+
+    def region_for_screen_rect(self, left, top, right, bottom):
+        """Capture region covering a screen-space (left, top, right, bottom) rect"""
+        region, s, screen_left, screen_top = self.geometry()[self.monitor_at((left + right) // 2, (top + bottom) // 2)]
+        x0 = region[0] + int(round((left - screen_left) / s))
+        y0 = region[1] + int(round((top - screen_top) / s))
+        x1 = region[0] + int(round((right - screen_left) / s))
+        y1 = region[1] + int(round((bottom - screen_top) / s))
+        return (x0, y0, x1 - x0, y1 - y0)
+
+    def monitor_at(self, x, y):
+        """Index of the monitor containing screen point (x, y), or 0"""
+        for index, ((_, _, width, height), s, left, top) in enumerate(self.geometry()):
+            if left <= x < left + width * s and top <= y < top + height * s:
+                return index
+        return 0
+
+    def grab_monitors(self, indices, slot="mon"):
+        """Grayscale frames of several monitors, captured in parallel
+
+        Returns [(index, region, transform, frame)] in the order of indices.
+        Each capture is traced as a vision.capture span tagged with its
+        monitor. A single monitor is grabbed on the calling thread into its
+        `slot` buffer; several are grabbed on pool threads and copied out,
+        since those threads' buffers are reused by the next call.
+        """
+        monitors = self.monitors()
+
+        def grab(index, copy=False):
+            region = monitors[index]
+            with TRACER.span("vision.capture", "vision", monitor=index, backend=self.backend):
+                frame = self.grab_gray(region, slot=f"{slot}{index}")
+                return index, region, self.transform(region), frame.copy() if copy else frame
+
+        if len(indices) == 1:
+            return [grab(indices[0])]
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=max(2, len(monitors)), thread_name_prefix="capture")
+        return list(self._pool.map(functools.partial(grab, copy=True), indices))
+
+    def grab_gray(self, region=None, slot="frame"):
+        """Grayscale uint8 frame of region (default: primary monitor)"""
+        return self._grab(region, slot, gray=True)
+
+    def grab_bgr(self, region=None, slot="frame_bgr"):
+        """BGR uint8 frame of region (default: primary monitor)"""
+        return self._grab(region, slot, gray=False)
+
+    def _grab(self, region, slot, gray):
+        left, top, width, height = region or self.primary_region()
+        shape = (height, width) if gray else (height, width, 3)
+        out = self._buffer(slot, shape)
+        if self.backend == "mss":
+            shot = self._mss().grab({"left": left, "top": top, "width": width, "height": height})
+            bgra = np.frombuffer(shot.raw, np.uint8).reshape(shot.height, shot.width, 4)
+            cv2.cvtColor(bgra, cv2.COLOR_BGRA2GRAY if gray else cv2.COLOR_BGRA2BGR, dst=out)
+        else:
+            rgb = np.asarray(pyautogui.screenshot(region=(left, top, width, height)))
+            cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY if gray else cv2.COLOR_RGB2BGR, dst=out)
+        return out
 
-        if enabled:
-            if not self.caption_window:
-                self.caption_window = SimpleCaptionWindow()
-                self.caption_window.show("📺 Captions Enabled", "system", duration=3)
+
+# ==========================================
+# CLICK TARGET CACHE
+# ==========================================
+def match_template_multiscale(haystack, template, scales=(1.0,)):
+    """Best TM_CCOEFF_NORMED match of template in haystack over several scales
+
+    Returns (score, x, y, w, h) with the box in haystack coordinates, or
+    (0.0, 0, 0, 0, 0) if the template never fits.
+    """
+    matches = match_template_candidates(haystack, template, scales, 1)
+    return matches[0] if matches else (0.0, 0, 0, 0, 0)
+
+
+def match_template_candidates(haystack, template, scales=(1.0,), count=2, coarse_peaks=3):
+    """Up to count distinct (score, x, y, w, h) matches of template, best first
+
+    Large haystacks are searched at half resolution first and the best
+    coarse_peaks locations are refined at full resolution, since look-alike
+    elements (buttons of the same style) can outscore the real one when
+    downscaled. A strong second match means the template is ambiguous.
+    """
+    hay_h, hay_w = haystack.shape[:2]
+    base_h, base_w = template.shape[:2]
+
+    # Large search areas: locate at half resolution, then refine nearby
+    if hay_w * hay_h > 400_000 and base_w >= 32 and base_h >= 20:
+        small_hay = cv2.resize(haystack, (hay_w // 2, hay_h // 2), interpolation=cv2.INTER_AREA)
+        small_tpl = cv2.resize(template, (base_w // 2, base_h // 2), interpolation=cv2.INTER_AREA)
+        refined = []
+        for _, x, y, w, h in template_peaks(small_hay, small_tpl, scales, max(count, coarse_peaks)):
+            scale = (w * 2) / base_w
+            margin = 8
+            left, top = max(0, x * 2 - margin), max(0, y * 2 - margin)
+            right = min(hay_w, x * 2 + w * 2 + margin)
+            bottom = min(hay_h, y * 2 + h * 2 + margin)
+            for score, px, py, pw, ph in template_peaks(haystack[top:bottom, left:right], template, (scale,), 1):
+                refined.append((score, left + px, top + py, pw, ph))
+        return _distinct_peaks(refined, count)
+
+    return template_peaks(haystack, template, scales, count)
+
+
+def template_peaks(haystack, template, scales=(1.0,), count=1):
+    """Up to count non-overlapping (score, x, y, w, h) matches, best first"""
+    hay_h, hay_w = haystack.shape[:2]
+    base_h, base_w = template.shape[:2]
+    peaks = []
+    for scale in scales:
+        if scale == 1.0:
+            scaled = template
         else:
-            if self.caption_window:
-                self.caption_window.destroy()
-                self.caption_window = None
+            w, h = int(round(base_w * scale)), int(round(base_h * scale))
+            if w < 8 or h < 8:
+                continue
+            interp = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
+            scaled = cv2.resize(template, (w, h), interpolation=interp)
+        th, tw = scaled.shape[:2]
+        if tw > hay_w or th > hay_h:
+            continue
+
+        result = cv2.matchTemplate(haystack, scaled, cv2.TM_CCOEFF_NORMED)
+        for _ in range(count):
+            _, score, _, (mx, my) = cv2.minMaxLoc(result)
+            if score <= 0:
+                break
+            peaks.append((float(score), mx, my, tw, th))
+            # Suppress this match so the next peak is somewhere else
+            result[max(0, my - th // 2):my + th // 2 + 1, max(0, mx - tw // 2):mx + tw // 2 + 1] = -1
+
+    return _distinct_peaks(peaks, count)
+
+
+def _distinct_peaks(peaks, count):
+    """Best count peaks that are not the same spot found at another scale"""
+    distinct = []
+    for peak in sorted(peaks, key=lambda p: -p[0]):
+        _, x, y, w, h = peak
+        if all(abs(x - px) > w // 2 or abs(y - py) > h // 2 for _, px, py, _, _ in distinct):
+            distinct.append(peak)
+            if len(distinct) == count:
+                break
+    return distinct
+
+
+def normalize_target_text(text):
+    """Normalize click target text for cache keys"""
+    text = "".join(c if c.isalnum() else " " for c in str(text).lower())
+    return " ".join(text.split())
+
+
+class ClickTargetCache:
+    """Remembers where targets were last clicked, per app, with a template patch
+
+    Entries are keyed by (app, normalized target text) and store the box
+    relative to the app's window plus a small grayscale patch. A lookup only
+    succeeds if the patch is found again near the remembered spot; a failed
+    verification evicts the entry so the full OCR pipeline takes over.
+    Callers store a target only after the click on it had a visible effect
+    and report later successful clicks through record_hit.
+    """
+
+    MAX_ENTRIES = 300
+    MAX_PATCH_SIZE = (320, 120)  # w, h
+    SEARCH_MARGIN = 60  # px around the remembered box
+    MATCH_THRESHOLD = 0.85
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or os.path.join(DATA_DIR, "click_cache")
+        self.index_path = os.path.join(self.cache_dir, "index.json")
+        self.lock = threading.Lock()
+        self.entries = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except:
+            self.entries = {}
 
-        return {"success": True}
+    def _save(self):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = self.index_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f)
+            os.replace(tmp_path, self.index_path)
+        except Exception as e:
+            log_vision.warning("Click cache save error: %s", e)
 
-    def show_caption(self, text, kind="system"):
-        """Show caption - blocks user captions"""
-        if kind == "user":
-            return {"success": True}
+    def _key(self, app, text):
+        return f"{(app or 'unknown').lower()}|{normalize_target_text(text)}"
 
-        if self.captions_enabled and self.caption_window:
-            prefix = (
-                "🤖 "
-                if kind == "assistant"
-                else "💡 " if kind == "suggestion" else "ℹ️ "
-            )
-            self.caption_window.show(f"{prefix}{text}", kind, duration=6)
-        return {"success": True}
+    def lookup(self, app, text, frame_gray, window_rect):
+        """Return (x, y, w, h) in screen coordinates if the cached target is verified"""
+        key = self._key(app, text)
+        with self.lock:
+            entry = self.entries.get(key)
+        if not entry:
+            return None
 
-    # ============================================
-    # WAKE WORD DETECTION
-    # ============================================
+        patch = cv2.imread(os.path.join(self.cache_dir, entry["patch"]), cv2.IMREAD_GRAYSCALE)
+        if patch is None:
+            self.evict(key)
+            return None
 
-    def start_wake_word_detection(self):
-        """Start continuous wake word listening"""
-        if self.wake_word_active:
-            return {"success": False, "message": "Already active"}
+        wx, wy = window_rect[0], window_rect[1]
+        rx, ry, w, h = entry["rel"]
+        px, py = entry.get("patch_offset", (0, 0))
+        ph, pw = patch.shape[:2]
+
+        # Search only around where the patch was last seen
+        frame_h, frame_w = frame_gray.shape[:2]
+        left = max(0, wx + rx + px - self.SEARCH_MARGIN)
+        top = max(0, wy + ry + py - self.SEARCH_MARGIN)
+        right = min(frame_w, wx + rx + px + pw + self.SEARCH_MARGIN)
+        bottom = min(frame_h, wy + ry + py + ph + self.SEARCH_MARGIN)
+        if right - left < pw or bottom - top < ph:
+            self.evict(key)
+            return None
 
-        self.wake_word_active = True
-        self.stop_wake_word.clear()
+        roi = frame_gray[top:bottom, left:right]
+        score, mx, my, _, _ = match_template_multiscale(roi, patch)
 
-        self.wake_word_thread = threading.Thread(
-            target=self._wake_word_loop, daemon=True
-        )
-        self.wake_word_thread.start()
+        if score < self.MATCH_THRESHOLD:
+            log_vision.debug("Cached target stale (score %.2f), evicting", score)
+            self.evict(key)
+            return None
 
-        print("[Mic] Wake word detection started")
-        return {"success": True, "message": "Wake word detection active"}
+        return (left + mx - px, top + my - py, w, h)
+
+    def record_hit(self, app, text):
+        """Count a verified click on a cached target and persist it"""
+        with self.lock:
+            entry = self.entries.get(self._key(app, text))
+            if not entry:
+                return
+            entry["hits"] = entry.get("hits", 0) + 1
+            entry["last_used"] = time.time()
+            self._save()
+
+    def forget(self, app, text):
+        """Drop a cached target whose click had no effect"""
+        self.evict(self._key(app, text))
+
+    def store(self, app, text, box, frame_gray, window_rect):
+        """Remember a successful click target"""
+        x, y, w, h = box
+        frame_h, frame_w = frame_gray.shape[:2]
+
+        # Crop the patch to the target box, capped around its center
+        max_w, max_h = self.MAX_PATCH_SIZE
+        pw, ph = min(w, max_w), min(h, max_h)
+        px0 = max(0, x + (w - pw) // 2)
+        py0 = max(0, y + (h - ph) // 2)
+        patch = frame_gray[py0:min(frame_h, py0 + ph), px0:min(frame_w, px0 + pw)]
+        if patch.size == 0 or patch.shape[0] < 8 or patch.shape[1] < 8:
+            return
+        # A flat patch would match anywhere
+        if float(patch.std()) < 4.0:
+            return
+
+        key = self._key(app, text)
+        patch_name = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16] + ".png"
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            if not cv2.imwrite(os.path.join(self.cache_dir, patch_name), patch):
+                return
+        except Exception as e:
+            log_vision.warning("Click cache patch error: %s", e)
+            return
+
+        wx, wy = window_rect[0], window_rect[1]
+        with self.lock:
+            self.entries[key] = {
+                "app": app,
+                "text": normalize_target_text(text),
+                "rel": [x - wx, y - wy, w, h],
+                "patch": patch_name,
+                "patch_offset": [px0 - x, py0 - y],
+                "hits": 0,
+                "last_used": time.time(),
+            }
+            self._evict_overflow()
+            self._save()
+
+    def evict(self, key):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if not entry:
+                return
+            self._save()
+        self._remove_patch(entry)
+
+    def _evict_overflow(self):
+        """Drop least recently used entries beyond MAX_ENTRIES (lock held)"""
+        if len(self.entries) <= self.MAX_ENTRIES:
+            return
+        ordered = sorted(self.entries.items(), key=lambda kv: kv[1].get("last_used", 0))
+        for key, entry in ordered[: len(self.entries) - self.MAX_ENTRIES]:
+            self.entries.pop(key, None)
+            self._remove_patch(entry)
+
+    def _remove_patch(self, entry):
+        try:
+            os.remove(os.path.join(self.cache_dir, entry["patch"]))
+        except:
+            pass
+
+
+# ==========================================
+# TEMPLATE LIBRARY
+# ==========================================
+class TemplateLibrary:
+    """Library of UI element templates learned from successful OCR matches
+
+    Unlike ClickTargetCache this is position and app independent: every
+    template for a text is searched across the ROI at several scales.
+    Size is bounded by template count and total pixels, least recently
+    used templates are evicted first, and templates that repeatedly miss
+    while OCR still finds the text are dropped as stale.
+    """
+
+    MAX_TEMPLATES = 200
+    MAX_PER_TEXT = 3
+    MAX_TOTAL_PIXELS = 4_000_000  # ~4 MB of grayscale patches
+    MAX_PATCH_SIZE = (320, 120)  # w, h
+    MIN_PATCH_SIZE = (16, 10)
+    SCALES = (1.0, 0.9, 1.1, 0.8, 1.25)
+    MATCH_THRESHOLD = 0.87
+    MAX_MISSES = 3
+
+    def __init__(self, library_dir=None):
+        self.library_dir = library_dir or os.path.join(DATA_DIR, "templates")
+        self.index_path = os.path.join(self.library_dir, "index.json")
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.images = {}  # template id -> loaded patch
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except:
+            self.entries = {}
+
+    def _save(self):
+        try:
+            os.makedirs(self.library_dir, exist_ok=True)
+            tmp_path = self.index_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f)
+            os.replace(tmp_path, self.index_path)
+        except Exception as e:
+            log_vision.warning("Template library save error: %s", e)
+
+    def _image(self, template_id):
+        image = self.images.get(template_id)
+        if image is None:
+            entry = self.entries.get(template_id)
+            if not entry:
+                return None
+            image = cv2.imread(os.path.join(self.library_dir, entry["file"]), cv2.IMREAD_GRAYSCALE)
+            if image is not None:
+                self.images[template_id] = image
+        return image
+
+    def ids_for(self, text):
+        norm = normalize_target_text(text)
+        with self.lock:
+            return [tid for tid, e in self.entries.items() if e["text"] == norm]
+
+    def find(self, text, frame_gray, roi=None):
+        """Search all templates for text inside roi (left, top, right, bottom)
+
+        Returns (x, y, w, h) in frame coordinates or None.
+        """
+        template_ids = self.ids_for(text)
+        if not template_ids:
+            return None
+
+        frame_h, frame_w = frame_gray.shape[:2]
+        left, top, right, bottom = roi or (0, 0, frame_w, frame_h)
+        left, top = max(0, left), max(0, top)
+        right, bottom = min(frame_w, right), min(frame_h, bottom)
+        if right <= left or bottom <= top:
+            return None
+        haystack = frame_gray[top:bottom, left:right]
+
+        best = None
+        for template_id in template_ids:
+            template = self._image(template_id)
+            if template is None:
+                self._evict(template_id)
+                continue
+            matches = match_template_candidates(haystack, template, self.SCALES)
+            if not matches or matches[0][0] < self.MATCH_THRESHOLD:
+                continue
+            score, x, y, w, h = matches[0]
+            # Text templates also match the same word inside longer labels
+            # ("File" in "Open File"); with two strong matches OCR must decide
+            if len(matches) > 1 and matches[1][0] >= self.MATCH_THRESHOLD:
+                log_vision.debug("Template for '%s' is ambiguous (%.2f / %.2f)", text, score, matches[1][0])
+                continue
+            if best is None or score > best[0]:
+                best = (score, template_id, (left + x, top + y, w, h))
+
+        if not best:
+            return None
+
+        score, template_id, box = best
+
+        with self.lock:
+            entry = self.entries.get(template_id)
+            if entry:
+                entry["hits"] = entry.get("hits", 0) + 1
+                entry["misses"] = 0
+                entry["last_used"] = time.time()
+        log_vision.debug("Template match for '%s' (score %.2f)", text, score)
+        return box
+
+    def add(self, text, frame_gray, box):
+        """Capture a template from a successful match"""
+        x, y, w, h = box
+        min_w, min_h = self.MIN_PATCH_SIZE
+        max_w, max_h = self.MAX_PATCH_SIZE
+        if w < min_w or h < min_h:
+            return
+
+        frame_h, frame_w = frame_gray.shape[:2]
+        pw, ph = min(w, max_w), min(h, max_h)
+        px0 = max(0, x + (w - pw) // 2)
+        py0 = max(0, y + (h - ph) // 2)
+        patch = frame_gray[py0:min(frame_h, py0 + ph), px0:min(frame_w, px0 + pw)]
+        if patch.shape[0] < min_h or patch.shape[1] < min_w or float(patch.std()) < 4.0:
+            return
+
+        # Skip if an existing template already matches this exact patch
+        for template_id in self.ids_for(text):
+            template = self._image(template_id)
+            if template is not None and template.shape == patch.shape:
+                if match_template_multiscale(patch, template)[0] >= 0.97:
+                    return
+
+        norm = normalize_target_text(text)
+        template_id = hashlib.sha1(f"{norm}|{time.time()}".encode("utf-8")).hexdigest()[:16]
+        file_name = f"{template_id}.png"
+
+        try:
+            os.makedirs(self.library_dir, exist_ok=True)
+            if not cv2.imwrite(os.path.join(self.library_dir, file_name), patch):
+                return
+        except Exception as e:
+            log_vision.warning("Template capture error: %s", e)
+            return
+
+        with self.lock:
+            self.entries[template_id] = {
+                "text": norm,
+                "file": file_name,
+                "w": int(patch.shape[1]),
+                "h": int(patch.shape[0]),
+                "hits": 0,
+                "misses": 0,
+                "last_used": time.time(),
+            }
+            # Frames live in reused capture buffers; keep our own copy
+            self.images[template_id] = patch.copy()
+            self._enforce_limits(norm)
+            self._save()
+
+    def record_miss(self, template_ids):
+        """Templates failed although OCR found the text - evict repeat offenders"""
+        stale = []
+        with self.lock:
+            for template_id in template_ids:
+                entry = self.entries.get(template_id)
+                if not entry:
+                    continue
+                entry["misses"] = entry.get("misses", 0) + 1
+                if entry["misses"] >= self.MAX_MISSES:
+                    stale.append(template_id)
+        for template_id in stale:
+            self._evict(template_id)
+
+    def _evict(self, template_id):
+        with self.lock:
+            self._drop(template_id)
+            self._save()
+
+    def _drop(self, template_id):
+        """Remove one template (lock held)"""
+        entry = self.entries.pop(template_id, None)
+        self.images.pop(template_id, None)
+        if entry:
+            try:
+                os.remove(os.path.join(self.library_dir, entry["file"]))
+            except:
+                pass
+
+    def _enforce_limits(self, norm):
+        """Apply per-text, count and pixel budgets (lock held)"""
+        by_age = lambda tid: self.entries[tid].get("last_used", 0)
+
+        same_text = sorted((tid for tid, e in self.entries.items() if e["text"] == norm), key=by_age)
+        for template_id in same_text[: max(0, len(same_text) - self.MAX_PER_TEXT)]:
+            self._drop(template_id)
+
+        ordered = sorted(self.entries, key=by_age)
+        total_pixels = sum(e["w"] * e["h"] for e in self.entries.values())
+        while ordered and (
+            len(self.entries) > self.MAX_TEMPLATES or total_pixels > self.MAX_TOTAL_PIXELS
+        ):
+            template_id = ordered.pop(0)
+            entry = self.entries[template_id]
+            total_pixels -= entry["w"] * entry["h"]
+            self._drop(template_id)
+
+
+# ==========================================
+# BUTTON CANDIDATES
+# ==========================================
+BUTTON_MIN_SIZE = (60, 20)  # w, h
+BUTTON_MAX_SIZE = (600, 120)
+BUTTON_ASPECT_RANGE = (1.2, 10.0)
+
+
+def filter_button_rects(rects):
+    """Keep rects (N x 4 array of x, y, w, h) with button-like size and aspect"""
+    rects = np.asarray(rects, dtype=np.int32).reshape(-1, 4)
+    w, h = rects[:, 2], rects[:, 3]
+    aspect = w / np.maximum(h, 1)
+    keep = (
+        (w >= BUTTON_MIN_SIZE[0]) & (w <= BUTTON_MAX_SIZE[0])
+        & (h >= BUTTON_MIN_SIZE[1]) & (h <= BUTTON_MAX_SIZE[1])
+        & (aspect >= BUTTON_ASPECT_RANGE[0]) & (aspect <= BUTTON_ASPECT_RANGE[1])
+    )
+    return rects[keep]
+
+
+def merge_overlapping_rects(rects, iou_threshold=0.3, containment_threshold=0.8):
+    """Non-maximum suppression for button candidates
+
+    Boxes are visited smallest first; any remaining box that overlaps the
+    kept one by IoU, or mostly contains it (a button outline or loose blob
+    around its label), is suppressed. Each label is OCRed once, from the
+    tightest box around it.
+    """
+    rects = np.asarray(rects, dtype=np.int32).reshape(-1, 4)
+    if len(rects) <= 1:
+        return rects
+
+    x1, y1 = rects[:, 0], rects[:, 1]
+    x2, y2 = x1 + rects[:, 2], y1 + rects[:, 3]
+    areas = rects[:, 2].astype(np.int64) * rects[:, 3]
+    order = np.argsort(areas, kind="stable")
+
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+
+        iw = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        ih = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = iw.astype(np.int64) * ih
+        iou = inter / (areas[i] + areas[rest] - inter)
+        contained = inter / max(int(areas[i]), 1)
+
+        order = rest[(iou <= iou_threshold) & (contained <= containment_threshold)]
+
+    return rects[np.sort(np.array(keep))]
+
+
+def region_means(gray, rects):
+    """Mean intensity of every rect at once via an integral image"""
+    rects = np.asarray(rects, dtype=np.int32).reshape(-1, 4)
+    if not len(rects):
+        return np.zeros(0)
+    integral = cv2.integral(gray)
+    x1, y1 = rects[:, 0], rects[:, 1]
+    x2, y2 = x1 + rects[:, 2], y1 + rects[:, 3]
+    sums = integral[y2, x2] - integral[y1, x2] - integral[y2, x1] + integral[y1, x1]
+    return sums / np.maximum(rects[:, 2] * rects[:, 3], 1)
+
+
+def button_candidate_rects(gray, merge=True):
+    """Edge-based button candidates for a grayscale frame
+
+    Returns (raw contour count, candidate rects). With merge=False the
+    result matches the old per-contour filter, which is what the
+    benchmark compares against.
+    """
+    edges1 = cv2.Canny(gray, 30, 100)
+    edges2 = cv2.Canny(gray, 100, 200)
+    edges = cv2.bitwise_or(edges1, edges2)
+
+    kernel = np.ones((3, 3), np.uint8)
+    edges = cv2.dilate(edges, kernel, iterations=2)
+
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return 0, np.zeros((0, 4), dtype=np.int32)
+
+    rects = np.array([cv2.boundingRect(c) for c in contours], dtype=np.int32)
+    rects = filter_button_rects(rects)
+    if merge:
+        rects = merge_overlapping_rects(rects)
+    return len(contours), rects
+
+
+# ==========================================
+# SCREEN READING
+# ==========================================
+def frame_signature(gray):
+    """Hash of a frame, averaged over 4x4 pixel blocks but not quantized.
+
+    A single changed character still shifts several block means, so equal
+    signatures mean the frame is effectively unchanged and results derived
+    from the earlier frame can be reused. Hashing 1/16 of the pixels keeps
+    it to a few milliseconds on a 4K frame.
+    """
+    height, width = gray.shape[:2]
+    thumb = cv2.resize(gray, (max(1, width // 4), max(1, height // 4)), interpolation=cv2.INTER_AREA)
+    return hashlib.blake2b(thumb.tobytes(), digest_size=16).hexdigest()
+
+
+class ScreenLayoutReader:
+    """OCR a window once with image_to_data and summarize it by layout.
+
+    Words are grouped into Tesseract lines. The lines are put in reading
+    order: blocks sorted top to bottom, and side-by-side blocks read left
+    to right. Each line is classified as a heading (noticeably taller than
+    the median line), a button (short text on a button-shaped contour) or
+    body text. Results are cached per frame signature, so re-reading an
+    unchanged window costs one thumbnail hash.
+    """
+
+    CACHE_SIZE = 4
+    MIN_WORD_CONF = 40
+    HEADING_RATIO = 1.3
+    MAX_HEADING_WORDS = 8
+    MAX_BUTTON_WORDS = 4
+
+    def __init__(self):
+        from collections import OrderedDict
+
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"reads": 0, "cache_hits": 0}
+
+    def read(self, gray, transform=None, title=""):
+        """Layout dict for a grayscale frame; transform maps it to the screen"""
+        transform = transform or CoordTransform()
+        key = (frame_signature(gray), transform.key(), gray.shape)
+        with self._lock:
+            self.stats["reads"] += 1
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.stats["cache_hits"] += 1
+                return dict(cached, title=title or cached["title"], cached=True)
+
+        with TRACER.span("vision.layout_ocr", "vision", pixels=int(gray.size)):
+            lines = self._lines(gray)
+        layout = self._classify(lines, gray, transform)
+        layout["title"] = title
+        layout["cached"] = False
+
+        with self._lock:
+            self._cache[key] = layout
+            while len(self._cache) > self.CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return layout
+
+    def _lines(self, gray):
+        data = pytesseract.image_to_data(gray, config="--oem 3 --psm 3", output_type=pytesseract.Output.DICT)
+        lines = {}
+        for i, word in enumerate(data["text"]):
+            word = (word or "").strip()
+            try:
+                conf = float(data["conf"][i])
+            except (TypeError, ValueError):
+                conf = -1
+            if not word or conf < self.MIN_WORD_CONF:
+                continue
+            key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+            x, y, w, h = data["left"][i], data["top"][i], data["width"][i], data["height"][i]
+            line = lines.get(key)
+            if line is None:
+                lines[key] = {"block": key[0], "words": [word], "box": [x, y, x + w, y + h], "heights": [h]}
+            else:
+                line["words"].append(word)
+                box = line["box"]
+                box[0], box[1] = min(box[0], x), min(box[1], y)
+                box[2], box[3] = max(box[2], x + w), max(box[3], y + h)
+                line["heights"].append(h)
+        return list(lines.values())
+
+    def _reading_order(self, lines):
+        """Sort blocks into rows by their top edge, then left to right"""
+        blocks = {}
+        for line in lines:
+            blocks.setdefault(line["block"], []).append(line)
+        boxes = {
+            b: (min(l["box"][0] for l in ls), min(l["box"][1] for l in ls), max(l["box"][3] for l in ls))
+            for b, ls in blocks.items()
+        }
+        rows = []
+        for b in sorted(boxes, key=lambda b: (boxes[b][1], boxes[b][0])):
+            left, top, bottom = boxes[b]
+            if rows and top < rows[-1][1]:
+                rows[-1][0].append(b)
+                rows[-1][1] = max(rows[-1][1], bottom)
+            else:
+                rows.append([[b], bottom])
+        result = []
+        for row, _ in rows:
+            for b in sorted(row, key=lambda b: boxes[b][0]):
+                result.extend(sorted(blocks[b], key=lambda l: (l["box"][1], l["box"][0])))
+        return result
+
+    def _classify(self, lines, gray, transform):
+        lines = self._reading_order(lines)
+        heights = [sorted(l["heights"])[len(l["heights"]) // 2] for l in lines]
+        median = sorted(heights)[len(heights) // 2] if heights else 0
+
+        _, rects = button_candidate_rects(gray)
+        rects = rects.tolist()
+
+        headings, buttons, body = [], [], []
+        for line, height in zip(lines, heights):
+            text = " ".join(line["words"])
+            x0, y0, x1, y1 = line["box"]
+            n_words = len(line["words"])
+            if n_words <= self.MAX_BUTTON_WORDS and any(
+                rx <= x0 and ry <= y0 and x1 <= rx + rw and y1 <= ry + rh for rx, ry, rw, rh in rects
+            ):
+                buttons.append(transform.box(x0, y0, x1 - x0, y1 - y0) + (text,))
+            elif median and height >= self.HEADING_RATIO * median and n_words <= self.MAX_HEADING_WORDS:
+                headings.append(text)
+            else:
+                body.append(text)
+        return {"headings": headings, "buttons": buttons, "body": body}
+
+
+def summarize_layout(layout, budget=600):
+    """Compact text view of a layout dict within budget characters"""
+    parts = []
+    if layout.get("title"):
+        parts.append(f"Window: {layout['title'][:120]}")
+    sections = [
+        ("Headings", " | ".join(layout.get("headings", [])), budget // 4),
+        ("Buttons", ", ".join(b[4] for b in layout.get("buttons", [])), budget // 4),
+    ]
+    for label, text, cap in sections:
+        if text:
+            parts.append(f"{label}: {text[:cap]}")
+    used = sum(len(p) + 1 for p in parts)
+    body = " ".join(layout.get("body", []))
+    if body and budget - used > 40:
+        parts.append(f"Text: {body[: budget - used - 6]}")
+    return "\n".join(parts)[:budget]
+
+
+# ==========================================
+# SESSION STATE
+# ==========================================
+class RingBuffer:
+    """Fixed-capacity FIFO over a preallocated list; the oldest item is overwritten.
+
+    All methods take the lock, so the UI thread can snapshot while the
+    command thread appends.
+    """
+
+    __slots__ = ("_items", "_capacity", "_next", "_size", "_lock")
+
+    def __init__(self, capacity):
+        self._items = [None] * capacity
+        self._capacity = capacity
+        self._next = 0
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def append(self, item):
+        with self._lock:
+            self._items[self._next] = item
+            self._next = (self._next + 1) % self._capacity
+            if self._size < self._capacity:
+                self._size += 1
+
+    def last(self, n):
+        """Up to n newest items, oldest first"""
+        with self._lock:
+            n = min(n, self._size)
+            return [self._items[(self._next - n + i) % self._capacity] for i in range(n)]
+
+    def snapshot(self):
+        return self.last(self._capacity)
+
+    def clear(self):
+        with self._lock:
+            self._items = [None] * self._capacity
+            self._next = 0
+            self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def __bool__(self):
+        return self._size > 0
+
+    def __iter__(self):
+        return iter(self.snapshot())
+
+
+class LRUSet:
+    """Set that keeps at most capacity members, evicting the least recently added"""
+
+    __slots__ = ("_items", "_capacity", "_lock")
+
+    def __init__(self, capacity):
+        from collections import OrderedDict
+
+        self._items = OrderedDict()
+        self._capacity = capacity
+        self._lock = threading.Lock()
+
+    def add(self, item):
+        with self._lock:
+            self._items[item] = None
+            self._items.move_to_end(item)
+            if len(self._items) > self._capacity:
+                self._items.popitem(last=False)
+
+    def update(self, items):
+        for item in items:
+            self.add(item)
+
+    def discard(self, item):
+        with self._lock:
+            self._items.pop(item, None)
+
+    def snapshot(self):
+        """Members, least recently added first"""
+        with self._lock:
+            return list(self._items)
+
+    def __contains__(self, item):
+        with self._lock:
+            return item in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def __bool__(self):
+        return bool(self._items)
+
+    def __iter__(self):
+        return iter(self.snapshot())
+
+
+class Turn:
+    """One conversation message"""
+
+    __slots__ = ("role", "message", "timestamp")
+
+    def __init__(self, role, message, timestamp=None):
+        self.role = role
+        self.message = message
+        self.timestamp = timestamp or datetime.now().isoformat()
+
+    def to_dict(self):
+        return {"role": self.role, "message": self.message, "timestamp": self.timestamp}
+
+
+# ==========================================
+# PERSISTENT MEMORY
+# ==========================================
+MEMORY_STOPWORDS = frozenset(
+    "the a an and or but to of in on at for with from by is are was were be been it this that "
+    "what which who how can could would should please just me my you your i we our us do does "
+    "did open click type press show tell find go get make let".split()
+)
+
+
+def memory_keywords(text, limit=8):
+    """Lowercase content words of text, in order, without duplicates"""
+    seen = []
+    for word in re.findall(r"[a-z0-9']{3,}", (text or "").lower()):
+        word = word.strip("'")
+        if word and word not in MEMORY_STOPWORDS and word not in seen:
+            seen.append(word)
+            if len(seen) >= limit:
+                break
+    return seen
+
+
+def app_from_title(title):
+    """Best-effort app name from a window title ("Inbox - Mozilla Firefox" -> "mozilla firefox")"""
+    if not title or title == "Unknown":
+        return None
+    return title.rsplit(" - ", 1)[-1].strip().lower() or None
+
+
+class MemoryStore:
+    """Conversation turns and actions persisted in SQLite (WAL).
+
+    Writes are queued and committed in batches by a single writer thread,
+    so add_to_history() / track_action() never wait on disk. Readers use
+    their own per-thread connections, which WAL lets run alongside the
+    writer. Keyword search uses an FTS5 index when SQLite was built with
+    it and falls back to LIKE otherwise. Once the table passes MAX_ROWS the
+    writer deletes the oldest COMPACT_BATCH rows.
+    """
+
+    MAX_ROWS = 20000
+    COMPACT_BATCH = 2000
+    WRITE_BATCH = 64
+
+    def __init__(self, path=None):
+        import sqlite3
+
+        self._sqlite3 = sqlite3
+        self.path = path or os.path.join(DATA_DIR, "memory.db")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.session = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.fts = False
+        self._local = threading.local()
+        self._queue = Queue()
+        self._rows = 0
+
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS events (
+                id INTEGER PRIMARY KEY,
+                ts REAL NOT NULL,
+                session TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                app TEXT,
+                text TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS events_ts ON events (ts);
+            CREATE INDEX IF NOT EXISTS events_kind_ts ON events (kind, ts);
+            CREATE INDEX IF NOT EXISTS events_app_ts ON events (app, ts);
+            """
+        )
+        try:
+            conn.executescript(
+                """
+                CREATE VIRTUAL TABLE IF NOT EXISTS events_fts
+                    USING fts5(text, content='events', content_rowid='id');
+                CREATE TRIGGER IF NOT EXISTS events_ai AFTER INSERT ON events BEGIN
+                    INSERT INTO events_fts(rowid, text) VALUES (new.id, new.text);
+                END;
+                CREATE TRIGGER IF NOT EXISTS events_ad AFTER DELETE ON events BEGIN
+                    INSERT INTO events_fts(events_fts, rowid, text) VALUES ('delete', old.id, old.text);
+                END;
+                """
+            )
+            self.fts = True
+        except sqlite3.OperationalError:
+            log_memory.info("SQLite FTS5 unavailable, memory search uses LIKE")
+        conn.commit()
+        self._rows = conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+        self._writer = threading.Thread(target=self._write_loop, daemon=True, name="MemoryWriter")
+        self._writer.start()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.row_factory = self._sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    # ---------- writes ----------
+
+    def append(self, kind, text, app=None):
+        """Queue one event; returns immediately"""
+        if text:
+            self._queue.put((time.time(), self.session, kind, (app or "").lower() or None, str(text)))
+
+    def flush(self, timeout=5):
+        """Block until everything queued so far is committed"""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        self._queue.put(None)
+        self._writer.join(5)
+
+    def _write_loop(self):
+        conn = self._connect()
+        while True:
+            item = self._queue.get()
+            batch, markers, stop = [], [], False
+            while True:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    markers.append(item)
+                else:
+                    batch.append(item)
+                if stop or len(batch) >= self.WRITE_BATCH:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except:
+                    break
+            if batch:
+                try:
+                    with conn:
+                        conn.executemany(
+                            "INSERT INTO events (ts, session, kind, app, text) VALUES (?, ?, ?, ?, ?)", batch
+                        )
+                    self._rows += len(batch)
+                    if self._rows > self.MAX_ROWS:
+                        self._compact(conn)
+                except Exception as e:
+                    log_memory.warning("Memory write error: %s", e)
+            for marker in markers:
+                marker.set()
+            if stop:
+                conn.close()
+                return
+
+    def _compact(self, conn):
+        """Drop the oldest rows so the store stays bounded"""
+        excess = self._rows - self.MAX_ROWS + self.COMPACT_BATCH
+        with conn:
+            conn.execute(
+                "DELETE FROM events WHERE id IN (SELECT id FROM events ORDER BY id LIMIT ?)", (excess,)
+            )
+        self._rows = conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+        log_memory.debug("Memory compacted to %d rows", self._rows)
+
+    # ---------- reads ----------
+
+    def _query(self, sql, args=()):
+        try:
+            return [dict(row) for row in self._connect().execute(sql, args).fetchall()]
+        except Exception as e:
+            log_memory.warning("Memory query error: %s", e)
+            return []
+
+    @staticmethod
+    def _kinds_clause(kinds, column="kind"):
+        if not kinds:
+            return "", ()
+        return f" AND {column} IN ({','.join('?' * len(kinds))})", tuple(kinds)
+
+    def recent(self, limit=10, kinds=None):
+        """Newest events, returned oldest first"""
+        clause, args = self._kinds_clause(kinds)
+        rows = self._query(f"SELECT * FROM events WHERE 1=1{clause} ORDER BY id DESC LIMIT ?", args + (limit,))
+        return rows[::-1]
+
+    def by_app(self, app, limit=10, kinds=None):
+        clause, args = self._kinds_clause(kinds)
+        rows = self._query(
+            f"SELECT * FROM events WHERE app = ?{clause} ORDER BY id DESC LIMIT ?",
+            (app.lower(),) + args + (limit,),
+        )
+        return rows[::-1]
+
+    def search(self, text, limit=10, kinds=None):
+        """Events matching any keyword of text, best matches first"""
+        words = memory_keywords(text)
+        if not words:
+            return []
+        if self.fts:
+            clause, args = self._kinds_clause(kinds, "e.kind")
+            match = " OR ".join(f'"{w}"' for w in words)
+            return self._query(
+                "SELECT e.* FROM events_fts f JOIN events e ON e.id = f.rowid "
+                f"WHERE events_fts MATCH ?{clause} ORDER BY bm25(events_fts), e.id DESC LIMIT ?",
+                (match,) + args + (limit,),
+            )
+        clause, args = self._kinds_clause(kinds)
+        likes = " OR ".join("text LIKE ?" for _ in words)
+        return self._query(
+            f"SELECT * FROM events WHERE ({likes}){clause} ORDER BY id DESC LIMIT ?",
+            tuple(f"%{w}%" for w in words) + args + (limit,),
+        )
+
+    def since(self, after_id, limit=1000):
+        """Events with id greater than after_id, oldest first"""
+        return self._query("SELECT * FROM events WHERE id > ? ORDER BY id LIMIT ?", (after_id, limit))
+
+    def min_id(self):
+        rows = self._query("SELECT MIN(id) AS id FROM events")
+        return rows[0]["id"] if rows else None
+
+    def relevant_turns(self, message, app=None, recent=4, related=4):
+        """The latest turns plus older turns that share keywords or the app"""
+        kinds = ("user", "assistant")
+        picked = {row["id"]: row for row in self.recent(recent, kinds)}
+        for row in self.search(message, related * 2, kinds):
+            if len(picked) >= recent + related:
+                break
+            picked.setdefault(row["id"], row)
+        if app and len(picked) < recent + related:
+            for row in self.by_app(app, related, kinds)[::-1]:
+                if len(picked) >= recent + related:
+                    break
+                picked.setdefault(row["id"], row)
+        return [picked[i] for i in sorted(picked)]
+
+    def stats(self):
+        return {"rows": self._rows, "pending_writes": self._queue.qsize(), "fts": self.fts, "path": self.path}
+
+
+def estimate_tokens(text):
+    """Rough token count for prompt budgeting (~4 characters per token)"""
+    return len(text) // 4 + 1
+
+
+class HistoryIndex:
+    """TF-IDF retrieval over the MemoryStore, fully offline in numpy.
+
+    Each event is kept as a short array of (term id, 1 + log tf) pairs.
+    refresh() only tokenizes rows newer than the last one indexed, and it
+    drops rows that compaction has deleted. Document frequencies and norms
+    are recomputed with bincount when the corpus changes, which costs a few
+    milliseconds even for a full store. top_k() scores by cosine similarity,
+    boosts rows from the current app and fills a token budget with the best
+    matches. refresh() and the rebuild run under a lock; scoring works on a
+    snapshot taken under it, so concurrent callers never see a half-built
+    index.
+    """
+
+    MIN_SCORE = 0.12
+    APP_BOOST = 1.25
+    REFRESH_BATCH = 2000
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._vocab = {}
+        self._docs = []  # (row id, term ids, weights, row)
+        self._last_id = 0
+        self._matrix = None
+
+    def _terms(self, text):
+        words = [w.strip("'") for w in re.findall(r"[a-z0-9']{2,}", (text or "").lower())]
+        counts = {}
+        for word in words:
+            if word and word not in MEMORY_STOPWORDS:
+                counts[word] = counts.get(word, 0) + 1
+        return counts
+
+    def refresh(self):
+        """Index rows added since the last call and forget compacted ones"""
+        with self._lock:
+            self._refresh()
+
+    def _refresh(self):
+        oldest = self.store.min_id()
+        if self._docs and oldest and self._docs[0][0] < oldest:
+            self._docs = [doc for doc in self._docs if doc[0] >= oldest]
+            self._matrix = None
+        while True:
+            rows = self.store.since(self._last_id, self.REFRESH_BATCH)
+            if not rows:
+                break
+            for row in rows:
+                counts = self._terms(row["text"])
+                if counts:
+                    ids = np.fromiter((self._vocab.setdefault(t, len(self._vocab)) for t in counts), np.int32, len(counts))
+                    weights = 1.0 + np.log(np.fromiter(counts.values(), np.float32, len(counts)))
+                    self._docs.append((row["id"], ids, weights, row))
+                self._last_id = row["id"]
+            self._matrix = None
+
+    def _build(self):
+        """Recompute idf, weights and norms (lock held)"""
+        lengths = np.fromiter((len(doc[1]) for doc in self._docs), np.int64, len(self._docs))
+        doc_of = np.repeat(np.arange(len(self._docs)), lengths)
+        terms = np.concatenate([doc[1] for doc in self._docs])
+        tf = np.concatenate([doc[2] for doc in self._docs])
+        df = np.bincount(terms, minlength=len(self._vocab))
+        idf = (np.log((len(self._docs) + 1) / (df + 1)) + 1.0).astype(np.float32)
+        weights = tf * idf[terms]
+        norms = np.sqrt(np.bincount(doc_of, weights * weights, minlength=len(self._docs)))
+        self._matrix = (doc_of, terms, weights, norms, idf)
+
+    def top_k(self, query, k=6, budget=None, kinds=None, exclude=(), app=None):
+        """Best-matching rows, oldest first, within budget estimated tokens
+
+        Rows recorded in app score APP_BOOST times higher.
+        """
+        terms_in_query = self._terms(query)
+        with self._lock:
+            self._refresh()
+            counts = {self._vocab[t]: c for t, c in terms_in_query.items() if t in self._vocab}
+            if not counts or not self._docs:
+                return []
+            if self._matrix is None:
+                self._build()
+            docs = list(self._docs)
+            doc_of, terms, weights, norms, idf = self._matrix
+
+        query_weights = np.zeros(len(idf), np.float32)
+        for col, count in counts.items():
+            query_weights[col] = (1.0 + np.log(count)) * idf[col]
+        contrib = weights * query_weights[terms]
+        hit = contrib > 0
+        scores = np.bincount(doc_of[hit], contrib[hit], minlength=len(docs))
+        scores /= np.maximum(norms, 1e-6) * np.linalg.norm(query_weights)
+        if app:
+            app = app.lower()
+            same_app = np.fromiter(((doc[3].get("app") or "").lower() == app for doc in docs), bool, len(docs))
+            scores[same_app] *= self.APP_BOOST
+
+        picked, used = [], 0
+        for i in np.argsort(-scores, kind="stable"):
+            if scores[i] < self.MIN_SCORE or len(picked) >= k:
+                break
+            row = docs[i][3]
+            if row["id"] in exclude or (kinds and row["kind"] not in kinds):
+                continue
+            cost = estimate_tokens(row["text"])
+            if budget is not None and used + cost > budget:
+                continue
+            picked.append(dict(row, score=round(float(scores[i]), 3)))
+            used += cost
+        return sorted(picked, key=lambda r: r["id"])
+
+    def stats(self):
+        with self._lock:
+            return {"documents": len(self._docs), "terms": len(self._vocab)}
+
+
+# ==========================================
+# RESPONSE CACHE
+# ==========================================
+INTENT_FILLER = re.compile(
+    r"^(?:(?:hey\s+)?mist(?:\s*ai)?|please|can you|could you|would you|will you|go ahead and|just)\s+"
+    r"|\s+(?:please|for me|now|thanks|thank you)$"
+)
+# Answers to these depend on the moment or on what "this"/"that" refers to
+CONTEXT_SENSITIVE = re.compile(
+    r"\b(?:time|date|day|today|tonight|tomorrow|yesterday|weather|news|latest|"
+    r"this|that|it|these|those|here|screen|again|last|previous)\b"
+)
+
+
+def normalize_intent(message):
+    """Lowercase, punctuation-free command with polite filler removed"""
+    text = re.sub(r"[^a-z0-9' ]+", " ", (message or "").lower())
+    text = re.sub(r"\s+", " ", text).strip()
+    previous = None
+    while text != previous:
+        previous = text
+        text = INTENT_FILLER.sub("", text).strip()
+    return text
+
+
+class ResponseCache:
+    """Parsed LLM commands for repeated requests, persisted across restarts.
+
+    Entries are keyed by the normalized intent plus a coarse context
+    fingerprint (model, voice gender, active app, whether the intent's
+    words are on screen), expire after TTL seconds and are evicted least recently used
+    beyond MAX_ENTRIES. Only answers that do not depend on the moment are
+    stored: no time/date or deictic requests, no plain chat (action
+    "none"), and no click whose target was not visible when it was asked.
+    The file is rewritten on every store, so it is only read at startup.
+    """
+
+    MAX_ENTRIES = 200
+    TTL = 24 * 3600
+
+    def __init__(self, path=None):
+        from collections import OrderedDict
+
+        self.path = path or os.path.join(DATA_DIR, "response_cache.json")
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "stored": 0, "skipped": 0}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        for key, entry in entries.items():
+            if now - entry.get("stored", 0) < self.TTL:
+                self._entries[key] = entry
+
+    def _save(self):
+        tmp_path = self.path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            log_llm.warning("Response cache write error: %s", e)
+
+    @staticmethod
+    def fingerprint(intent, model, active_window, screen_text, gender="none"):
+        """Coarse context: model, voice gender, active app and whether the intent's words are visible"""
+        words = memory_keywords(intent)
+        screen_lower = (screen_text or "").lower()
+        visible = bool(words) and all(word in screen_lower for word in words)
+        return f"{model}|{gender or 'none'}|{app_from_title(active_window) or '-'}|{'visible' if visible else 'hidden'}"
+
+    @staticmethod
+    def cacheable(intent, command, screen_text=""):
+        if not intent or CONTEXT_SENSITIVE.search(intent):
+            return False
+        action = command.get("action") or "none"
+        if action == "none":
+            return False
+        if action == "click_on_text":
+            target = str(command.get("parameter") or "").lower()
+            return bool(target) and target in (screen_text or "").lower()
+        return True
+
+    def get(self, intent, fingerprint):
+        key = f"{fingerprint}|{intent}"
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry["stored"] >= self.TTL:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            entry["hits"] = entry.get("hits", 0) + 1
+            self.stats["hits"] += 1
+            return dict(entry["command"])
+
+    def put(self, intent, fingerprint, command, screen_text=""):
+        """Store command if it is safe to replay; returns whether it was stored"""
+        if not self.cacheable(intent, command, screen_text):
+            self.stats["skipped"] += 1
+            return False
+        with self._lock:
+            key = f"{fingerprint}|{intent}"
+            self._entries.pop(key, None)
+            self._entries[key] = {"command": dict(command), "stored": time.time(), "hits": 0}
+            while len(self._entries) > self.MAX_ENTRIES:
+                self._entries.popitem(last=False)
+            self.stats["stored"] += 1
+            self._save()
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._save()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# ==========================================
+# COMMAND LOOP
+# ==========================================
+class CommandCancelled(Exception):
+    """Raised inside a command when a newer command pre-empts it"""
+
+
+# Cancel token (and actuation executor) of the command running on the current worker thread
+_command_state = threading.local()
+
+
+def check_cancelled():
+    """Raise CommandCancelled if the current command has been pre-empted"""
+    token = getattr(_command_state, "token", None)
+    if token is not None and token.is_set():
+        raise CommandCancelled()
+
+
+def command_sleep(seconds):
+    """time.sleep that returns early when the current command is cancelled"""
+    token = getattr(_command_state, "token", None)
+    if token is None:
+        time.sleep(seconds)
+        return
+    if token.wait(seconds):
+        raise CommandCancelled()
+
+
+def actuate(fn, *args, **kwargs):
+    """Run one UI-actuation call (pyautogui, typing, window focus) and wait
+
+    Inside a command body (CommandLoop.run_command) the call is handed to
+    the single actuation thread, so the body's OCR never holds that thread.
+    Outside a command it runs inline.
+    """
+    executor = getattr(_command_state, "ui_executor", None)
+    if executor is None:
+        return fn(*args, **kwargs)
+    call = functools.partial(fn, *args, **kwargs)
+    return executor.submit(CommandLoop._with_token, _command_state.token, call, ()).result()
+
+
+class CommandLoop:
+    """Single asyncio event loop that schedules every command
+
+    Commands are coroutine functions taking a cancel token. They go through
+    a bounded queue and run one at a time; submitting with preempt=True
+    cancels the running command and drops anything still pending. All
+    pyautogui work goes through the one-thread actuation executor (run_ui,
+    or actuate() from a command body), so two commands can never drive the
+    mouse and keyboard at once. Blocking OCR, HTTP and audio calls go
+    through run_blocking; run_command runs a whole command body there.
+
+    Cancellation is cooperative on the worker threads: the token is set and
+    command_sleep / check_cancelled raise CommandCancelled at the next
+    checkpoint.
+    """
+
+    def __init__(self, max_pending=3, blocking_workers=3):
+        self.max_pending = max_pending
+        self.ui_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mistai-ui")
+        self.blocking_executor = ThreadPoolExecutor(
+            max_workers=blocking_workers, thread_name_prefix="mistai-blocking"
+        )
+        self.loop = asyncio.new_event_loop()
+        self.queue = None
+        self.current = None  # (name, task, token)
+        self._ready = threading.Event()
+
+        self.thread = threading.Thread(target=self._run, name="mistai-loop", daemon=True)
+        self.thread.start()
+        self._ready.wait(5)
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.queue = asyncio.Queue(maxsize=self.max_pending)
+        self.loop.create_task(self._consume())
+        self._ready.set()
+        self.loop.run_forever()
+
+    async def _consume(self):
+        while True:
+            name, job, token = await self.queue.get()
+            try:
+                if token.is_set():
+                    continue
+                task = self.loop.create_task(job(token))
+                self.current = (name, task, token)
+                try:
+                    await task
+                except (asyncio.CancelledError, CommandCancelled):
+                    log_commands.info("Command '%s' cancelled", name)
+                except Exception as e:
+                    log_commands.exception("Command '%s' failed: %s", name, e)
+            finally:
+                self.current = None
+                self.queue.task_done()
+
+    # ---------- scheduling (any thread) ----------
+
+    def submit(self, name, job, preempt=True):
+        """Queue job(token) for execution; returns the command's cancel token"""
+        token = threading.Event()
+        self.loop.call_soon_threadsafe(self._enqueue, name, job, token, preempt)
+        return token
+
+    def cancel(self):
+        """Cancel the running command and everything pending"""
+        self.loop.call_soon_threadsafe(self._cancel_all)
+
+    def run_in_background(self, fn, *args):
+        """Fire-and-forget a blocking call on the blocking pool"""
+
+        async def runner():
+            try:
+                await self.run_blocking(fn, *args)
+            except Exception as e:
+                log_commands.exception("Background task error: %s", e)
+
+        return asyncio.run_coroutine_threadsafe(runner(), self.loop)
+
+    def shutdown(self):
+        try:
+            self.cancel()
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        except RuntimeError:
+            pass
+        self.ui_executor.shutdown(wait=False, cancel_futures=True)
+        self.blocking_executor.shutdown(wait=False, cancel_futures=True)
+
+    # ---------- loop thread only ----------
+
+    def _enqueue(self, name, job, token, preempt):
+        if preempt:
+            self._cancel_all()
+        while self.queue.full():
+            stale_name, _, stale_token = self.queue.get_nowait()
+            stale_token.set()
+            self.queue.task_done()
+            log_commands.warning("Command queue full, dropping '%s'", stale_name)
+        self.queue.put_nowait((name, job, token))
+
+    def _cancel_all(self):
+        while not self.queue.empty():
+            _, _, stale_token = self.queue.get_nowait()
+            stale_token.set()
+            self.queue.task_done()
+        if self.current:
+            name, task, token = self.current
+            token.set()
+            task.cancel()
+            log_commands.info("Pre-empting '%s'", name)
+
+    # ---------- executors (await from jobs) ----------
+
+    async def run_ui(self, token, fn, *args):
+        """Run a UI-actuation call on the single actuation thread"""
+        return await self.loop.run_in_executor(self.ui_executor, self._with_token, token, fn, args)
+
+    async def run_blocking(self, fn, *args):
+        """Run a blocking OCR / HTTP / audio call on the blocking pool"""
+        return await self.loop.run_in_executor(self.blocking_executor, functools.partial(fn, *args))
+
+    async def run_command(self, token, fn, *args):
+        """Run a command body on the blocking pool; its actuate() calls go to the actuation thread"""
+        return await self.loop.run_in_executor(self.blocking_executor, self._run_body, token, fn, args)
+
+    def _run_body(self, token, fn, args):
+        _command_state.ui_executor = self.ui_executor
+        try:
+            return self._with_token(token, fn, args)
+        finally:
+            _command_state.ui_executor = None
+
+    @staticmethod
+    def _with_token(token, fn, args):
+        _command_state.token = token
+        try:
+            check_cancelled()
+            return fn(*args)
+        finally:
+            _command_state.token = None
+
+
+# ==========================================
+# SPEECH OUTPUT
+# ==========================================
+# Phrases spoken often enough to keep pre-rendered on disk
+COMMON_PHRASES = (
+    "Yes, sir?",
+    "Sorry, I couldn't process that.",
+    "Sorry, that took too long.",
+    "Sorry, I can't connect to my brain.",
+    "Sorry, something went wrong.",
+    "Sorry, I couldn't complete that task.",
+)
+
+
+class SpeechOutput:
+    """Text-to-speech with pre-synthesis, caching and barge-in.
+
+    A synthesis thread owns the pyttsx3 engine (SAPI is thread-affine) and
+    renders each sentence to WAV bytes with save_to_file(); a playback
+    thread streams them through PyAudio in small chunks. The hand-off queue
+    holds one sentence, so sentence N+1 is rendered while N plays.
+    interrupt() bumps a generation counter and stops the current chunk
+    loop, which cancels speech already in progress rather than only the
+    backlog.
+
+    Rendered audio is kept in an in-memory LRU; phrases in COMMON_PHRASES
+    or heard twice are also written to ~/MistAI/tts_cache. When WAV
+    rendering or PyAudio is unavailable the engine speaks directly, as
+    before, and interrupt() falls back to engine.stop().
+    """
+
+    RATE = 175
+    CHUNK_FRAMES = 1024
+    MEMORY_CACHE_BYTES = 16 * 1024 * 1024
+    DISK_CACHE_FILES = 200
+    DISK_CACHE_AFTER_HITS = 2
+    MAX_SEEN = 1000  # phrases whose repeat count is tracked
+
+    def __init__(self, on_utterance=None, cache_dir=None):
+        self.on_utterance = on_utterance
+        self.cache_dir = cache_dir or os.path.join(DATA_DIR, "tts_cache")
+        self.engine = None
+        self.ready = threading.Event()
+        self.stats = {"synthesized": 0, "memory_hits": 0, "disk_hits": 0, "interrupted": 0, "direct": 0}
+
+        self._generation = 0
+        self._stop = threading.Event()
+        self._text_queue = Queue()
+        self._audio_queue = Queue(maxsize=1)
+        self._memory = {}
+        self._memory_bytes = 0
+        from collections import OrderedDict
+
+        self._seen = OrderedDict()
+        # Guards _memory, _seen and stats
+        self._cache_lock = threading.Lock()
+        self._render_ok = None
+        self._pyaudio = None
+        self._playing = False
+
+        self._synth_thread = threading.Thread(target=self._synth_worker, daemon=True, name="TTSSynth")
+        self._play_thread = threading.Thread(target=self._play_worker, daemon=True, name="TTSPlayback")
+        self._synth_thread.start()
+        self._play_thread.start()
+
+    # ---------- public ----------
+
+    def speak(self, text, interrupt=False):
+        if interrupt:
+            self.interrupt()
+        if text:
+            self._text_queue.put((self._generation, text))
+
+    def interrupt(self):
+        """Drop queued sentences and cut off the one that is playing"""
+        self._generation += 1
+        self._stop.set()
+        for q in (self._text_queue, self._audio_queue):
+            while True:
+                try:
+                    q.get_nowait()
+                except:
+                    break
+        if self._playing:
+            self._count("interrupted")
+        if self._render_ok is False and self.engine is not None:
+            try:
+                self.engine.stop()
+            except:
+                pass
+
+    def warm(self, timeout=10):
+        """Create the engine and pre-render COMMON_PHRASES in the background"""
+        self._text_queue.put((None, None))
+        self.ready.wait(timeout)
+
+    def is_speaking(self):
+        return self._playing or not self._text_queue.empty() or not self._audio_queue.empty()
+
+    # ---------- synthesis thread ----------
+
+    def _ensure_engine(self):
+        if self.engine is None:
+            with STARTUP.phase("tts engine"):
+                self.engine = pyttsx3.init()
+                self.engine.setProperty("rate", self.RATE)
+                self.engine.setProperty("volume", 1.0)
+            self.ready.set()
+        return self.engine
+
+    def _synth_worker(self):
+        while True:
+            generation, text = self._text_queue.get()
+            try:
+                self._ensure_engine()
+            except Exception as e:
+                log_voice.error("TTS init error: %s", e)
+                self.ready.set()
+                continue
+
+            if text is None:
+                # Warm-up request: fill the disk cache for the stock phrases
+                for phrase in COMMON_PHRASES:
+                    if self._text_queue.empty():
+                        self._render(phrase, persist=True)
+                continue
+
+            if generation != self._generation:
+                continue
+            if self.on_utterance:
+                self.on_utterance(text)
+
+            sentences = split_sentences(text)
+            for sentence in sentences:
+                if generation != self._generation:
+                    break
+                audio = self._render(sentence)
+                if audio is None or not self._playback_available():
+                    self._speak_direct(sentence)
+                    continue
+                self._audio_queue.put((generation, sentence, audio))
+
+    def _cache_key(self, text):
+        voice = ""
+        try:
+            voice = self.engine.getProperty("voice") or ""
+        except:
+            pass
+        return hashlib.sha1(f"{voice}|{self.RATE}|{text}".encode("utf-8")).hexdigest()
+
+    def _render(self, text, persist=False):
+        """Return WAV bytes for text from cache or the engine, or None"""
+        if self._render_ok is False:
+            return None
+        key = self._cache_key(text)
+        with self._cache_lock:
+            audio = self._memory.pop(key, None)
+            if audio is not None:
+                self._memory[key] = audio
+                self.stats["memory_hits"] += 1
+                return audio
+            seen = self._seen.pop(key, 0) + 1
+            self._seen[key] = seen
+            if len(self._seen) > self.MAX_SEEN:
+                self._seen.popitem(last=False)
+            persist = persist or text in COMMON_PHRASES or seen >= self.DISK_CACHE_AFTER_HITS
+
+        path = os.path.join(self.cache_dir, f"{key}.wav")
+        audio = None
+        try:
+            with open(path, "rb") as f:
+                audio = f.read()
+            self._count("disk_hits")
+        except OSError:
+            pass
+
+        if audio is None:
+            with TRACER.span("tts.synthesize", "tts", chars=len(text)):
+                audio = self._synthesize(text)
+            if audio is None:
+                return None
+            self._count("synthesized")
+            if persist:
+                self._persist(path, audio)
+
+        self._remember(key, audio)
+        return audio
+
+    def _synthesize(self, text):
+        import tempfile
+
+        fd, tmp_path = tempfile.mkstemp(suffix=".wav", prefix="mistai_tts_")
+        os.close(fd)
+        try:
+            self.engine.save_to_file(text, tmp_path)
+            self.engine.runAndWait()
+            with open(tmp_path, "rb") as f:
+                audio = f.read()
+            if len(audio) <= 44:
+                raise ValueError("engine produced no audio")
+            self._render_ok = True
+            return audio
+        except Exception as e:
+            if self._render_ok is None:
+                log_voice.warning("WAV rendering unavailable, speaking directly: %s", e)
+                self._render_ok = False
+            return None
+        finally:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def _count(self, stat):
+        with self._cache_lock:
+            self.stats[stat] += 1
+
+    def _remember(self, key, audio):
+        with self._cache_lock:
+            if key in self._memory:
+                return
+            self._memory[key] = audio
+            self._memory_bytes += len(audio)
+            while self._memory_bytes > self.MEMORY_CACHE_BYTES and len(self._memory) > 1:
+                oldest = next(iter(self._memory))
+                self._memory_bytes -= len(self._memory.pop(oldest))
+
+    def _persist(self, path, audio):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(audio)
+            files = [os.path.join(self.cache_dir, n) for n in os.listdir(self.cache_dir) if n.endswith(".wav")]
+            if len(files) > self.DISK_CACHE_FILES:
+                files.sort(key=os.path.getmtime)
+                for stale in files[: len(files) - self.DISK_CACHE_FILES]:
+                    os.remove(stale)
+        except OSError as e:
+            log_voice.warning("TTS cache write error: %s", e)
+
+    def _speak_direct(self, text):
+        self._count("direct")
+        self._playing = True
+        try:
+            with TRACER.span("tts.speak", "tts", chars=len(text), mode="direct"):
+                self.engine.say(text)
+                self.engine.runAndWait()
+        finally:
+            self._playing = False
+
+    # ---------- playback thread ----------
+
+    def _playback_available(self):
+        if self._pyaudio is None:
+            try:
+                self._pyaudio = pyaudio.PyAudio()
+            except Exception as e:
+                log_voice.warning("Audio playback unavailable, speaking directly: %s", e)
+                self._pyaudio = False
+        return self._pyaudio is not False
+
+    def _play_worker(self):
+        import io
+        import wave
+
+        while True:
+            generation, sentence, audio = self._audio_queue.get()
+            if generation != self._generation:
+                continue
+            self._stop.clear()
+            self._playing = True
+            stream = None
+            try:
+                with TRACER.span("tts.speak", "tts", chars=len(sentence)) as span, wave.open(io.BytesIO(audio), "rb") as wav:
+                    stream = self._pyaudio.open(
+                        format=self._pyaudio.get_format_from_width(wav.getsampwidth()),
+                        channels=wav.getnchannels(),
+                        rate=wav.getframerate(),
+                        output=True,
+                    )
+                    data = wav.readframes(self.CHUNK_FRAMES)
+                    while data and not self._stop.is_set() and generation == self._generation:
+                        stream.write(data)
+                        data = wav.readframes(self.CHUNK_FRAMES)
+                    span.set(interrupted=self._stop.is_set())
+            except Exception as e:
+                log_voice.warning("Playback error: %s", e)
+            finally:
+                if stream is not None:
+                    try:
+                        stream.stop_stream()
+                        stream.close()
+                    except:
+                        pass
+                self._playing = False
+
+
+def split_sentences(text):
+    """Split text at sentence boundaries so playback can start early"""
+    parts = [p.strip() for p in re.split(r"(?<=[.!?])\s+", text.strip())]
+    return [p for p in parts if p] or [text]
+
+
+class SimpleCaptionWindow:
+    """Simple, reliable Tkinter caption overlay.
+
+    show() appends to a bounded queue and, unless one is already pending,
+    posts a <<Caption>> virtual event; the Tk thread drains the queue when
+    it arrives, coalescing every caption since the last drain into one
+    repaint. Nothing runs while no captions come in. Captions posted before
+    the event binding exists are drained once before mainloop starts.
+    """
+
+    READY_TIMEOUT = 5
+    MAX_PENDING = 8
+
+    def __init__(self):
+        self.root = None
+        self.label = None
+        self.ready = threading.Event()
+        self.running = True
+        # Only the newest caption of a burst is shown, so old ones can fall off
+        self._pending = deque(maxlen=self.MAX_PENDING)
+        self._pending_lock = threading.Lock()
+        self._wakeup_posted = False
+        self._bound = False
+        self._hide_job = None
+
+        self.thread = threading.Thread(target=self._run_tk, daemon=True)
+        self.thread.start()
+
+        # Wait for window to be ready
+        self.ready.wait(self.READY_TIMEOUT)
+
+    @property
+    def is_ready(self):
+        return self.ready.is_set() and self.root is not None
+
+    def _run_tk(self):
+        """Run Tkinter in its own thread"""
+        try:
+            self.root = tk.Tk()
+            self.root.overrideredirect(True)
+            self.root.attributes("-topmost", True)
+            self.root.attributes("-alpha", 0.0)
+            self.root.configure(bg="black")
+
+            if os.name == "nt":
+                self.root.attributes("-transparentcolor", "black")
+
+            # Position at bottom of screen
+            sw = self.root.winfo_screenwidth()
+            sh = self.root.winfo_screenheight()
+            w = int(sw * 0.7)
+            h = 100
+            x = (sw - w) // 2
+            y = sh - 200
+            self.root.geometry(f"{w}x{h}+{x}+{y}")
+
+            # Create label
+            font_ = tkfont.Font(family="Segoe UI", size=15, weight="bold")
+            self.label = tk.Label(
+                self.root,
+                text="",
+                font=font_,
+                fg="white",
+                bg="#1a1a2e",
+                wraplength=w - 40,
+                padx=20,
+                pady=15,
+                justify="center",
+            )
+            self.label.pack(fill="both", expand=True)
+        except Exception as e:
+            log_ui.error("Caption window error: %s", e)
+            self.root = None
+            self.ready.set()
+            return
+
+        self.root.bind("<<Caption>>", self._drain)
+        with self._pending_lock:
+            self._bound = True
+        self.ready.set()
+        # Picks up captions queued before the binding existed
+        self._drain()
+        self.root.mainloop()
+
+    def _wake(self):
+        """Post one <<Caption>> event to the Tk thread unless one is pending"""
+        with self._pending_lock:
+            if not self._bound or self._wakeup_posted:
+                return
+            self._wakeup_posted = True
+        try:
+            self.root.event_generate("<<Caption>>", when="tail")
+        except Exception as e:
+            log_ui.debug("Caption wakeup failed: %s", e)
+
+    def _drain(self, event=None):
+        """Tk thread: render the newest pending caption"""
+        with self._pending_lock:
+            self._wakeup_posted = False
+            newest = self._pending[-1] if self._pending else None
+            self._pending.clear()
+        if not self.running:
+            self.root.quit()
+            return
+        if newest:
+            try:
+                self._display(*newest)
+            except Exception as e:
+                log_ui.error("Caption display error: %s", e)
+
+    def _display(self, text, kind, duration):
+        """Display a caption"""
+        colors = {
+            "error": ("#ef4444", "white"),
+            "assistant": ("#10b981", "white"),
+            "system": ("#fbbf24", "black"),
+            "suggestion": ("#8b5cf6", "white"),
+        }
+        bg, fg = colors.get(kind, ("#1a1a2e", "white"))
+
+        # A newer caption owns the window; its predecessor's timer must not hide it
+        if self._hide_job is not None:
+            self.root.after_cancel(self._hide_job)
+            self._hide_job = None
+
+        self.label.config(text=text, bg=bg, fg=fg)
+        self.root.attributes("-alpha", 0.95)
+
+        if duration > 0:
+            self._hide_job = self.root.after(int(duration * 1000), self._hide)
+
+    def _hide(self):
+        """Hide the window"""
+        self._hide_job = None
+        try:
+            self.root.attributes("-alpha", 0.0)
+        except:
+            pass
+
+    def show(self, text, kind="system", duration=6):
+        """Show a caption (thread-safe)"""
+        if not self.running:
+            return
+        with self._pending_lock:
+            self._pending.append((text, kind, duration))
+        self._wake()
+
+    def destroy(self):
+        """Clean up; the Tk thread quits when it handles the wakeup"""
+        self.running = False
+        self._wake()
+
+
+class CaptionScheduler:
+    """Rate-limits and prioritizes captions in front of a SimpleCaptionWindow.
+
+    Priority classes are error > assistant > system > suggestion. A higher
+    class replaces the current caption immediately, the same class waits
+    MIN_DISPLAY seconds, and a lower class waits until the current caption's
+    duration has run out. A newer caption supersedes a waiting one of the
+    same class, which collapses progress/done pairs ("Looking for 'X'..." ->
+    "Clicked 'X'") into one repaint. The pending list is bounded; the
+    lowest-priority, oldest captions are dropped first.
+    """
+
+    PRIORITY = {"error": 0, "assistant": 1, "system": 2, "suggestion": 3}
+    MIN_DISPLAY = 0.8
+    MAX_PENDING = 4
+
+    def __init__(self, window):
+        self.window = window
+        self._cond = threading.Condition()
+        self._pending = []  # [priority, seq, text, kind, duration, queued_at]
+        self._seq = 0
+        self._current = None  # (priority, text, shown_at, duration)
+        self._running = True
+        self.stats = {"submitted": 0, "shown": 0, "merged": 0, "dropped": 0}
+        self._thread = threading.Thread(target=self._run, daemon=True, name="CaptionScheduler")
+        self._thread.start()
+
+    def submit(self, text, kind="system", duration=6):
+        priority = self.PRIORITY.get(kind, self.PRIORITY["system"])
+        with self._cond:
+            self.stats["submitted"] += 1
+            now = time.perf_counter()
+            current = self._current
+            if current and current[1] == text and now < current[2] + current[3]:
+                self.stats["merged"] += 1
+                return
+            waiting = len(self._pending)
+            self._pending = [p for p in self._pending if p[0] != priority]
+            self.stats["merged"] += waiting - len(self._pending)
+
+            self._seq += 1
+            self._pending.append([priority, self._seq, text, kind, duration, now])
+            while len(self._pending) > self.MAX_PENDING:
+                victim = max(self._pending, key=lambda p: (p[0], -p[1]))
+                self._pending.remove(victim)
+                self.stats["dropped"] += 1
+            self._cond.notify()
+
+    def _next_ready(self, now):
+        """Return (entry, None) if something can be shown now, else (None, seconds to wait)"""
+        # Captions that outlived their own duration while waiting are stale
+        fresh = [p for p in self._pending if p[4] <= 0 or now < p[5] + p[4]]
+        self.stats["dropped"] += len(self._pending) - len(fresh)
+        self._pending = fresh
+        if not fresh:
+            return None, None
+
+        best = min(fresh, key=lambda p: (p[0], -p[1]))
+        current = self._current
+        if current is None or best[0] < current[0]:
+            return best, None
+        if best[0] == current[0]:
+            ready_at = current[2] + self.MIN_DISPLAY
+        else:
+            ready_at = current[2] + max(current[3], self.MIN_DISPLAY)
+        if ready_at <= now:
+            return best, None
+        return None, ready_at - now
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if not self._running:
+                        return
+                    entry, wait = self._next_ready(time.perf_counter())
+                    if entry is not None:
+                        break
+                    self._cond.wait(wait)
+                self._pending.remove(entry)
+                priority, _, text, kind, duration, _ = entry
+                self._current = (priority, text, time.perf_counter(), duration)
+                self.stats["shown"] += 1
+            self.window.show(text, kind, duration)
+
+    def close(self):
+        with self._cond:
+            self._running = False
+            self._pending.clear()
+            self._cond.notify()
+
+
+# ==========================================
+# UI EVENTS
+# ==========================================
+class UIEventChannel:
+    """Typed, batched events from Python to the web UI.
+
+    emit() validates the event against UI_EVENTS and queues it without
+    touching the webview. A flusher thread collects whatever arrives
+    within FLUSH_INTERVAL and delivers the batch as JSON in a single
+    evaluate_js call to window.__mistaiDispatch. The page queues the events
+    and applies them on the next animation frame. Worker threads never
+    wait on the cross-process round trip, and no text is spliced into
+    JavaScript source. Events emitted before attach() are held (up to
+    MAX_PENDING) and sent once the window exists.
+    """
+
+    # event type -> required payload fields
+    UI_EVENTS = {
+        "wake_word": (),
+        "wake_command": ("command", "response"),
+        "suggestion": ("text",),
+        "voice_result": ("text",),
+        "voice_error": ("message",),
+        "voice_end": (),
+        "status": ("online", "reason"),
+        "memory": ("conversation_length", "actions_performed", "wake_word_active", "proactive_mode", "captions_enabled"),
+    }
+    FLUSH_INTERVAL = 0.016
+    MAX_PENDING = 256
+
+    def __init__(self):
+        self.window = None
+        self._cond = threading.Condition()
+        self._pending = deque(maxlen=self.MAX_PENDING)
+        self._running = True
+        self.stats = {"emitted": 0, "batches": 0, "errors": 0}
+        self._thread = threading.Thread(target=self._run, daemon=True, name="UIEvents")
+        self._thread.start()
+
+    def attach(self, window):
+        with self._cond:
+            self.window = window
+            self._cond.notify()
+
+    def emit(self, event_type, **payload):
+        fields = self.UI_EVENTS.get(event_type)
+        if fields is None:
+            raise ValueError(f"Unknown UI event: {event_type}")
+        missing = [f for f in fields if f not in payload]
+        if missing:
+            raise ValueError(f"UI event {event_type} missing {', '.join(missing)}")
+        event = dict(payload, type=event_type)
+        with self._cond:
+            self._pending.append(event)
+            self.stats["emitted"] += 1
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and (not self._pending or self.window is None):
+                    self._cond.wait()
+                if not self._running:
+                    return
+            # Let a burst of events land in the same batch
+            time.sleep(self.FLUSH_INTERVAL)
+            with self._cond:
+                batch = list(self._pending)
+                self._pending.clear()
+                window = self.window
+            try:
+                payload = json.dumps(batch, default=str)
+                with TRACER.span("ui.flush", "ui", events=len(batch)):
+                    window.evaluate_js(f"window.__mistaiDispatch({payload})")
+                self.stats["batches"] += 1
+            except Exception as e:
+                self.stats["errors"] += 1
+                log_ui.warning("UI event delivery failed (%s events): %s", len(batch), e)
+
+    def close(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+
+
+# ==========================================
+# BACKEND HEALTH
+# ==========================================
+class HealthMonitor:
+    """Backend status derived from real traffic, probed only when idle.
+
+    Every API request reports its outcome through record(): a response
+    below 500 means the backend is up, and FAILURES_TO_OFFLINE failures in
+    a row mean it is down. STATUS_URL is only polled after IDLE_PROBE
+    seconds without any outcome (RETRY_PROBE while offline), so an active
+    session never pays for status checks. on_change(status) is called only
+    when the online flag or the reason changes.
+    """
+
+    IDLE_PROBE = 120
+    RETRY_PROBE = 20
+    FAILURES_TO_OFFLINE = 2
+    PROBE_TIMEOUT = 3
+
+    def __init__(self, on_change=None):
+        self.on_change = on_change
+        self._lock = threading.Lock()
+        self._online = None
+        self._reason = "Checking..."
+        self._failures = 0
+        # The startup probe (Api._warm_http) provides the first reading
+        self._last_outcome = time.time()
+        self._checked = None
+        self._source = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="HealthMonitor")
+        self._thread.start()
+
+    def status(self):
+        with self._lock:
+            return {
+                "online": bool(self._online),
+                "reason": self._reason,
+                "checked": self._checked,
+                "source": self._source,
+            }
+
+    def record(self, ok, reason="", source="request"):
+        """Feed one request outcome into the status"""
+        with self._lock:
+            self._last_outcome = time.time()
+            if ok:
+                self._failures = 0
+                changed = self._set(True, "", source)
+            else:
+                self._failures += 1
+                if source == "probe" or self._failures >= self.FAILURES_TO_OFFLINE:
+                    changed = self._set(False, reason or "Connection error", source)
+                else:
+                    changed = False
+            status = self._snapshot() if changed else None
+        if status and self.on_change:
+            try:
+                self.on_change(status)
+            except Exception as e:
+                log_llm.warning("Status listener error: %s", e)
+
+    def _set(self, online, reason, source):
+        self._checked = time.time()
+        self._source = source
+        changed = online != self._online or reason != self._reason
+        self._online, self._reason = online, reason
+        return changed
+
+    def _snapshot(self):
+        return {"online": bool(self._online), "reason": self._reason, "checked": self._checked, "source": self._source}
+
+    def probe(self):
+        """Ask STATUS_URL directly; also warms the pooled connection"""
+        with TRACER.span("health.probe", "llm") as span:
+            try:
+                data = http_session().get(STATUS_URL, timeout=self.PROBE_TIMEOUT).json()
+                online = data.get("status") == "online"
+                self.record(online, data.get("down_reason", "") or ("" if online else "Backend down"), source="probe")
+            except Exception as e:
+                log_llm.debug("Status probe failed: %s", e)
+                self.record(False, "Connection error", source="probe")
+            span.set(online=bool(self._online))
+
+    def _next_probe_in(self):
+        with self._lock:
+            interval = self.IDLE_PROBE if self._online else self.RETRY_PROBE
+            return self._last_outcome + interval - time.time()
+
+    def _run(self):
+        while True:
+            wait = self._next_probe_in()
+            if wait > 0:
+                if self._stop.wait(wait):
+                    return
+                continue
+            self.probe()
+
+    def close(self):
+        self._stop.set()
+
+
+# ==========================================
+# INFERENCE BACKENDS
+# ==========================================
+class InferenceError(Exception):
+    """No backend produced a completion"""
+
+
+# 4xx answers that mean the backend is busy or slow rather than the request bad
+RETRYABLE_STATUS = (408, 429)
+
+
+class RequestRejected(InferenceError):
+    """The backend answered but refused the request (HTTP 4xx)
+
+    The request itself is at fault, so another backend would refuse it too
+    and the one that answered is healthy: no failover and no cooldown.
+    RETRYABLE_STATUS codes are backend failures instead.
+    """
+
+    def __init__(self, status, message=""):
+        super().__init__(f"HTTP {status}" + (f": {message}" if message else ""))
+        self.status = status
+
+
+class InferenceBackend(abc.ABC):
+    """A place prompts can be sent. complete() returns the reply text or raises"""
+
+    name = "backend"
+
+    def available(self):
+        return True
+
+    @abc.abstractmethod
+    def complete(self, prompt, mode, model, timeout):
+        """Return the reply text for prompt"""
+
+
+class RemoteBackend(InferenceBackend):
+    """The MistAI web service (API_URL), which picks the model by name"""
+
+    name = "remote"
+
+    def __init__(self, url=None):
+        self.url = url or API_URL
+
+    def complete(self, prompt, mode, model, timeout):
+        response = http_session().post(
+            self.url, json={"message": prompt, "model": model, "mode": mode}, timeout=timeout
+        )
+        if 400 <= response.status_code < 500 and response.status_code not in RETRYABLE_STATUS:
+            raise RequestRejected(response.status_code, response.text[:200])
+        response.raise_for_status()
+        return response.json().get("response", "")
+
+
+class LocalBackend(InferenceBackend):
+    """A model served on this machine through the OpenAI-compatible chat API
+
+    llama.cpp's server (`llama-server -m model.gguf --port 8080`) is the
+    intended target; any server exposing /v1/chat/completions works. The
+    model argument is ignored in favour of LOCAL_LLM_MODEL. Availability is
+    checked against /health at most every RECHECK seconds, so a machine
+    without a local server pays one refused connection per interval.
+    """
+
+    name = "local"
+    RECHECK = 60
+    MAX_TOKENS = {"suggestion": 80, "recovery": 160, "assistant": 300}
+
+    def __init__(self, url=None, model=None, enabled=None):
+        self.url = (url or LOCAL_LLM_URL).rstrip("/")
+        self.model = model or LOCAL_LLM_MODEL
+        self.enabled = LOCAL_LLM_ENABLED if enabled is None else enabled
+        self._available = None
+        self._checked = 0.0
+
+    def available(self):
+        if not self.enabled:
+            return False
+        now = time.time()
+        if self._available is None or now - self._checked > self.RECHECK:
+            self._checked = now
+            try:
+                self._available = http_session().get(f"{self.url}/health", timeout=0.5).ok
+            except Exception:
+                self._available = False
+            log_llm.debug("Local model at %s: %s", self.url, "available" if self._available else "unavailable")
+        return self._available
+
+    def complete(self, prompt, mode, model, timeout):
+        response = http_session().post(
+            f"{self.url}/v1/chat/completions",
+            json={
+                "model": self.model,
+                "messages": [{"role": "user", "content": prompt}],
+                "temperature": 0.2,
+                "max_tokens": self.MAX_TOKENS.get(mode, 300),
+            },
+            timeout=timeout,
+        )
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"]["content"]
+
+
+class ModelRouter:
+    """Sends each prompt to the best backend for its mode, with failover.
+
+    Cheap modes (LOCAL_FIRST) try the local model first and complex ones
+    the remote service. Each backend's latency is tracked as an EWMA: one
+    slower than the mode's LATENCY_BUDGET drops behind one that is within
+    budget, but only until it has gone unused for RETRY_SLOW seconds: the
+    next request then tries it in its preferred place, so a backend that
+    has recovered wins its traffic back. A failure puts the backend in
+    COOLDOWN and the next one is tried. A rejected request (RequestRejected)
+    is not the backend's fault and is raised without failover or cooldown.
+    on_outcome(name, ok, reason) reports every attempt.
+    """
+
+    LOCAL_FIRST = ("recovery", "suggestion")
+    LATENCY_BUDGET = {"suggestion": 3.0, "recovery": 4.0, "assistant": 12.0}
+    EWMA_ALPHA = 0.3
+    COOLDOWN = 30
+    RETRY_SLOW = 60
+
+    def __init__(self, backends, on_outcome=None):
+        self.backends = {backend.name: backend for backend in backends}
+        self.on_outcome = on_outcome
+        self._lock = threading.Lock()
+        self._latency = {}
+        self._down_until = {}
+        self._last_used = {}
+        self._counts = {name: {"calls": 0, "failures": 0} for name in self.backends}
+
+    def order(self, mode):
+        """Backend names to try for mode, best first"""
+        preferred = ["local", "remote"] if mode in self.LOCAL_FIRST else ["remote", "local"]
+        names = [n for n in preferred if n in self.backends] + [n for n in self.backends if n not in preferred]
+        budget = self.LATENCY_BUDGET.get(mode, 12.0)
+        now = time.time()
+        with self._lock:
+            return sorted(
+                names,
+                key=lambda n: (
+                    self._down_until.get(n, 0) > now,
+                    self._latency.get(n, 0) > budget and now - self._last_used.get(n, 0) < self.RETRY_SLOW,
+                ),
+            )
+
+    def complete(self, prompt, mode, model, timeout):
+        """Return (reply text, backend name); raises InferenceError if every backend fails"""
+        errors = []
+        for name in self.order(mode):
+            backend = self.backends[name]
+            if not backend.available():
+                continue
+            start = time.perf_counter()
+            try:
+                with TRACER.span("llm.backend", "llm", backend=name, mode=mode):
+                    text = backend.complete(prompt, mode, model, timeout)
+            except RequestRejected as e:
+                self._record(name, False, time.perf_counter() - start, f"HTTP {e.status}", cooldown=False)
+                log_llm.warning("%s backend rejected %s request: %s", name, mode, e)
+                raise
+            except Exception as e:
+                status = getattr(getattr(e, "response", None), "status_code", None)
+                self._record(name, False, time.perf_counter() - start, f"HTTP {status}" if status else type(e).__name__)
+                log_llm.warning("%s backend failed for %s: %s", name, mode, e)
+                errors.append(f"{name}: {e}")
+                continue
+            self._record(name, True, time.perf_counter() - start)
+            return text, name
+        raise InferenceError("; ".join(errors) or "No inference backend available")
+
+    def _record(self, name, ok, elapsed, reason="", cooldown=True):
+        with self._lock:
+            counts = self._counts[name]
+            counts["calls"] += 1
+            self._last_used[name] = time.time()
+            if ok:
+                previous = self._latency.get(name)
+                self._latency[name] = (
+                    elapsed if previous is None else previous + self.EWMA_ALPHA * (elapsed - previous)
+                )
+                self._down_until.pop(name, None)
+            else:
+                counts["failures"] += 1
+                if cooldown:
+                    self._down_until[name] = time.time() + self.COOLDOWN
+        if self.on_outcome:
+            self.on_outcome(name, ok, reason)
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            return {
+                name: dict(
+                    counts,
+                    ewma_ms=round(self._latency[name] * 1000, 1) if name in self._latency else None,
+                    cooling_down=self._down_until.get(name, 0) > now,
+                )
+                for name, counts in self._counts.items()
+            }
+
+
+# ==========================================
+# SCREEN VISION
+# ==========================================
+class ScreenVision:
+    """Finds and clicks text on screen: templates, buttons, then OCR
+
+    Everything find_text_on_screen and click_on_text need - capture, the
+    click-target cache and the template library - and nothing else, so the
+    vision path can run without the assistant's voice, network and command
+    threads. Api builds on it.
+    """
+
+    def __init__(self, screen_capture=None):
+        self._lazy_lock = threading.Lock()
+        self.screen_capture = screen_capture or ScreenCapture()
+        self._click_cache = None
+        self._template_library = None
+        self.active_window = None
+
+    def track_action(self, action):
+        """Called after every click; Api records it in memory"""
+
+    def _get_click_cache(self):
+        if self._click_cache is None and ocr_available():
+            with self._lazy_lock:
+                if self._click_cache is None:
+                    self._click_cache = ClickTargetCache()
+        return self._click_cache
+
+    def _get_template_library(self):
+        if self._template_library is None and ocr_available():
+            with self._lazy_lock:
+                if self._template_library is None:
+                    self._template_library = TemplateLibrary()
+        return self._template_library
+
+    def get_mistai_window_rect(self):
+        try:
+            import win32gui
+
+            hwnd = win32gui.FindWindow(None, "MistAI Desktop Assistant")
+            if hwnd:
+                return win32gui.GetWindowRect(hwnd)
+        except:
+            pass
+        return None
+
+    def find_buttons_on_screen(self, gray=None, transform=None):
+        """Find all button-like regions on screen using computer vision
+
+        gray: optional grayscale frame to reuse, mapped to the screen by
+        transform (a CoordTransform). The MistAI window and the top bar are
+        blanked in place. Without a frame the foreground monitor is captured.
+        Returned boxes are in screen coordinates.
+        """
+        if not ocr_available():
+            return []
+        
+        try:
+            if gray is None:
+                index = self._monitor_order()[0]
+                _, _, transform, gray = self.screen_capture.grab_monitors([index], slot="buttons")[0]
+            transform = transform or CoordTransform()
+            return [
+                transform.box(x, y, w, h) + (text,)
+                for x, y, w, h, text in self._buttons_in_frame(gray, transform)
+            ]
+            
+        except Exception as e:
+            log_vision.error("Button detection error: %s", e)
+            return []
+
+    def _mask_own_ui(self, gray, transform):
+        """Blank the MistAI window and the primary's top bar in gray, in place"""
+        mistai_rect = self.get_mistai_window_rect()
+        if mistai_rect and mistai_rect[0] > -10000:
+            left, top, right, bottom = transform.inverse_rect(*mistai_rect)
+            if right > 0 and bottom > 0:
+                gray[max(0, top):max(0, bottom), max(0, left):max(0, right)] = 0
+        
+        gray[:self._top_bar_rows(transform), :] = 0
+
+    def _buttons_in_frame(self, gray, transform):
+        """Button boxes in frame pixels; blanks MistAI and the primary's top bar in gray"""
+        self._mask_own_ui(gray, transform)
+
+        with TRACER.span("vision.button_candidates", "vision") as span:
+            contour_count, rects = button_candidate_rects(gray)
+            dark = region_means(gray, rects) < 128
+            span.set(contours=contour_count, candidates=len(rects))
+        
+        buttons = []
+        
+        for (x, y, w, h), is_dark in zip(rects.tolist(), dark.tolist()):
+            button_gray = gray[y:y+h, x:x+w]
+            
+            if is_dark:
+                button_gray = cv2.bitwise_not(button_gray)
+            
+            # Only the text is read from the upscaled crop; the box stays the contour's
+            button_gray = cv2.resize(button_gray, None, fx=3, fy=3, interpolation=cv2.INTER_CUBIC)
+            button_gray = cv2.normalize(button_gray, None, 0, 255, cv2.NORM_MINMAX)
+            button_gray = cv2.adaptiveThreshold(
+                button_gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
+                cv2.THRESH_BINARY, 11, 2
+            )
+            
+            with TRACER.span("vision.button_ocr", "vision"):
+                text = pytesseract.image_to_string(
+                    button_gray, 
+                    config="--oem 3 --psm 7 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz "
+                ).strip()
+            
+            if text and len(text) >= 2:
+                buttons.append((x, y, w, h, text))
+        
+        return buttons
+
+    def find_text_on_screen(self, search_text, confidence=45, save_debug=None):
+        """HYBRID text finder with multiple OCR strategies
+
+        Every monitor is captured in parallel. Known templates are tried on
+        all of them first, then buttons and OCR run monitor by monitor,
+        starting with the one holding the foreground window. Returns
+        (x, y, w, h) in screen coordinates.
+        """
+        if save_debug is None:
+            save_debug = DEBUG_MODE
+            
+        if not ocr_available():
+            log_vision.error("OCR not available")
+            return None
+
+        try:
+            frames = self.screen_capture.grab_monitors(self._monitor_order(), slot="find")
+
+            log_vision.debug("Hybrid search for: '%s' on %d monitor(s)", search_text, len(frames))
+
+            tried_templates = []
+            template_library = self._get_template_library()
+            if template_library:
+                tried_templates = template_library.ids_for(search_text)
+                if tried_templates:
+                    log_vision.debug("Step 0: Matching %d known template(s)...", len(tried_templates))
+                    for index, region, transform, frame_gray in frames:
+                        # Never match a learned "Send" or "Save" on MistAI's own window
+                        self._mask_own_ui(frame_gray, transform)
+                        with TRACER.span("vision.templates", "vision", count=len(tried_templates), monitor=index) as span:
+                            match = template_library.find(
+                                search_text, frame_gray, roi=self._template_search_roi(frame_gray.shape, transform)
+                            )
+                            span.set(hit=bool(match))
+                        if match:
+                            return transform.box(*match)
+
+            for index, region, transform, frame_gray in frames:
+                with TRACER.span("vision.monitor", "vision", monitor=index) as span:
+                    match = self._find_text_in_frame(
+                        search_text, frame_gray, region, transform, confidence, save_debug, tried_templates
+                    )
+                    span.set(hit=bool(match))
+                if match:
+                    return match
+            return None
+            
+        except Exception as e:
+            log_vision.exception("Text search failed for '%s': %s", search_text, e)
+            return None
+
+    def _find_text_in_frame(self, search_text, frame_gray, region, transform, confidence, save_debug, tried_templates):
+        """Buttons then OCR strategies on one monitor frame; screen box or None"""
+        original_screenshot = (
+            self.screen_capture.grab_bgr(region).copy() if save_debug else None
+        )
+
+        log_vision.debug("Step 1: Detecting UI buttons...")
+        # Blanks the MistAI window and top bar in frame_gray, as Step 2 needs
+        local_buttons = self._buttons_in_frame(frame_gray, transform)
+        
+        if local_buttons:
+            log_vision.debug("Found %d button(s):", len(local_buttons))
+            for i, (x, y, w, h, text) in enumerate(local_buttons[:5], 1):
+                log_vision.debug("   %d. '%s' at %s", i, text, transform.point(x, y))
+            
+            search_lower = search_text.lower()
+            best_match = self._match_button(local_buttons, search_lower)
+            
+            if best_match:
+                x, y, w, h, text = best_match
+                log_vision.info("Button match: '%s'", text)
+                if save_debug:
+                    self._save_debug_screenshot(original_screenshot, local_buttons, best_match, search_text, "button")
+                self._learn_template(search_text, frame_gray, (x, y, w, h), tried_templates)
+                return transform.box(x, y, w, h)
+
+        log_vision.debug("Step 2: Trying enhanced OCR...")
+        
+        best_match = None
+        best_score = 0
+        best_strategy = ""
+        
+        gray1 = frame_gray
+        match1, score1 = self._ocr_search(gray1, search_text, confidence, "light")
+        if score1 > best_score:
+            best_match, best_score, best_strategy = match1, score1, "light"
+        
+        gray2 = cv2.bitwise_not(gray1)
+        match2, score2 = self._ocr_search(gray2, search_text, confidence, "inverted")
+        if score2 > best_score:
+            best_match, best_score, best_strategy = match2, score2, "inverted"
+        
+        gray3 = cv2.normalize(gray1, None, 0, 255, cv2.NORM_MINMAX)
+        gray3 = cv2.convertScaleAbs(gray3, alpha=1.5, beta=0)
+        match3, score3 = self._ocr_search(gray3, search_text, confidence, "contrast")
+        if score3 > best_score:
+            best_match, best_score, best_strategy = match3, score3, "contrast"
+        
+        MIN_SCORE = 70 if len(search_text.split()) == 1 else 85
+        
+        if best_match and best_score >= MIN_SCORE:
+            log_vision.info("OCR match: score=%s strategy=%s", best_score, best_strategy)
+            x, y, w, h = best_match
+            if save_debug:
+                self._save_debug_screenshot(
+                    original_screenshot, [], 
+                    (x, y, w, h, search_text), 
+                    search_text, "ocr"
+                )
+            self._learn_template(search_text, frame_gray, best_match, tried_templates)
+            return transform.box(x, y, w, h)
+        
+        log_vision.info("Not found (best score: %s, needed: %s)", best_score, MIN_SCORE)
+        
+        if save_debug:
+            self._save_debug_screenshot(original_screenshot, local_buttons, None, search_text, "failed")
+        
+        return None
+
+    def _monitor_order(self):
+        """Monitor indices, the one holding the foreground window first"""
+        count = len(self.screen_capture.monitors())
+        first = 0
+        try:
+            import win32gui
+
+            left, top, right, bottom = win32gui.GetWindowRect(win32gui.GetForegroundWindow())
+            if left > -10000:
+                first = self.screen_capture.monitor_at((left + right) // 2, (top + bottom) // 2)
+        except:
+            pass
+        return [first] + [i for i in range(count) if i != first]
+
+    # Frame rows at the top of the primary monitor skipped by button and template search
+    TOP_BAR_ROWS = 80
+
+    def _top_bar_rows(self, transform):
+        """TOP_BAR_ROWS for a frame starting at the primary's origin, else 0"""
+        return self.TOP_BAR_ROWS if transform.point(0, 0) == (0, 0) else 0
+
+    def _template_search_roi(self, frame_shape, transform=None):
+        """Restrict template search to the foreground window, below the top bar
+
+        The ROI is in pixels of the frame that transform maps to the screen.
+        When MistAI itself is in the foreground (a typed command) the whole
+        frame is searched; its window is blanked by _mask_own_ui.
+        """
+        frame_h, frame_w = frame_shape[:2]
+        transform = transform or CoordTransform()
+        top_bar = self._top_bar_rows(transform)
+        try:
+            import win32gui
+
+            rect = win32gui.GetWindowRect(win32gui.GetForegroundWindow())
+            if tuple(rect) == tuple(self.get_mistai_window_rect() or ()):
+                return (0, top_bar, frame_w, frame_h)
+            left, top, right, bottom = transform.inverse_rect(*rect)
+            if right - left > 50 and bottom - top > 50 and right > 0 and bottom > 0 and left < frame_w and top < frame_h:
+                return (max(0, left), max(top_bar, top), min(frame_w, right), min(frame_h, bottom))
+        except:
+            pass
+        return (0, top_bar, frame_w, frame_h)
+
+    def _learn_template(self, search_text, frame_gray, box, tried_templates):
+        """Feed a successful OCR/button match back into the template library"""
+        template_library = self._get_template_library()
+        if not template_library:
+            return
+        try:
+            if tried_templates:
+                template_library.record_miss(tried_templates)
+            template_library.add(search_text, frame_gray, box)
+        except Exception as e:
+            log_vision.warning("Template learning error: %s", e)
+
+    def _match_button(self, buttons, search_text):
+        """Match search text to detected buttons"""
+        search_lower = search_text.lower()
+        search_words = search_lower.split()
+        
+        best_button = None
+        best_score = 0
+        
+        for x, y, w, h, text in buttons:
+            text_lower = text.lower()
+            score = 0
+            
+            if text_lower == search_lower:
+                score = 100
+            elif all(word in text_lower for word in search_words):
+                score = 95
+            elif search_lower in text_lower:
+                score = 85
+            else:
+                similarity = difflib.SequenceMatcher(None, text_lower, search_lower).ratio()
+                score = int(similarity * 100)
+            
+            if score > best_score:
+                best_score = score
+                best_button = (x, y, w, h, text)
+        
+        if best_button and best_score >= 60:
+            return best_button
+        return None
+
+    def _ocr_search(self, gray_image, search_text, confidence, strategy="light"):
+        """Perform OCR search on preprocessed image"""
+        with TRACER.span(f"vision.ocr.{strategy}", "vision") as span:
+            best_match, best_score = self._ocr_search_impl(gray_image, search_text, confidence)
+            span.set(score=best_score)
+        return best_match, best_score
+
+    def _ocr_search_impl(self, gray_image, search_text, confidence):
+        try:
+            gray = cv2.resize(gray_image, None, fx=OCR_UPSCALE, fy=OCR_UPSCALE, interpolation=cv2.INTER_CUBIC)
+            to_frame = CoordTransform().resize(OCR_UPSCALE)
+            
+            ocr_data = pytesseract.image_to_data(
+                gray,
+                output_type=pytesseract.Output.DICT,
+                config="--oem 3 --psm 11"
+            )
+            
+            search_lower = search_text.lower()
+            span_words = max(1, len(search_lower.split()))
+            best_match = None
+            best_score = 0
+
+            # Confident words grouped into OCR lines, so multi-word targets
+            # can be matched against runs of neighbouring words
+            lines = {}
+            for i, word in enumerate(ocr_data["text"]):
+                if not word.strip() or int(ocr_data["conf"][i]) < confidence:
+                    continue
+                key = tuple(ocr_data[k][i] if k in ocr_data else 0 for k in ("block_num", "par_num", "line_num"))
+                lines.setdefault(key, []).append(i)
+
+            candidates = []
+            for indices in lines.values():
+                for size in sorted({1, span_words}):
+                    for start in range(len(indices) - size + 1):
+                        candidates.append(indices[start:start + size])
+
+            for run in candidates:
+                text_lower = " ".join(ocr_data["text"][i].strip() for i in run).lower()
+                if len(text_lower) < 2:
+                    continue
+
+                score = 0
+                if text_lower == search_lower:
+                    score = 100
+                elif search_lower in text_lower:
+                    score = 85
+                elif text_lower in search_lower:
+                    score = 75
+                else:
+                    similarity = difflib.SequenceMatcher(None, text_lower, search_lower).ratio()
+                    score = int(similarity * 100)
+
+                if score > best_score:
+                    left = min(ocr_data["left"][i] for i in run)
+                    top = min(ocr_data["top"][i] for i in run)
+                    right = max(ocr_data["left"][i] + ocr_data["width"][i] for i in run)
+                    bottom = max(ocr_data["top"][i] + ocr_data["height"][i] for i in run)
+                    best_match = to_frame.box(left, top, right - left, bottom - top)
+                    best_score = score
+
+            return best_match, best_score
+            
+        except Exception as e:
+            log_vision.warning("OCR strategy error: %s", e)
+            return None, 0
+
+    def _save_debug_screenshot(self, screenshot, buttons, matched_element, search_text, mode="button"):
+        """Save debug screenshot with auto-cleanup"""
+        if not DEBUG_MODE:
+            return
+        try:
+            debug_dir = os.path.join(os.path.expanduser("~"), "MistAI", "ocr_debug")   
+                    
+            if not os.path.exists(debug_dir):
+                os.makedirs(debug_dir)
+                log_vision.debug("Created debug dir: %s", debug_dir)
+            
+            try:
+                debug_files = [f for f in os.listdir(debug_dir) if f.endswith('.png')]
+                if debug_files:
+                    debug_files.sort(key=lambda f: os.path.getmtime(os.path.join(debug_dir, f)))
+                    
+                    if len(debug_files) > 50:
+                        for old_file in debug_files[:-50]:
+                            try:
+                                os.remove(os.path.join(debug_dir, old_file))
+                            except:
+                                pass
+            except Exception as cleanup_error:
+                log_vision.warning("Cleanup warning: %s", cleanup_error)
+            
+            timestamp = datetime.now().strftime("%H%M%S")
+            debug_image = screenshot.copy()
+            
+            if buttons:
+                for bx, by, bw, bh, btn_text in buttons:
+                    cv2.rectangle(debug_image, (bx, by), (bx+bw, by+bh), (255, 100, 0), 2)
+                    cv2.putText(debug_image, btn_text[:20], (bx, by-5), 
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 100, 0), 1)
+            
+            if matched_element:
+                x, y, w, h, text = matched_element
+                cv2.rectangle(debug_image, (x, y), (x+w, y+h), (0, 255, 0), 4)
+                cv2.putText(debug_image, f"MATCH: {text}", (x, y-10), 
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+            
+            text_y = debug_image.shape[0] - 30
+            cv2.rectangle(debug_image, (0, text_y - 25), (debug_image.shape[1], debug_image.shape[0]), (0, 0, 0), -1)
+            cv2.putText(debug_image, f"Searched: '{search_text}' | Mode: {mode}", (10, text_y),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+            
+            safe_search = "".join(c for c in search_text if c.isalnum() or c in (' ', '_'))[:30]
+            safe_search = safe_search.replace(' ', '_')
+            filename = os.path.join(debug_dir, f"{mode}_{timestamp}_{safe_search}.png")
+            
+            success = cv2.imwrite(filename, debug_image)
+            if success:
+                log_vision.debug("Debug saved: %s", filename)
+            else:
+                log_vision.warning("Failed to save debug screenshot")
+            
+        except Exception as e:
+            log_vision.warning("Debug screenshot error: %s", e)
+
+    # Pixels that must visibly change in the window for a click to count as handled
+    CLICK_EFFECT_PIXELS = 64
+
+    def click_on_text(self, search_text):
+        """Click with button detection"""
+        app_key, window_rect = self.get_active_window_context()
+        # Same process, different window (dialog vs main) - different layout
+        title = " ".join("".join(c for c in self.get_active_window().lower() if not c.isdigit()).split())
+        cache_app = f"{app_key}|{title}"
+        click_cache = self._get_click_cache()
+        coords = None
+
+        if click_cache:
+            try:
+                with TRACER.span("vision.click_cache", "vision") as span:
+                    frame, local_rect, transform = self._grab_window_frame(window_rect)
+                    coords = click_cache.lookup(cache_app, search_text, frame, local_rect)
+                    if coords:
+                        coords = transform.box(*coords)
+                    span.set(hit=bool(coords))
+                if coords:
+                    log_vision.debug("Cached target verified for '%s'", search_text)
+            except Exception as e:
+                log_vision.warning("Click cache lookup error: %s", e)
+                coords = None
+
+        from_cache = coords is not None
+        if not coords:
+            coords = self.find_text_on_screen(search_text)
+
+        if coords:
+            x, y, w, h = coords
+            click_x = x + w // 2
+            click_y = y + h // 2
+
+            # Grab the target's patch before the cursor hovers over it
+            pending = None
+            if click_cache and not from_cache:
+                try:
+                    frame, local_rect, transform = self._grab_window_frame(window_rect)
+                    pending = (transform.inverse_box(x, y, w, h), frame.copy(), local_rect)
+                except Exception as e:
+                    log_vision.warning("Click cache store error: %s", e)
+
+            log_vision.debug("Clicking at (%d, %d)", click_x, click_y)
+            actuate(pyautogui.moveTo, click_x, click_y, duration=0.3)
+            command_sleep(0.1)
+            hovered = self._grab_window_snapshot(window_rect) if click_cache else None
+            actuate(pyautogui.click)
+
+            if hovered is not None:
+                self._settle_click_cache(click_cache, cache_app, search_text, window_rect, hovered, pending)
+
+            self.track_action(f"clicked '{search_text}'")
+            return True
+        return False
+
+    def _grab_window_snapshot(self, window_rect):
+        """Copy of the window's pixels, for comparing before and after a click"""
+        try:
+            frame, (left, top, right, bottom), _ = self._grab_window_frame(window_rect)
+            return frame[max(0, top):bottom, max(0, left):right].copy()
+        except Exception as e:
+            log_vision.debug("Window snapshot failed: %s", e)
+            return None
+
+    def _settle_click_cache(self, click_cache, app, text, window_rect, hovered, pending):
+        """Store or confirm a click target once the click visibly did something
+
+        pending is (box, frame, window rect) for a target found by OCR, None
+        for a cache hit. A click that left the window unchanged is not stored
+        and evicts the cached entry it came from.
+        """
+        try:
+            command_sleep(0.3)
+            after = self._grab_window_snapshot(window_rect)
+            if after is None or after.shape != hovered.shape:
+                # Window moved or closed - the click did something
+                changed = True
+            else:
+                changed = int(np.count_nonzero(cv2.absdiff(after, hovered) > 32)) >= self.CLICK_EFFECT_PIXELS
+
+            if pending is not None:
+                if changed:
+                    click_cache.store(app, text, *pending)
+            elif changed:
+                click_cache.record_hit(app, text)
+            else:
+                log_vision.debug("Cached click on '%s' had no effect, evicting", text)
+                click_cache.forget(app, text)
+        except Exception as e:
+            log_vision.warning("Click cache store error: %s", e)
+
+    def _grab_window_frame(self, window_rect):
+        """Grayscale frame of the monitor holding window_rect
+
+        Returns (frame, window rect in frame pixels, frame-to-screen transform).
+        """
+        left, top, right, bottom = window_rect
+        capture = self.screen_capture
+        region = capture.monitors()[capture.monitor_at((left + right) // 2, (top + bottom) // 2)]
+        transform = capture.transform(region)
+        frame = capture.grab_gray(region, slot="click_cache")
+        return frame, transform.inverse_rect(*window_rect), transform
+
+    def get_active_window_context(self):
+        """Return (app key, window rect) for the foreground window
+
+        The app key is the owning process name when it can be resolved,
+        otherwise the window title. Without win32 the whole screen is used
+        as the window rect.
+        """
+        try:
+            import win32gui, win32process
+
+            hwnd = win32gui.GetForegroundWindow()
+            rect = win32gui.GetWindowRect(hwnd)
+            app_key = None
+            try:
+                _, pid = win32process.GetWindowThreadProcessId(hwnd)
+                app_key = psutil.Process(pid).name().lower()
+            except:
+                pass
+            if not app_key:
+                app_key = win32gui.GetWindowText(hwnd).lower() or "unknown"
+            return app_key, rect
+        except:
+            width, height = pyautogui.size()
+            return (self.active_window or "unknown").lower(), (0, 0, width, height)
+
+    def get_active_window(self):
+        try:
+            import win32gui
+
+            window = win32gui.GetForegroundWindow()
+            title = win32gui.GetWindowText(window)
+            self.active_window = title
+            return title
+        except:
+            return "Unknown"
+
+
+class Api(ScreenVision):
+    """Backend API for MistAI Desktop Assistant"""
+
+    def __init__(self):
+        # Screen capture, click cache and template library
+        super().__init__()
+
+        # Audio, TTS, OCR and automation are initialized on first use or by
+        # warm_up_subsystems() once the window is showing
+        self._recognizer = None
+        self._microphone = None
+        self.is_listening = False
+
+        # core_ready lets the window show; subsystems_ready follows once the
+        # network and voice warm-up have finished in the background
+        self.core_ready = threading.Event()
+        self.subsystems_ready = threading.Event()
+
+        # Command scheduling: one event loop, serialized UI actuation
+        self.command_loop = CommandLoop()
+
+        # Whole-string text injection (clipboard / SendInput / xdotool)
+        self.text_injector = TextInjector()
+
+        # Speech output (engine is created on its synthesis thread)
+        self.speech = SpeechOutput(on_utterance=lambda text: self.show_caption(text, "assistant", duration=8))
+
+        # Memory system
+        self.conversation_active = False
+        self.last_interaction_time = 0
+        self.conversation_timeout = 45  # seconds
+        self.conversation_history = RingBuffer(20)
+        self.actions_performed = RingBuffer(10)
+        self.opened_apps = LRUSet(32)
+        self.last_screenshot_text = ""
+        self.last_screen_layout = None
+        self.layout_reader = ScreenLayoutReader()
+        self._prefetch_future = None
+        self._prefetch_stats = {"started": 0, "used": 0, "discarded": 0}
+        self._memory_store = None
+        self._history_index = None
+        self._response_cache = None
+        self.context = {
+            "last_action": None,
+            "last_app_opened": None,
+            "session_start": datetime.now().isoformat(),
+        }
+
+        # Wake word detection
+        self.wake_word_active = False
+        self.wake_word_thread = None
+        self.stop_wake_word = threading.Event()
+
+        # Proactive mode
+        self.proactive_mode = False
+        self.proactive_thread = None
+        self.stop_proactive = threading.Event()
+        self.last_screen_check = time.time()
+        self.last_suggestion_time = time.time()
+        self.suggestion_cooldown = 45
+        self.last_suggestion = ""
+
+        # Caption system
+        self.captions_enabled = False
+        self.caption_window = None
+        self.caption_scheduler = None
+
+        # Events pushed to the web UI; attached to the window in main()
+        self.ui_events = UIEventChannel()
+        self._memory_badge = None
+
+        # Backend status from request outcomes; pushed to the UI on change
+        self.health = HealthMonitor(
+            on_change=lambda status: self.ui_events.emit("status", online=status["online"], reason=status["reason"])
+        )
+
+        # Inference: remote service plus an optional local model
+        self.model_router = ModelRouter([RemoteBackend(), LocalBackend()], on_outcome=self._on_inference_outcome)
+
+    # ============================================
+    # LAZY SUBSYSTEMS
+    # ============================================
+
+    # Accessors are methods rather than properties: pywebview walks every
+    # public attribute of the js_api object, which would trigger the init
+
+    def _get_recognizer(self):
+        if self._recognizer is None:
+            with self._lazy_lock:
+                if self._recognizer is None:
+                    self._recognizer = sr.Recognizer()
+        return self._recognizer
+
+    def _get_microphone(self):
+        if self._microphone is None:
+            with self._lazy_lock:
+                if self._microphone is None:
+                    with STARTUP.phase("microphone"):
+                        self._microphone = sr.Microphone()
+        return self._microphone
+
+    def _get_memory_store(self):
+        """Persistent memory, or None if SQLite could not be opened"""
+        if self._memory_store is None:
+            with self._lazy_lock:
+                if self._memory_store is None:
+                    try:
+                        self._memory_store = MemoryStore()
+                    except Exception as e:
+                        log_memory.warning("Persistent memory unavailable: %s", e)
+                        self._memory_store = False
+        return self._memory_store or None
+
+    def _get_response_cache(self):
+        if self._response_cache is None:
+            with self._lazy_lock:
+                if self._response_cache is None:
+                    self._response_cache = ResponseCache()
+        return self._response_cache
+
+    def _get_history_index(self):
+        """TF-IDF index over the memory store (needs numpy)"""
+        if self._history_index is None:
+            store = self._get_memory_store()
+            if store and np.available():
+                with self._lazy_lock:
+                    if self._history_index is None:
+                        self._history_index = HistoryIndex(store)
+        return self._history_index
+
+    def warm_up_subsystems(self, progress=None):
+        """Initialize heavy subsystems, reporting (done, total, label) to progress
+
+        Runs on a background thread while the splash is showing. Local modules
+        load first and set core_ready so the window can open; the backend
+        connection, voice engine and microphone then warm up behind it and
+        subsystems_ready is set at the end.
+        """
+        core_steps = [
+            ("Locating Tesseract OCR...", ocr_available),
+            ("Preparing automation...", lambda: pyautogui.size()),
+            ("Loading vision caches...", lambda: (self._get_click_cache(), self._get_template_library())),
+            ("Loading memory...", lambda: self._get_history_index() and self._history_index.refresh()),
+        ]
+        background_steps = [
+            ("Connecting to MistAI...", self._warm_http),
+            ("Starting voice engine...", self._warm_tts),
+            ("Opening microphone...", self._get_microphone),
+        ]
+        for i, (name, step) in enumerate(core_steps):
+            if progress:
+                progress((i, len(core_steps), name))
+            self._run_warm_step(name, step)
+        if progress:
+            progress((len(core_steps), len(core_steps), "Ready"))
+        self.core_ready.set()
+
+        for name, step in background_steps:
+            self._run_warm_step(name, step)
+        self.subsystems_ready.set()
+        STARTUP.report()
+
+    def _run_warm_step(self, name, step):
+        try:
+            with STARTUP.phase(name.rstrip(".")):
+                step()
+        except Exception as e:
+            log_startup.warning("%s failed: %s", name, e)
+
+    def _warm_http(self):
+        """Open the pooled HTTPS connection to the backend and learn its status"""
+        self.health.probe()
+
+    def _on_inference_outcome(self, backend, ok, reason):
+        """Remote requests double as health checks for the status indicator"""
+        if backend == "remote":
+            # A rejected request still means the service is up; timeouts and rate limits do not
+            rejected = reason.startswith("HTTP 4") and reason not in [f"HTTP {code}" for code in RETRYABLE_STATUS]
+            self.health.record(ok or rejected, reason)
+
+    def _warm_tts(self):
+        self.speech.warm(10)
+
+    def get_startup_profile(self):
+        return {"phases": STARTUP.summary()}
+
+    def minimize_window(self):
+        """Minimize MistAI window"""
+        try:
+            if hasattr(self, "window") and self.window:
+                self.window.minimize()
+            return {"success": True}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    def speak_now(self, text, interrupt=False):
+        """Queue text to be spoken; interrupt=True also cuts off current speech"""
+        self.speech.speak(text, interrupt=interrupt)
+
+    # ============================================
+    # CAPTION SYSTEM
+    # ============================================
+
+    def toggle_captions(self, enabled):
+        """Toggle caption system"""
+        self.captions_enabled = enabled
+        self._push_memory_badge()
+
+        if enabled:
+            if not self.caption_window:
+                self.caption_window = SimpleCaptionWindow()
+                self.caption_scheduler = CaptionScheduler(self.caption_window)
+                self.caption_scheduler.submit("📺 Captions Enabled", "system", duration=3)
+        else:
+            if self.caption_window:
+                self.caption_scheduler.close()
+                self.caption_window.destroy()
+                self.caption_window = None
+                self.caption_scheduler = None
+
+        return {"success": True}
+
+    def show_caption(self, text, kind="system", duration=6):
+        """Show caption - blocks user captions"""
+        if kind == "user":
+            return {"success": True}
+
+        scheduler = self.caption_scheduler
+        if self.captions_enabled and scheduler:
+            prefix = {"assistant": "🤖 ", "suggestion": "💡 ", "error": "❌ "}.get(kind, "ℹ️ ")
+            scheduler.submit(f"{prefix}{text}", kind, duration)
+        return {"success": True}
+
+    # ============================================
+    # WAKE WORD DETECTION
+    # ============================================
+
+    def start_wake_word_detection(self):
+        """Start continuous wake word listening"""
+        if self.wake_word_active:
+            return {"success": False, "message": "Already active"}
+
+        self.wake_word_active = True
+        self.stop_wake_word.clear()
+
+        self.wake_word_thread = threading.Thread(
+            target=self._wake_word_loop, daemon=True
+        )
+        self.wake_word_thread.start()
+
+        log_wake.info("Wake word detection started")
+        self._push_memory_badge()
+        return {"success": True, "message": "Wake word detection active"}
 
     def stop_wake_word_detection(self):
         """Stop wake word detection"""
@@ -505,11 +4597,12 @@ class Api:
         self.wake_word_active = False
         self.stop_wake_word.set()
 
-        print("[Mic] Wake word detection stopped")
+        log_wake.info("Wake word detection stopped")
+        self._push_memory_badge()
         return {"success": True, "message": "Wake word detection stopped"}
 
     def _wake_word_loop(self):
-        print(f"[Ear] Listening for wake words: {WAKE_WORDS}")
+        log_wake.debug("Listening for wake words: %s", WAKE_WORDS)
 
         wake_recognizer = sr.Recognizer()
         wake_recognizer.energy_threshold = 550
@@ -518,22 +4611,32 @@ class Api:
 
         while not self.stop_wake_word.is_set():
             try:
-                with self.microphone as source:
+                with self._get_microphone() as source:
                     wake_recognizer.adjust_for_ambient_noise(source, duration=0.2)
-                    audio = wake_recognizer.listen(
-                        source, timeout=1, phrase_time_limit=5
-                    )
+                    with TRACER.span("wake.listen", "audio"):
+                        audio = wake_recognizer.listen(
+                            source, timeout=1, phrase_time_limit=5
+                        )
+
+                # Mid-conversation every phrase is likely a command: read the
+                # screen while it is being recognized
+                if self.conversation_active and time.time() - self.last_interaction_time < self.conversation_timeout:
+                    self.prefetch_screen_context("speech")
 
                 try:
-                    text = wake_recognizer.recognize_google(audio).lower()
-                    print(f"[Ear] Heard: {text}")
+                    with TRACER.span("wake.recognize", "stt"):
+                        text = wake_recognizer.recognize_google(audio).lower()
+                    log_wake.debug("Heard: %s", text)
 
-                    wake_word, command_after_wake = fuzzy_match_wake_word(text)
+                    with TRACER.span("wake.match", "wake") as span:
+                        wake_word, command_after_wake = fuzzy_match_wake_word(text)
+                        span.set(matched=wake_word or "")
 
                     if wake_word:
                         self.conversation_active = True
                         self.last_interaction_time = time.time()
-                        print(f"[Check] Wake word detected: {wake_word}")
+                        log_wake.info("Wake word detected: %s", wake_word)
+                        self.prefetch_screen_context("wake")
                         self._notify_wake_word_detected()
 
                         gender = self.get_user_gender()
@@ -545,135 +4648,130 @@ class Api:
                             greeting = "Yes?"
 
                         if command_after_wake:
-                            print(f"[Target] Executing command: '{command_after_wake}'")
+                            log_wake.info("Executing command: '%s'", command_after_wake)
                             self._execute_wake_command(command_after_wake)
                         else:
                             self.speak_now(greeting, interrupt=True)
                             follow_up = self._listen_for_command(timeout=5)
                             if follow_up:
-                                print(f"[Target] Follow-up command: '{follow_up}'")
+                                log_wake.info("Follow-up command: '%s'", follow_up)
                                 self._execute_wake_command(follow_up)
                             else:
-                                print("[Timer] Waiting for next command...")
+                                log_wake.debug("Waiting for next command...")
 
                     elif self.conversation_active and text:
                         time_since_last = time.time() - self.last_interaction_time
 
                         if time_since_last < self.conversation_timeout:
-                            print(
-                                f"[Speech] Continuous conversation: '{text}' (timeout in {self.conversation_timeout - time_since_last:.0f}s)"
+                            log_wake.info(
+                                "Continuous conversation: '%s' (timeout in %.0fs)",
+                                text, self.conversation_timeout - time_since_last,
                             )
                             self.last_interaction_time = time.time()
                             self._execute_wake_command(text)
                         else:
                             self.conversation_active = False
-                            print("[Sleep] Conversation timed out - back to wake word mode")
+                            log_wake.info("Conversation timed out - back to wake word mode")
 
                 except sr.UnknownValueError:
                     pass
                 except Exception as e:
-                    print(f"Wake word error: {e}")
+                    log_wake.warning("Wake word error: %s", e)
 
             except sr.WaitTimeoutError:
                 pass
             except Exception as e:
-                print(f"Wake loop error: {e}")
+                log_wake.warning("Wake loop error: %s", e)
                 time.sleep(0.2)
 
     def _listen_for_command(self, timeout=5):
         """Listen for a command after wake word"""
         try:
-            with self.microphone as source:
-                self.recognizer.adjust_for_ambient_noise(source, duration=0.3)
-                audio = self.recognizer.listen(
-                    source, timeout=timeout, phrase_time_limit=10
-                )
-                command = self.recognizer.recognize_google(audio)
-                print(f"[Target] Command received: '{command}'")
-                return command
+            recognizer = self._get_recognizer()
+            with self._get_microphone() as source:
+                recognizer.adjust_for_ambient_noise(source, duration=0.3)
+                with TRACER.span("stt.listen", "audio"):
+                    audio = recognizer.listen(
+                        source, timeout=timeout, phrase_time_limit=10
+                    )
+            with TRACER.span("stt.recognize", "stt"):
+                command = recognizer.recognize_google(audio)
+            log_wake.info("Command received: '%s'", command)
+            return command
         except sr.WaitTimeoutError:
-            print("[Timer] No command received")
+            log_wake.debug("No command received")
             return None
         except sr.UnknownValueError:
-            print("[X] Could not understand command")
+            log_wake.info("Could not understand command")
             return None
         except Exception as e:
-            print(f"[Warning] Listen error: {e}")
+            log_wake.warning("Listen error: %s", e)
             return None
 
     def _execute_wake_command(self, command):
-        """Execute command from wake word - non-blocking"""
+        """Execute command from wake word - non-blocking, pre-empts stale commands"""
 
-        def execute_in_background():
+        async def job(token):
+            with TRACER.span("command.wake", "command", command=command[:60]):
+                await run_command(token)
+
+        async def run_command(token):
             try:
-                print(f"\n[Rocket] WAKE COMMAND START: '{command}'")
-                print(f"   [Satellite] Calling API at {API_URL}...")
+                log_commands.info("Wake command start: '%s'", command)
+                log_llm.debug("Calling API at %s...", API_URL)
 
-                result = self.ask_mistai(command, MODEL, self.get_user_gender())
+                result = await self.command_loop.run_blocking(
+                    self.ask_mistai, command, MODEL, self.get_user_gender()
+                )
+                if token.is_set():
+                    raise CommandCancelled()
 
-                print(f"   [Inbox] API Response received")
-                print(f"   Success: {result.get('success')}")
+                log_llm.debug("API response received")
+                log_llm.debug("Success: %s", result.get("success"))
 
                 if result.get("success") and result.get("command"):
                     cmd = result["command"]
-                    print(
-                        f"   [Clapperboard] Executing: {cmd.get('action')} | {cmd.get('parameter')}"
-                    )
-                    print(f"   [Speech] Speech: {cmd.get('speech')}")
+                    log_llm.debug("Executing: %s | %s", cmd.get("action"), cmd.get("parameter"))
+                    log_llm.debug("Speech: %s", cmd.get("speech"))
 
                     speech = cmd.get("speech", "")
                     if speech:
                         self.speak_now(speech, interrupt=False)
-                        print(f"   [Speaker] Speaking: '{speech}'")
-
-                    self.execute_action(
-                        cmd.get("action"),
-                        cmd.get("parameter"),
-                        "",
-                    )
+                        log_voice.debug("Speaking: '%s'", speech)
 
                     self._notify_command_executed(command, speech)
-                    print(f"   [Check] WAKE COMMAND COMPLETE")
+
+                    await self.command_loop.run_command(
+                        token, self._run_action, cmd.get("action"), cmd.get("parameter"), ""
+                    )
+                    log_commands.info("Wake command complete")
                 else:
                     error = result.get("error", "Unknown error")
-                    print(f"   [X] API Error: {error}")
+                    log_llm.error("API error: %s", error)
                     self.speak_now("Sorry, I couldn't process that.")
 
+            except (CommandCancelled, asyncio.CancelledError):
+                raise
             except requests.exceptions.Timeout:
-                print(f"   [Timer] API TIMEOUT")
+                log_llm.warning("API timeout")
                 self.speak_now("Sorry, that took too long.")
             except requests.exceptions.ConnectionError:
-                print(f"   [Plug] CONNECTION ERROR")
+                log_llm.warning("Connection error")
                 self.speak_now("Sorry, I can't connect to my brain.")
             except Exception as e:
-                print(f"   [X] EXCEPTION: {e}")
-                import traceback
-
-                traceback.print_exc()
+                log_commands.exception("Wake command failed: %s", e)
                 self.speak_now("Sorry, something went wrong.")
 
-        threading.Thread(target=execute_in_background, daemon=True).start()
-        print(f"   [Arrows] Wake command queued for execution")
+        self.command_loop.submit(f"wake: {command}", job)
+        log_commands.debug("Wake command queued for execution")
 
     def _notify_wake_word_detected(self):
         """Notify UI that wake word was detected"""
-        try:
-            if hasattr(self, "window") and self.window:
-                self.window.evaluate_js("handleWakeWordDetected()")
-        except:
-            pass
+        self.ui_events.emit("wake_word")
 
     def _notify_command_executed(self, command, response):
         """Notify UI that command was executed"""
-        try:
-            if hasattr(self, "window") and self.window:
-                command_escaped = command.replace('"', '\\"').replace("'", "\\'")
-                response_escaped = response.replace('"', '\\"').replace("'", "\\'")
-                self.window.evaluate_js(
-                    f'handleWakeCommand("{command_escaped}", "{response_escaped}")'
-                )
-        except:
-            pass
+        self.ui_events.emit("wake_command", command=command, response=response or "")
 
     # ============================================
     # PROACTIVE MODE
@@ -682,6 +4780,7 @@ class Api:
     def toggle_proactive_mode(self, enabled):
         """Toggle proactive screen monitoring"""
         self.proactive_mode = enabled
+        self._push_memory_badge()
 
         if enabled:
             if not self.proactive_thread or not self.proactive_thread.is_alive():
@@ -690,16 +4789,16 @@ class Api:
                     target=self._proactive_loop, daemon=True
                 )
                 self.proactive_thread.start()
-                print("[Eye] Proactive mode enabled")
+                log_ui.info("Proactive mode enabled")
                 return {"success": True, "message": "Proactive mode enabled"}
         else:
             self.stop_proactive.set()
-            print("[Eye] Proactive mode disabled")
+            log_ui.info("Proactive mode disabled")
             return {"success": True, "message": "Proactive mode disabled"}
 
     def _proactive_loop(self):
         """Continuous screen monitoring"""
-        print("[Eye] Proactive monitoring started")
+        log_ui.info("Proactive monitoring started")
 
         while not self.stop_proactive.is_set() and self.proactive_mode:
             try:
@@ -714,500 +4813,183 @@ class Api:
                     if (
                         current_time - self.last_suggestion_time
                         >= self.suggestion_cooldown
-                    ):
-                        suggestion = self._generate_suggestion(
-                            screen_text, active_window
-                        )
-
-                        if suggestion:
-                            self.last_suggestion_time = current_time
-                            self._notify_suggestion(suggestion)
-
-                time.sleep(1)
-
-            except Exception as e:
-                time.sleep(2)
-
-        print("[Eye] Proactive monitoring stopped")
-
-    def _generate_suggestion(self, screen_text, active_window):
-        """Generate intelligent suggestion"""
-        try:
-            context = f"""You are MistAI in Proactive Mode. You're monitoring the user's screen.
-
-Current window: {active_window}
-Screen content (OCR): {screen_text[:500]}
-
-Based on what you see, suggest ONE helpful action the user might want to take.
-Your suggestion should be:
-- Brief (1 sentence)
-- Actionable
-- Relevant to what's on screen
-- Natural and helpful
-
-If nothing interesting is happening, return "none".
-
-Respond with ONLY your suggestion text, or "none"."""
-
-            response = requests.post(
-                API_URL,
-                json={"message": context, "model": MODEL, "mode": "suggestion"},
-                timeout=10,
-            )
-
-            if response.ok:
-                data = response.json()
-                suggestion = data.get("response", "").strip()
-
-                if suggestion.lower() in ["none", "no suggestion", ""]:
-                    return None
-
-                if len(suggestion) > 150:
-                    suggestion = suggestion[:147] + "..."
-
-                if suggestion == self.last_suggestion:
-                    return None
-
-                self.last_suggestion = suggestion
-                return suggestion
-
-            return None
-
-        except Exception as e:
-            return None
-
-    def _notify_suggestion(self, suggestion):
-        """Notify UI and show caption for proactive suggestion"""
-        try:
-            self.show_caption(suggestion, "suggestion")
-
-            if hasattr(self, "window") and self.window:
-                suggestion_escaped = suggestion.replace('"', '\\"').replace("'", "\\'")
-                self.window.evaluate_js(
-                    f'handleProactiveSuggestion("{suggestion_escaped}")'
-                )
-
-        except Exception as e:
-            pass
-
-    # ============================================
-    # UTILITY METHODS
-    # ============================================
-
-    def get_user_gender(self):
-        return getattr(self, "user_gender", "none")
-
-    def set_user_gender(self, gender):
-        self.user_gender = gender
-        return {"success": True}
-
-    def get_wake_word_status(self):
-        return {"active": self.wake_word_active, "wake_words": WAKE_WORDS}
-
-    def get_proactive_status(self):
-        return {"enabled": self.proactive_mode}
-
-    def get_captions_status(self):
-        return {"enabled": self.captions_enabled}
-
-    def get_mistai_window_rect(self):
-        try:
-            import win32gui
-
-            hwnd = win32gui.FindWindow(None, "MistAI Desktop Assistant")
-            if hwnd:
-                return win32gui.GetWindowRect(hwnd)
-        except:
-            pass
-        return None
-
-    # ============================================
-    # OCR & VISION METHODS
-    # ============================================
-
-    def find_buttons_on_screen(self):
-        """Find all button-like regions on screen using computer vision"""
-        if not OCR_AVAILABLE:
-            return []
-        
-        try:
-            screenshot = pyautogui.screenshot()
-            screenshot_np = np.array(screenshot)
-            screenshot_np = cv2.cvtColor(screenshot_np, cv2.COLOR_RGB2BGR)
-            
-            mistai_rect = self.get_mistai_window_rect()
-            if mistai_rect:
-                left, top, right, bottom = mistai_rect
-                if left > -10000:
-                    screenshot_np[top:bottom, left:right] = 0
-            
-            screenshot_np[:80, :] = 0
-            
-            gray = cv2.cvtColor(screenshot_np, cv2.COLOR_BGR2GRAY)
-            
-            edges1 = cv2.Canny(gray, 30, 100)
-            edges2 = cv2.Canny(gray, 100, 200)
-            edges = cv2.bitwise_or(edges1, edges2)
-            
-            kernel = np.ones((3,3), np.uint8)
-            edges = cv2.dilate(edges, kernel, iterations=2)
-            
-            contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            buttons = []
-            
-            for contour in contours:
-                x, y, w, h = cv2.boundingRect(contour)
-                
-                if w < 60 or w > 600 or h < 20 or h > 120:
-                    continue
-                
-                aspect_ratio = w / h
-                if aspect_ratio < 1.2 or aspect_ratio > 10:
-                    continue
-                
-                button_region = screenshot_np[y:y+h, x:x+w]
-                button_gray = cv2.cvtColor(button_region, cv2.COLOR_BGR2GRAY)
-                
-                if np.mean(button_gray) < 128:
-                    button_gray = cv2.bitwise_not(button_gray)
-                
-                button_gray = cv2.resize(button_gray, None, fx=3, fy=3, interpolation=cv2.INTER_CUBIC)
-                button_gray = cv2.normalize(button_gray, None, 0, 255, cv2.NORM_MINMAX)
-                button_gray = cv2.adaptiveThreshold(
-                    button_gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                    cv2.THRESH_BINARY, 11, 2
-                )
-                
-                text = pytesseract.image_to_string(
-                    button_gray, 
-                    config="--oem 3 --psm 7 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz "
-                ).strip()
-                
-                if text and len(text) >= 2:
-                    buttons.append((x, y, w, h, text))
-            
-            return buttons
-            
-        except Exception as e:
-            print(f"   [X] Button detection error: {e}")
-            return []
-
-    def find_text_on_screen(self, search_text, confidence=45, save_debug=None):
-        """HYBRID text finder with multiple OCR strategies"""
-        if save_debug is None:
-            save_debug = DEBUG_MODE
-            
-        if not OCR_AVAILABLE:
-            print("   [X] OCR not available")
-            return None
-
-        try:
-            screenshot = pyautogui.screenshot()
-            screenshot_np = np.array(screenshot)
-            screenshot_np = cv2.cvtColor(screenshot_np, cv2.COLOR_RGB2BGR)
-            
-            original_screenshot = screenshot_np.copy() if save_debug else None
-
-            print(f"   [Search] HYBRID search for: '{search_text}'")
-            
-            print(f"   [Circle] Step 1: Detecting UI buttons...")
-            buttons = self.find_buttons_on_screen()
-            
-            if buttons:
-                print(f"   [List] Found {len(buttons)} button(s):")
-                for i, (x, y, w, h, text) in enumerate(buttons[:5], 1):
-                    print(f"      {i}. '{text}' at ({x},{y})")
-                
-                search_lower = search_text.lower()
-                best_match = self._match_button(buttons, search_lower)
-                
-                if best_match:
-                    x, y, w, h, text = best_match
-                    print(f"   [Check] BUTTON MATCH: '{text}'")
-                    if save_debug:
-                        self._save_debug_screenshot(original_screenshot, buttons, best_match, search_text, "button")
-                    return (x, y, w, h)
-
-            print(f"   [Document] Step 2: Trying enhanced OCR...")
-            
-            mistai_rect = self.get_mistai_window_rect()
-            if mistai_rect:
-                left, top, right, bottom = mistai_rect
-                if left > -10000:
-                    screenshot_np[top:bottom, left:right] = 0
-            screenshot_np[:80, :] = 0
-            
-            best_match = None
-            best_score = 0
-            best_strategy = ""
-            
-            gray1 = cv2.cvtColor(screenshot_np, cv2.COLOR_BGR2GRAY)
-            match1, score1 = self._ocr_search(gray1, search_text, confidence)
-            if score1 > best_score:
-                best_match, best_score, best_strategy = match1, score1, "light"
-            
-            gray2 = cv2.bitwise_not(gray1)
-            match2, score2 = self._ocr_search(gray2, search_text, confidence)
-            if score2 > best_score:
-                best_match, best_score, best_strategy = match2, score2, "inverted"
-            
-            gray3 = cv2.normalize(gray1, None, 0, 255, cv2.NORM_MINMAX)
-            gray3 = cv2.convertScaleAbs(gray3, alpha=1.5, beta=0)
-            match3, score3 = self._ocr_search(gray3, search_text, confidence)
-            if score3 > best_score:
-                best_match, best_score, best_strategy = match3, score3, "contrast"
-            
-            MIN_SCORE = 70 if len(search_text.split()) == 1 else 85
-            
-            if best_match and best_score >= MIN_SCORE:
-                print(f"   [Check] OCR MATCH: score={best_score} strategy={best_strategy}")
-                if save_debug:
-                    x, y, w, h = best_match
-                    self._save_debug_screenshot(
-                        original_screenshot, [], 
-                        (x, y, w, h, search_text), 
-                        search_text, "ocr"
-                    )
-                return best_match
-            
-            print(f"   [X] NOT FOUND (best score: {best_score}, needed: {MIN_SCORE})")
-            
-            if save_debug:
-                self._save_debug_screenshot(original_screenshot, buttons, None, search_text, "failed")
-            
-            return None
-            
-        except Exception as e:
-            print(f"   [X] Error: {e}")
-            import traceback
-            traceback.print_exc()
-            return None
-        
-    def _match_button(self, buttons, search_text):
-        """Match search text to detected buttons"""
-        search_lower = search_text.lower()
-        search_words = search_lower.split()
-        
-        best_button = None
-        best_score = 0
-        
-        for x, y, w, h, text in buttons:
-            text_lower = text.lower()
-            score = 0
-            
-            if text_lower == search_lower:
-                score = 100
-            elif all(word in text_lower for word in search_words):
-                score = 95
-            elif search_lower in text_lower:
-                score = 85
-            else:
-                similarity = difflib.SequenceMatcher(None, text_lower, search_lower).ratio()
-                score = int(similarity * 100)
-            
-            if score > best_score:
-                best_score = score
-                best_button = (x, y, w, h, text)
-        
-        if best_button and best_score >= 60:
-            return best_button
-        return None
-
-    def _ocr_search(self, gray_image, search_text, confidence):
-        """Perform OCR search on preprocessed image"""
-        try:
-            gray = cv2.resize(gray_image, None, fx=2, fy=2, interpolation=cv2.INTER_CUBIC)
-            
-            ocr_data = pytesseract.image_to_data(
-                gray,
-                output_type=pytesseract.Output.DICT,
-                config="--oem 3 --psm 11"
-            )
-            
-            search_lower = search_text.lower()
-            best_match = None
-            best_score = 0
-            
-            for i, word in enumerate(ocr_data["text"]):
-                if not word.strip() or len(word) < 2:
-                    continue
-                
-                word_lower = word.lower()
-                conf = int(ocr_data["conf"][i])
-                
-                if conf < confidence:
-                    continue
-                
-                score = 0
-                if word_lower == search_lower:
-                    score = 100
-                elif search_lower in word_lower:
-                    score = 85
-                elif word_lower in search_lower:
-                    score = 75
-                else:
-                    similarity = difflib.SequenceMatcher(None, word_lower, search_lower).ratio()
-                    score = int(similarity * 100)
-                
-                if score > best_score:
-                    x = int(ocr_data["left"][i] / 2)
-                    y = int(ocr_data["top"][i] / 2)
-                    w = int(ocr_data["width"][i] / 2)
-                    h = int(ocr_data["height"][i] / 2)
-                    
-                    best_match = (x, y, w, h)
-                    best_score = score
-            
-            return best_match, best_score
-            
-        except Exception as e:
-            print(f"   [Warning] OCR strategy error: {e}")
-            return None, 0
+                    ):
+                        suggestion = self._generate_suggestion(
+                            screen_text, active_window
+                        )
 
-    def _save_debug_screenshot(self, screenshot, buttons, matched_element, search_text, mode="button"):
-        """Save debug screenshot with auto-cleanup"""
-        if not DEBUG_MODE:
-            return
-        try:
-            debug_dir = os.path.join(os.path.expanduser("~"), "MistAI", "ocr_debug")   
-                    
-            if not os.path.exists(debug_dir):
-                os.makedirs(debug_dir)
-                print(f"   [Folder] Created debug dir: {debug_dir}")
-            
-            try:
-                debug_files = [f for f in os.listdir(debug_dir) if f.endswith('.png')]
-                if debug_files:
-                    debug_files.sort(key=lambda f: os.path.getmtime(os.path.join(debug_dir, f)))
-                    
-                    if len(debug_files) > 50:
-                        for old_file in debug_files[:-50]:
-                            try:
-                                os.remove(os.path.join(debug_dir, old_file))
-                            except:
-                                pass
-            except Exception as cleanup_error:
-                print(f"   [Warning] Cleanup warning: {cleanup_error}")
-            
-            timestamp = datetime.now().strftime("%H%M%S")
-            debug_image = screenshot.copy()
-            
-            if buttons:
-                for bx, by, bw, bh, btn_text in buttons:
-                    cv2.rectangle(debug_image, (bx, by), (bx+bw, by+bh), (255, 100, 0), 2)
-                    cv2.putText(debug_image, btn_text[:20], (bx, by-5), 
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 100, 0), 1)
-            
-            if matched_element:
-                x, y, w, h, text = matched_element
-                cv2.rectangle(debug_image, (x, y), (x+w, y+h), (0, 255, 0), 4)
-                cv2.putText(debug_image, f"MATCH: {text}", (x, y-10), 
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-            
-            text_y = debug_image.shape[0] - 30
-            cv2.rectangle(debug_image, (0, text_y - 25), (debug_image.shape[1], debug_image.shape[0]), (0, 0, 0), -1)
-            cv2.putText(debug_image, f"Searched: '{search_text}' | Mode: {mode}", (10, text_y),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
-            
-            safe_search = "".join(c for c in search_text if c.isalnum() or c in (' ', '_'))[:30]
-            safe_search = safe_search.replace(' ', '_')
-            filename = os.path.join(debug_dir, f"{mode}_{timestamp}_{safe_search}.png")
-            
-            success = cv2.imwrite(filename, debug_image)
-            if success:
-                print(f"   [Disk] Debug saved: {filename}")
-            else:
-                print(f"   [X] Failed to save debug screenshot")
-            
-        except Exception as e:
-            print(f"   [Warning] Debug screenshot error: {e}")
+                        if suggestion:
+                            self.last_suggestion_time = current_time
+                            self._notify_suggestion(suggestion)
 
-    def read_screen_text(self):
-        """Fast screen reading"""
-        if not OCR_AVAILABLE:
-            return "OCR not available"
-        
+                time.sleep(1)
+
+            except Exception as e:
+                time.sleep(2)
+
+        log_ui.info("Proactive monitoring stopped")
+
+    def _generate_suggestion(self, screen_text, active_window):
+        """Generate intelligent suggestion"""
         try:
-            screenshot = pyautogui.screenshot()
-            width, height = screenshot.size
-            
-            cropped = screenshot.crop((
-                width // 3, 
-                height // 3 + 50,
-                2 * width // 3, 
-                2 * height // 3
-            ))
+            context = f"""You are MistAI in Proactive Mode. You're monitoring the user's screen.
 
-            image_np = np.array(cropped)
-            image_np = cv2.cvtColor(image_np, cv2.COLOR_RGB2BGR)
+Current window: {active_window}
+Screen content (OCR): {screen_text[:500]}
+
+Based on what you see, suggest ONE helpful action the user might want to take.
+Your suggestion should be:
+- Brief (1 sentence)
+- Actionable
+- Relevant to what's on screen
+- Natural and helpful
+
+If nothing interesting is happening, return "none".
+
+Respond with ONLY your suggestion text, or "none"."""
+
+            with TRACER.span("llm.request", "llm", mode="suggestion", model=MODEL) as span:
+                suggestion, backend = self.model_router.complete(context, "suggestion", MODEL, timeout=10)
+                span.set(backend=backend)
+
+            suggestion = suggestion.strip()
+            if suggestion.lower() in ["none", "no suggestion", ""]:
+                return None
+
+            if len(suggestion) > 150:
+                suggestion = suggestion[:147] + "..."
+
+            if suggestion == self.last_suggestion:
+                return None
+
+            self.last_suggestion = suggestion
+            return suggestion
 
-            text, _, _ = self.auto_psm_ocr(image_np, action="read", enhance=False)
-            
-            self.last_screenshot_text = text
-            return text if text.strip() else "No readable text"
-            
         except Exception as e:
-            return f"OCR error: {str(e)}"
+            return None
 
-    def click_on_text(self, search_text):
-        """Click with button detection"""
-        coords = self.find_text_on_screen(search_text)
-        if coords:
-            x, y, w, h = coords
-            click_x = x + w // 2
-            click_y = y + h // 2
-            
-            print(f"   [Mouse] Clicking at ({click_x}, {click_y})")
-            pyautogui.moveTo(click_x, click_y, duration=0.3)
-            time.sleep(0.1)
-            pyautogui.click()
-            
-            self.track_action(f"clicked '{search_text}'")
-            return True
-        return False
+    def _notify_suggestion(self, suggestion):
+        """Notify UI and show caption for proactive suggestion"""
+        self.show_caption(suggestion, "suggestion")
+        self.ui_events.emit("suggestion", text=suggestion)
 
-    def get_active_window(self):
+    # ============================================
+    # UTILITY METHODS
+    # ============================================
+
+    def get_user_gender(self):
+        return getattr(self, "user_gender", "none")
+
+    def set_user_gender(self, gender):
+        self.user_gender = gender
+        return {"success": True}
+
+    def get_wake_word_status(self):
+        return {"active": self.wake_word_active, "wake_words": WAKE_WORDS}
+
+    def get_proactive_status(self):
+        return {"enabled": self.proactive_mode}
+
+    def get_captions_status(self):
+        return {"enabled": self.captions_enabled}
+
+    # ============================================
+    # OCR & VISION METHODS
+    # ============================================
+
+    def read_screen_layout(self):
+        """Layout of the active window (headings, buttons, body in reading order)
+
+        When MistAI itself is in front, the rest of its monitor is read
+        instead, with the MistAI window blanked out.
+        """
+        if not ocr_available():
+            return None
+
+        capture = self.screen_capture
+        monitor = capture.monitors()[self._monitor_order()[0]]
+        region, title = monitor, self.get_active_window()
+        mistai_rect = self.get_mistai_window_rect()
         try:
             import win32gui
 
-            window = win32gui.GetForegroundWindow()
-            title = win32gui.GetWindowText(window)
-            self.active_window = title
-            return title
+            rect = win32gui.GetWindowRect(win32gui.GetForegroundWindow())
+            if rect != tuple(mistai_rect or ()) and rect[0] > -10000:
+                left, top, width, height = capture.region_for_screen_rect(*rect)
+                right, bottom = left + width, top + height
+                m_left, m_top, m_width, m_height = monitor
+                left, top = max(left, m_left), max(top, m_top)
+                right, bottom = min(right, m_left + m_width), min(bottom, m_top + m_height)
+                if right - left > 50 and bottom - top > 50:
+                    region = (left, top, right - left, bottom - top)
         except:
-            return "Unknown"
+            pass
 
-    def auto_psm_ocr(self, image, action="read", enhance=True):
-        """Fast OCR with optional enhancement"""
-        try:
-            if len(image.shape) == 3 and image.shape[2] == 3:
-                gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            else:
-                gray = image
-
-            if enhance:
-                gray = cv2.resize(gray, None, fx=1.5, fy=1.5, interpolation=cv2.INTER_LINEAR)
-                gray = cv2.normalize(gray, None, 0, 255, cv2.NORM_MINMAX)
-                gray = cv2.bilateralFilter(gray, 5, 50, 50)
-
-            if action == "button":
-                psm = 11
-            elif action == "line":
-                psm = 7
-            elif action == "read":
-                psm = 6
-            else:
-                psm = 3
+        gray = capture.grab_gray(region, slot="read")
+        transform = capture.transform(region)
+        if region == monitor and mistai_rect:
+            left, top, right, bottom = transform.inverse_rect(*mistai_rect)
+            gray[max(0, top):max(0, bottom), max(0, left):max(0, right)] = 0
+
+        with TRACER.span("vision.read_screen", "vision") as span:
+            layout = self.layout_reader.read(gray, transform=transform, title=title)
+            span.set(cached=layout["cached"], lines=len(layout["body"]) + len(layout["headings"]) + len(layout["buttons"]))
+        self.last_screen_layout = layout
+        return layout
+
+    def prefetch_screen_context(self, reason):
+        """Start reading the active window while the user is still talking
+
+        Runs read_screen_layout() in the background on the wake word or at
+        the end of speech, so OCR overlaps with recognition. The result
+        lands in the layout reader's per-frame cache. ask_mistai's
+        read_screen_text(consume_prefetch=True) waits for it and then reuses
+        it only if the frame signature is unchanged. A screen that moved on
+        in between is read fresh. Other readers leave the prefetch alone.
+        """
+        if not ocr_available():
+            return
+        future = self._prefetch_future
+        if future is not None and not future.done():
+            return
+        self._prefetch_stats["started"] += 1
+        self._prefetch_future = self.command_loop.run_in_background(self._run_prefetch, reason)
 
-            config = f"--oem 3 --psm {psm}"
-            text = pytesseract.image_to_string(gray, config=config)
+    def _run_prefetch(self, reason):
+        with TRACER.span("vision.prefetch", "vision", reason=reason) as span:
+            layout = self.read_screen_layout()
+            span.set(cached=bool(layout and layout["cached"]))
 
-            return text, 0, psm
+    def read_screen_text(self, budget=SCREEN_SUMMARY_CHARS, consume_prefetch=False):
+        """Structured summary of the active window within budget characters
 
+        consume_prefetch: wait for and account the pending screen prefetch
+        (the command path only).
+        """
+        if not ocr_available():
+            return "OCR not available"
+        
+        try:
+            prefetch = None
+            if consume_prefetch:
+                prefetch, self._prefetch_future = self._prefetch_future, None
+            if prefetch is not None:
+                with TRACER.span("vision.prefetch_wait", "vision"):
+                    try:
+                        prefetch.result(timeout=PREFETCH_WAIT)
+                    except Exception:
+                        pass
+            self.last_screen_layout = None
+            layout = self.read_screen_layout()
+            if prefetch is not None:
+                # A cache hit means the prefetched frame still matched the screen
+                self._prefetch_stats["used" if layout["cached"] else "discarded"] += 1
+            text = summarize_layout(layout, budget)
+            self.last_screenshot_text = text
+            return text if text.strip() else "No readable text"
+            
         except Exception as e:
-            print(f"   [X] OCR error: {e}")
-            return "", 0, 3
+            return f"OCR error: {str(e)}"
 
     def get_running_apps(self):
         try:
@@ -1239,19 +5021,20 @@ Respond with ONLY your suggestion text, or "none"."""
         except:
             return []
 
-    def get_context_summary(self):
+    def get_context_summary(self, running=None):
         summary_parts = []
         active = self.get_active_window()
         if active and active != "Unknown":
             summary_parts.append(f"Current window: {active}")
         if self.actions_performed:
-            recent = list(self.actions_performed)[-5:]
+            recent = self.actions_performed.last(5)
             summary_parts.append(f"Recent actions: {', '.join(recent)}")
         if self.opened_apps:
-            summary_parts.append(f"Apps opened: {', '.join(self.opened_apps)}")
+            summary_parts.append(f"Apps opened: {', '.join(self.opened_apps.snapshot())}")
         if self.context.get("last_action"):
             summary_parts.append(f"Last action: {self.context['last_action']}")
-        running = self.get_running_apps()
+        if running is None:
+            running = self.get_running_apps()
         if running:
             summary_parts.append(f"Running apps: {', '.join(running[:5])}")
         return " | ".join(summary_parts) if summary_parts else "No context"
@@ -1287,29 +5070,76 @@ Respond with ONLY your suggestion text, or "none"."""
 
             return False
         except Exception as e:
-            print(f"Focus error: {e}")
+            log_action.debug("Focus error: %s", e)
             return False
 
     def add_to_history(self, role, message):
-        self.conversation_history.append(
-            {"role": role, "message": message, "timestamp": datetime.now().isoformat()}
-        )
-        if len(self.conversation_history) > 20:
-            self.conversation_history = self.conversation_history[-20:]
+        self.conversation_history.append(Turn(role, message))
+        store = self._get_memory_store()
+        if store:
+            store.append(role, message, app_from_title(self.active_window))
+        self._push_memory_badge()
 
     def track_action(self, action):
         self.actions_performed.append(action)
         self.context["last_action"] = action
-        if len(self.actions_performed) > 10:
-            self.actions_performed = self.actions_performed[-10:]
+        store = self._get_memory_store()
+        if store:
+            store.append("action", action, app_from_title(self.active_window))
+        self._push_memory_badge()
+
+    def _push_memory_badge(self):
+        """Send the memory badge counters to the UI if they changed"""
+        badge = {
+            "conversation_length": len(self.conversation_history),
+            "actions_performed": len(self.actions_performed),
+            "wake_word_active": self.wake_word_active,
+            "proactive_mode": self.proactive_mode,
+            "captions_enabled": self.captions_enabled,
+        }
+        if badge != self._memory_badge:
+            self._memory_badge = badge
+            self.ui_events.emit("memory", **badge)
 
     def get_conversation_context(self):
         if not self.conversation_history:
             return "No previous conversation"
         return "\n".join(
-            [f"{m['role']}: {m['message']}" for m in self.conversation_history[-8:]]
+            [f"{m.role}: {m.message}" for m in self.conversation_history.last(8)]
         )
 
+    def get_relevant_history(self, message, app=None, budget=HISTORY_TOKEN_BUDGET):
+        """Past turns worth showing the model: the latest exchange plus the
+        older turns and actions most similar to this request, within budget
+        estimated tokens"""
+        store = self._get_memory_store()
+        index = self._get_history_index()
+        turns = []
+        if store and index:
+            with TRACER.span("memory.retrieve", "context") as span:
+                for turn in reversed(store.recent(4, ("user", "assistant"))):
+                    cost = estimate_tokens(turn["text"])
+                    if cost > budget:
+                        break
+                    turns.insert(0, turn)
+                    budget -= cost
+                related = index.top_k(message, budget=budget, exclude={t["id"] for t in turns}, app=app)
+                turns = sorted(turns + related, key=lambda t: t["id"])
+                span.set(recent=len(turns) - len(related), related=len(related))
+        elif store:
+            turns = store.relevant_turns(message, app)
+        if not turns:
+            return (
+                "\n".join(f"{m.role}: {m.message}" for m in self.conversation_history.last(5))
+                or "No previous conversation"
+            )
+        lines = []
+        for turn in turns:
+            stamp = datetime.fromtimestamp(turn["ts"]).strftime("%b %d %H:%M")
+            earlier = "" if turn["session"] == store.session else f" (earlier, {stamp})"
+            lines.append(f"{turn['kind']}{earlier}: {turn['text']}")
+        return "\n".join(lines)
+
     def get_memory_stats(self):
         return {
             "conversation_length": len(self.conversation_history),
@@ -1319,53 +5149,72 @@ Respond with ONLY your suggestion text, or "none"."""
             "wake_word_active": self.wake_word_active,
             "proactive_mode": self.proactive_mode,
             "captions_enabled": self.captions_enabled,
+            "stored_events": self._memory_store.stats()["rows"] if self._memory_store else 0,
+        }
+
+    def get_perf_stats(self):
+        """Latency aggregates per span, the most recent spans and startup phases"""
+        return {
+            "spans": TRACER.stats(),
+            "recent": TRACER.recent(50),
+            "startup": STARTUP.summary(),
+            "screen_prefetch": dict(self._prefetch_stats),
+            "inference": self.model_router.stats(),
+            "response_cache": dict(self._response_cache.stats, entries=len(self._response_cache))
+            if self._response_cache is not None
+            else None,
         }
 
-    def sync_opened_apps(self):
+    def export_perf_trace(self):
+        """Write the span ring buffer as Chrome trace JSON under ~/MistAI/traces"""
+        try:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            path = TRACER.export_chrome_trace(os.path.join(DATA_DIR, "traces", f"trace_{timestamp}.json"))
+            log.info("Trace exported: %s", path)
+            return {"success": True, "path": path}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    def sync_opened_apps(self, running=None):
         try:
-            for app in self.get_running_apps():
-                self.opened_apps.add(app)
+            self.opened_apps.update(self.get_running_apps() if running is None else running)
         except:
             pass
 
     def check_api_status(self):
-        try:
-            response = requests.get(STATUS_URL, timeout=2)
-            data = response.json()
-            return {
-                "online": data.get("status") == "online",
-                "reason": data.get("down_reason", ""),
-            }
-        except:
-            return {"online": False, "reason": "Connection error"}
+        """Current backend status as last observed; never touches the network"""
+        return self.health.status()
 
     def ask_mistai(self, message, model="gemini", gender="none"):
-        self.sync_opened_apps()
         try:
-            context_summary = self.get_context_summary()
-            active_window = self.get_active_window()
-
-            conversation_context = (
-                "\n".join(
-                    [
-                        f"{msg['role']}: {msg['message']}"
-                        for msg in self.conversation_history[-5:]
-                    ]
-                )
-                if self.conversation_history
-                else "No previous conversation"
-            )
-
-            screen_context = ""
-            if OCR_AVAILABLE:
-                print("   [Camera] Taking fresh screenshot for context...")
-                screen_text = self.read_screen_text()
-                screen_context = f"\nVISIBLE ON SCREEN RIGHT NOW: {screen_text[:500]}"
-                
-                buttons = self.find_buttons_on_screen()
-                if buttons:
-                    button_texts = [btn[4] for btn in buttons[:15]]
-                    screen_context += f"\nVISIBLE BUTTONS: {', '.join(button_texts)}"
+            with TRACER.span("context.gather", "context"):
+                # One process scan feeds the app list, summary and prompt
+                running_apps = self.get_running_apps()
+                self.sync_opened_apps(running_apps)
+                context_summary = self.get_context_summary(running_apps)
+                active_window = self.get_active_window()
+
+                with TRACER.span("context.memory", "context"):
+                    conversation_context = self.get_relevant_history(message, app_from_title(active_window))
+
+                screen_context = ""
+                screen_text = ""
+                if ocr_available():
+                    log_vision.debug("Taking fresh screenshot for context...")
+                    # One layout pass supplies both the text and its "Buttons:" line
+                    with TRACER.span("context.screen_text", "vision"):
+                        screen_text = self.read_screen_text(consume_prefetch=True)
+                    screen_context = f"\nVISIBLE ON SCREEN RIGHT NOW:\n{screen_text}"
+
+            response_cache = self._get_response_cache()
+            intent = normalize_intent(message)
+            fingerprint = response_cache.fingerprint(intent, model, active_window, screen_text, gender)
+            command = response_cache.get(intent, fingerprint)
+            if command:
+                log_llm.info("Response cache hit: '%s'", intent)
+                self.add_to_history("user", message)
+                self.add_to_history("assistant", command.get("speech", ""))
+                return {"success": True, "command": command, "cached": True}
 
             system_prompt = f"""You are MistAI, a Jarvis-like desktop AI assistant created by Kristian. You control the user's computer through vision and actions.
 
@@ -1387,7 +5236,7 @@ COMMUNICATION STYLE:
 
 CURRENT SITUATION:
 Active Window: {active_window}
-Running Apps: {', '.join(self.get_running_apps())}
+Running Apps: {', '.join(running_apps)}
 Context: {context_summary}
 
 WHAT YOU CAN SEE RIGHT NOW (FRESH OCR):
@@ -1398,7 +5247,7 @@ RECENT CONVERSATION:
 
 CRITICAL RULES FOR CLICKING:
 1. **If user asks to click on something**: 
-- Check if it's in "VISIBLE ON SCREEN RIGHT NOW" or "VISIBLE BUTTONS"
+- Check if it's in "VISIBLE ON SCREEN RIGHT NOW" (including its "Buttons:" line)
 - If YES -> use click_on_text action
 - If NO -> use click_on_text anyway and let OCR try harder (it can see more than the preview)
 - NEVER say "I don't see it" without trying click_on_text first
@@ -1437,148 +5286,163 @@ REMEMBER:
 - Be ACTION-FIRST, not cautious
 - You're a DO-er, not a "let me check first"-er"""
 
-            response = requests.post(
-                API_URL,
-                json={"message": system_prompt, "model": model, "mode": "assistant"},
-                timeout=30,
-            )
+            with TRACER.span("llm.request", "llm", mode="assistant", model=model) as span:
+                ai_response, backend = self.model_router.complete(system_prompt, "assistant", model, timeout=30)
+                span.set(backend=backend, prompt_chars=len(system_prompt))
 
-            if response.ok:
-                ai_response = response.json().get("response", "")
-                try:
+            try:
+                with TRACER.span("llm.parse", "llm"):
                     json_str = ai_response
                     if "```json" in json_str:
                         json_str = json_str.split("```json")[1].split("```")[0]
                     elif "```" in json_str:
                         json_str = json_str.split("```")[1].split("```")[0]
                     command = json.loads(json_str.strip())
-                    self.add_to_history("user", message)
-                    self.add_to_history("assistant", command.get("speech", ""))
-                    return {"success": True, "command": command}
-                except:
-                    self.add_to_history("user", message)
-                    self.add_to_history("assistant", ai_response)
-                    return {
-                        "success": True,
-                        "command": {
-                            "action": "none",
-                            "parameter": "",
-                            "speech": ai_response,
-                        },
-                    }
+                self.add_to_history("user", message)
+                self.add_to_history("assistant", command.get("speech", ""))
+                response_cache.put(intent, fingerprint, command, screen_text)
+                return {"success": True, "command": command}
+            except:
+                self.add_to_history("user", message)
+                self.add_to_history("assistant", ai_response)
+                return {
+                    "success": True,
+                    "command": {
+                        "action": "none",
+                        "parameter": "",
+                        "speech": ai_response,
+                    },
+                }
+        except InferenceError as e:
+            log_llm.error("Inference failed: %s", e)
             return {"success": False, "error": "API failed"}
         except Exception as e:
             return {"success": False, "error": str(e)}
 
     def execute_action(self, action_type, parameter, speech=""):
-        """Execute action with FULL caption support"""
+        """Queue an action on the command loop (pre-empts any stale command)"""
 
-        def run():
-            try:
-                print(f"\n[Wrench] EXECUTING ACTION: {action_type} | Param: {parameter}")
+        async def job(token):
+            with TRACER.span("command.action", "command", action=action_type):
+                await self.command_loop.run_command(token, self._run_action, action_type, parameter, speech)
 
-                if action_type == "multi_step":
-                    if isinstance(parameter, list):
-                        if self.captions_enabled:
-                            self.show_caption(f"Starting multi-step task...", "assistant")
-                        
-                        for i, step in enumerate(parameter):
-                            if isinstance(step, str):
-                                step = {"action": step, "parameter": ""}
-                            elif not isinstance(step, dict):
-                                continue
+        self.command_loop.submit(f"action: {action_type}", job)
+        return {"success": True}
 
-                            action_name = step.get("action", "none")
-                            action_param = step.get("parameter", "")
+    def _run_action(self, action_type, parameter, speech=""):
+        """Execute action with FULL caption support (runs via CommandLoop.run_command)"""
+        try:
+            log_action.info("Executing action: %s | Param: %s", action_type, parameter)
 
-                            print(f"\n[Pin] Step {i+1}/{len(parameter)}: {action_name} - {action_param}")
-                            
-                            if self.captions_enabled:
-                                step_caption = f"Step {i+1}/{len(parameter)}: {self._get_action_caption(action_name, action_param)}"
-                                self.show_caption(step_caption, "assistant")
+            if action_type == "multi_step":
+                if isinstance(parameter, list):
+                    if self.captions_enabled:
+                        self.show_caption(f"Starting multi-step task...", "assistant")
+                    
+                    for i, step in enumerate(parameter):
+                        check_cancelled()
+                        if isinstance(step, str):
+                            step = {"action": step, "parameter": ""}
+                        elif not isinstance(step, dict):
+                            continue
 
-                            success = self.execute_action_sync(action_name, action_param)
+                        action_name = step.get("action", "none")
+                        action_param = step.get("parameter", "")
 
-                            print(f"   {'[Check]' if success else '[X]'} Step {i+1}")
+                        log_action.debug("Step %d/%d: %s - %s", i + 1, len(parameter), action_name, action_param)
+                        
+                        if self.captions_enabled:
+                            step_caption = f"Step {i+1}/{len(parameter)}: {self._get_action_caption(action_name, action_param)}"
+                            self.show_caption(step_caption, "assistant")
 
-                            if not success and action_name in ["open_app", "click_on_text", "type_search"]:
-                                if self.captions_enabled:
-                                    self.show_caption(f"❌ Step {i+1} failed, stopping", "assistant")
-                                if speech:
-                                    self.speak_now("Sorry, I couldn't complete that task.")
-                                return
-
-                            if action_name == "open_app":
-                                time.sleep(2.0)
-                                if OCR_AVAILABLE:
-                                    self.last_screenshot_text = self.read_screen_text()
-
-                            elif action_name == "click_on_text":
-                                time.sleep(1.5)
-                                if OCR_AVAILABLE:
-                                    self.last_screenshot_text = self.read_screen_text()
-
-                            elif action_name == "type_search":
-                                time.sleep(1.3)
-
-                            elif action_name in ["press_key", "click"]:
-                                time.sleep(0.5)
-                            else:
-                                time.sleep(0.8)
+                        success = self.execute_action_sync(action_name, action_param, announce=False)
 
-                        if self.captions_enabled:
-                            self.show_caption("✅ Task completed!", "assistant")
-                        
-                        if speech:
-                            self.speak_now(speech, interrupt=False)
-                        return
+                        log_action.debug("Step %d %s", i + 1, "succeeded" if success else "failed")
 
-                self.execute_action_sync(action_type, parameter)
+                        if not success and action_name in ["open_app", "click_on_text", "type_search"]:
+                            if self.captions_enabled:
+                                self.show_caption(f"Step {i+1} failed, stopping", "error")
+                            if speech:
+                                self.speak_now("Sorry, I couldn't complete that task.")
+                            return
+
+                        if action_name == "open_app":
+                            command_sleep(2.0)
+                            if ocr_available():
+                                self.last_screenshot_text = self.read_screen_text()
+
+                        elif action_name == "click_on_text":
+                            command_sleep(1.5)
+                            if ocr_available():
+                                self.last_screenshot_text = self.read_screen_text()
+
+                        elif action_name == "type_search":
+                            command_sleep(1.3)
+
+                        elif action_name in ["press_key", "click"]:
+                            command_sleep(0.5)
+                        else:
+                            command_sleep(0.8)
 
-                if speech and action_type != "multi_step":
-                    self.speak_now(speech, interrupt=False)
+                    if self.captions_enabled:
+                        self.show_caption("✅ Task completed!", "assistant")
+                    
+                    if speech:
+                        self.speak_now(speech, interrupt=False)
+                    return
 
-            except Exception as e:
-                print(f"[X] Action error: {e}")
-                if self.captions_enabled:
-                    self.show_caption(f"❌ Error: {str(e)[:50]}", "assistant")
+            self.execute_action_sync(action_type, parameter)
 
-        threading.Thread(target=run, daemon=True).start()
-        return {"success": True}
+            if speech and action_type != "multi_step":
+                self.speak_now(speech, interrupt=False)
+
+        except CommandCancelled:
+            raise
+        except Exception as e:
+            log_action.exception("Action error: %s", e)
+            if self.captions_enabled:
+                self.show_caption(f"Error: {str(e)[:50]}", "error")
 
-    def execute_action_sync(self, action_type, parameter):
+    def execute_action_sync(self, action_type, parameter, announce=True):
         """Execute single action with MistAI-powered recovery"""
+        with TRACER.span(f"action.{action_type}", "action", parameter=str(parameter)[:60]) as span:
+            success = self._execute_action_sync(action_type, parameter, announce)
+            span.set(success=success)
+        return success
+
+    def _execute_action_sync(self, action_type, parameter, announce=True):
         try:
-            print(f"\n[Target] SYNC ACTION: {action_type} | Param: {parameter}")
+            log_action.info("Sync action: %s | Param: %s", action_type, parameter)
             
-            if self.captions_enabled:
+            # One progress caption per action; the branches below only report outcomes
+            if self.captions_enabled and announce:
                 action_caption = self._get_action_caption(action_type, parameter)
                 self.show_caption(action_caption, "assistant")
 
             if action_type == "click_on_text":
-                print(f"[Mouse] Clicking on text: {parameter}")
+                log_action.debug("Clicking on text: %s", parameter)
                 
-                if OCR_AVAILABLE:
-                    print(f"   [Search] Searching for text...")
+                if ocr_available():
+                    log_action.debug("Searching for text...")
                     
                     result = self.click_on_text(parameter)
                     
                     if result:
-                        print(f"   [Check] Found and clicked '{parameter}'")
+                        log_action.info("Found and clicked '%s'", parameter)
                         if self.captions_enabled:
                             self.show_caption(f"✅ Clicked '{parameter}'", "assistant")
-                        time.sleep(0.8)
+                        command_sleep(0.8)
                         return True
                     
-                    print(f"   [X] Could not find '{parameter}'")
+                    log_action.info("Could not find '%s'", parameter)
                     if self.captions_enabled:
-                        self.show_caption(f"❌ Can't find '{parameter}', thinking...", "assistant")
+                        self.show_caption(f"Can't find '{parameter}', thinking...", "assistant")
                     
                     screen_text = self.read_screen_text()
-                    buttons = self.find_buttons_on_screen()
-                    button_texts = [btn[4] for btn in buttons] if buttons else []
+                    buttons = (self.last_screen_layout or {}).get("buttons", [])
+                    button_texts = [btn[4] for btn in buttons]
                     
-                    print(f"   [Brain] Asking MistAI for recovery strategy...")
+                    log_action.info("Asking MistAI for recovery strategy...")
                     
                     recovery_result = self._ask_for_recovery(
                         failed_action="click_on_text",
@@ -1593,44 +5457,44 @@ REMEMBER:
                         recovery_param = recovery_cmd.get("parameter")
                         recovery_speech = recovery_cmd.get("speech", "")
                         
-                        print(f"   [Cycle] MistAI suggests: {recovery_action} | {recovery_param}")
+                        log_action.info("MistAI suggests: %s | %s", recovery_action, recovery_param)
                         
                         if self.captions_enabled and recovery_speech:
                             self.show_caption(recovery_speech, "assistant")
                         
                         if recovery_action == "click_on_text" and recovery_param != parameter:
-                            print(f"   [Cycle] Trying alternative: '{recovery_param}'")
+                            log_action.debug("Trying alternative: '%s'", recovery_param)
                             alt_result = self.click_on_text(recovery_param)
                             if alt_result:
-                                print(f"   [Check] Recovery successful!")
+                                log_action.info("Recovery successful!")
                                 if self.captions_enabled:
                                     self.show_caption(f"✅ Found it as '{recovery_param}'", "assistant")
                                 return True
                         
                         elif recovery_action == "scroll":
-                            print(f"   [Cycle] Scrolling {recovery_param}...")
+                            log_action.debug("Scrolling %s...", recovery_param)
                             if self.captions_enabled:
                                 self.show_caption(f"Scrolling {recovery_param}...", "assistant")
                             
-                            pyautogui.scroll(300 if recovery_param == "up" else -300)
-                            time.sleep(1.5)
+                            actuate(pyautogui.scroll, 300 if recovery_param == "up" else -300)
+                            command_sleep(1.5)
                             
                             retry_result = self.click_on_text(parameter)
                             if retry_result:
-                                print(f"   [Check] Found after scrolling!")
+                                log_action.info("Found after scrolling!")
                                 if self.captions_enabled:
                                     self.show_caption(f"✅ Found '{parameter}' after scrolling", "assistant")
                                 return True
                         
                         elif recovery_action == "none":
-                            print(f"   [Warning] MistAI advises giving up")
+                            log_action.warning("MistAI advises giving up")
                             if self.captions_enabled:
-                                self.show_caption("❌ Couldn't complete this action", "assistant")
+                                self.show_caption("Couldn't complete this action", "error")
                             return False
                     
-                    print(f"   [X] Recovery failed")
+                    log_action.warning("Recovery failed")
                     if self.captions_enabled:
-                        self.show_caption(f"❌ Couldn't find '{parameter}'", "assistant")
+                        self.show_caption(f"Couldn't find '{parameter}'", "error")
                     return False
                 
                 else:
@@ -1638,50 +5502,49 @@ REMEMBER:
                     return result
 
             elif action_type == "open_app":
-                print(f"[Rocket] Opening app: {parameter}")
-                if self.captions_enabled:
-                    self.show_caption(f"Opening {parameter}...", "assistant")
+                log_action.info("Opening app: %s", parameter)
                 
                 running_apps = [app.lower() for app in self.get_running_apps()]
                 param_lower = parameter.lower()
 
                 if param_lower in running_apps:
-                    print(f"   App already running, focusing...")
+                    log_action.debug("App already running, focusing...")
                     if self.captions_enabled:
                         self.show_caption(f"Focusing {parameter}...", "assistant")
                     
-                    if self.focus_app_windows(parameter):
+                    if actuate(self.focus_app_windows, parameter):
                         self.track_action(f"focused {parameter}")
                         self.context["last_app_opened"] = parameter
                         
-                        time.sleep(1.0)
+                        command_sleep(1.0)
                         active = self.get_active_window().lower()
                         if param_lower in active:
-                            print(f"   [Check] VERIFIED: {parameter} is active")
+                            log_action.info("Verified: %s is active", parameter)
                             if self.captions_enabled:
                                 self.show_caption(f"✅ {parameter} is ready", "assistant")
                             
-                            time.sleep(0.3)
-                            pyautogui.hotkey("win", "up")
+                            command_sleep(0.3)
+                            actuate(pyautogui.hotkey, "win", "up")
                         return True
 
-                print(f"   Opening via Start menu...")
-                pyautogui.press("win")
-                time.sleep(0.7)
+                log_action.debug("Opening via Start menu...")
+                actuate(pyautogui.press, "win")
+                command_sleep(0.7)
                 
-                pyautogui.write(parameter, interval=0.06)
-                time.sleep(0.7)
+                if not actuate(self.text_injector.type_text, parameter, app_hint="start"):
+                    log_action.warning("Could not type app name")
+                command_sleep(0.7)
                 
-                pyautogui.press("enter")
-                time.sleep(2.8)
+                actuate(pyautogui.press, "enter")
+                command_sleep(2.8)
                 
                 active_window = self.get_active_window().lower()
                 if param_lower in active_window:
-                    print(f"   [Check] VERIFIED: {parameter} launched")
+                    log_action.info("Verified: %s launched", parameter)
                     if self.captions_enabled:
                         self.show_caption(f"✅ {parameter} opened", "assistant")
                 else:
-                    print(f"   [Warning] App might not have opened")
+                    log_action.warning("App might not have opened")
                     if self.captions_enabled:
                         self.show_caption(f"⚠️ {parameter} might not have opened", "assistant")
 
@@ -1691,18 +5554,19 @@ REMEMBER:
                 return True
 
             elif action_type == "type_search":
-                print(f"[Keyboard] Typing: {parameter}")
-                if self.captions_enabled:
-                    self.show_caption(f"Typing: {parameter}", "assistant")
-                
-                time.sleep(0.7)
-                pyautogui.write(str(parameter), interval=0.06)
+                log_action.debug("Typing: %s", parameter)
                 
+                command_sleep(0.7)
                 active_window_lower = self.get_active_window().lower()
+                app_key, _ = self.get_active_window_context()
+                if not actuate(self.text_injector.type_text, str(parameter), app_hint=app_key):
+                    log_action.warning("Typing failed")
+                    return False
+                
                 if "calculator" not in active_window_lower:
-                    time.sleep(0.3)
-                    pyautogui.press("enter")
-                    time.sleep(1.2)
+                    command_sleep(0.3)
+                    actuate(pyautogui.press, "enter")
+                    command_sleep(1.2)
                 
                 self.track_action(f"typed '{parameter}'")
                 
@@ -1713,11 +5577,9 @@ REMEMBER:
 
             elif action_type == "scroll":
                 scroll_amount = 300 if parameter == "up" else -300
-                print(f"[Cycle] Scrolling {parameter}...")
-                if self.captions_enabled:
-                    self.show_caption(f"Scrolling {parameter}...", "assistant")
+                log_action.debug("Scrolling %s...", parameter)
                 
-                pyautogui.scroll(scroll_amount)
+                actuate(pyautogui.scroll, scroll_amount)
                 self.track_action(f"scrolled {parameter}")
                 
                 if self.captions_enabled:
@@ -1725,11 +5587,9 @@ REMEMBER:
                 return True
 
             elif action_type == "volume":
-                print(f"[Speaker] Volume {parameter}...")
-                if self.captions_enabled:
-                    self.show_caption(f"Volume {parameter}", "assistant")
+                log_action.debug("Volume %s...", parameter)
                 
-                pyautogui.press(f"volume{parameter}")
+                actuate(pyautogui.press, f"volume{parameter}")
                 self.track_action(f"volume {parameter}")
                 
                 if self.captions_enabled:
@@ -1737,11 +5597,9 @@ REMEMBER:
                 return True
 
             elif action_type == "press_key":
-                print(f"[Keyboard] Pressing key: {parameter}")
-                if self.captions_enabled:
-                    self.show_caption(f"Pressing {parameter}...", "assistant")
+                log_action.debug("Pressing key: %s", parameter)
                 
-                pyautogui.press(parameter)
+                actuate(pyautogui.press, parameter)
                 self.track_action(f"pressed {parameter}")
                 
                 if self.captions_enabled:
@@ -1749,11 +5607,9 @@ REMEMBER:
                 return True
 
             elif action_type == "maximize":
-                print(f"[Square] Maximizing window...")
-                if self.captions_enabled:
-                    self.show_caption("Maximizing window...", "assistant")
+                log_action.debug("Maximizing window...")
                 
-                pyautogui.hotkey("win", "up")
+                actuate(pyautogui.hotkey, "win", "up")
                 self.track_action("maximized window")
                 
                 if self.captions_enabled:
@@ -1761,11 +5617,9 @@ REMEMBER:
                 return True
 
             elif action_type == "fullscreen":
-                print(f"[Window] Toggling fullscreen...")
-                if self.captions_enabled:
-                    self.show_caption("Toggling fullscreen...", "assistant")
+                log_action.debug("Toggling fullscreen...")
                 
-                pyautogui.press("f11")
+                actuate(pyautogui.press, "f11")
                 self.track_action("toggled fullscreen")
                 
                 if self.captions_enabled:
@@ -1774,10 +5628,12 @@ REMEMBER:
 
             return True
 
+        except CommandCancelled:
+            raise
         except Exception as e:
-            print(f"[X] Action sync error: {e}")
+            log_action.exception("Action sync error: %s", e)
             if self.captions_enabled:
-                self.show_caption(f"❌ Error: {str(e)[:50]}", "assistant")
+                self.show_caption(f"Error: {str(e)[:50]}", "error")
             return False
         
     def _get_action_caption(self, action_type, parameter):
@@ -1824,29 +5680,24 @@ OR
 
 Be smart and practical. What's the best recovery strategy?"""
 
-            response = requests.post(
-                API_URL,
-                json={"message": recovery_prompt, "model": MODEL, "mode": "recovery"},
-                timeout=10,
-            )
+            with TRACER.span("llm.request", "llm", mode="recovery", model=MODEL) as span:
+                ai_response, backend = self.model_router.complete(recovery_prompt, "recovery", MODEL, timeout=10)
+                span.set(backend=backend)
 
-            if response.ok:
-                ai_response = response.json().get("response", "")
-                try:
+            try:
+                with TRACER.span("llm.parse", "llm"):
                     json_str = ai_response
                     if "```json" in json_str:
                         json_str = json_str.split("```json")[1].split("```")[0]
                     elif "```" in json_str:
                         json_str = json_str.split("```")[1].split("```")[0]
                     command = json.loads(json_str.strip())
-                    return {"success": True, "command": command}
-                except:
-                    return {"success": False}
-            
-            return {"success": False}
+                return {"success": True, "command": command}
+            except:
+                return {"success": False}
             
         except Exception as e:
-            print(f"   [X] Recovery request error: {e}")
+            log_llm.warning("Recovery request error: %s", e)
             return {"success": False}
 
     def start_listening(self):
@@ -1855,26 +5706,29 @@ Be smart and practical. What's the best recovery strategy?"""
 
         def listen_thread():
             self.is_listening = True
-            self.recognizer = sr.Recognizer()
+            recognizer = self._recognizer = sr.Recognizer()
             try:
-                with self.microphone as source:
-                    self.recognizer.adjust_for_ambient_noise(source, duration=0.5)
-                    audio = self.recognizer.listen(
-                        source, timeout=5, phrase_time_limit=10
-                    )
-                    text = self.recognizer.recognize_google(audio)
-                    self.window.evaluate_js(f'handleVoiceResult("{text}")')
+                with self._get_microphone() as source:
+                    recognizer.adjust_for_ambient_noise(source, duration=0.5)
+                    with TRACER.span("stt.listen", "audio"):
+                        audio = recognizer.listen(
+                            source, timeout=5, phrase_time_limit=10
+                        )
+                self.prefetch_screen_context("speech")
+                with TRACER.span("stt.recognize", "stt"):
+                    text = recognizer.recognize_google(audio)
+                self.ui_events.emit("voice_result", text=text)
             except sr.WaitTimeoutError:
-                self.window.evaluate_js('handleVoiceError("No speech detected")')
+                self.ui_events.emit("voice_error", message="No speech detected")
             except sr.UnknownValueError:
-                self.window.evaluate_js('handleVoiceError("Could not understand")')
+                self.ui_events.emit("voice_error", message="Could not understand")
             except Exception as e:
-                self.window.evaluate_js(f'handleVoiceError("{str(e)}")')
+                self.ui_events.emit("voice_error", message=str(e))
             finally:
                 self.is_listening = False
-                self.window.evaluate_js("handleVoiceEnd()")
+                self.ui_events.emit("voice_end")
 
-        threading.Thread(target=listen_thread, daemon=True).start()
+        self.command_loop.run_in_background(listen_thread)
         return {"success": True}
 
 HTML_CONTENT = """
@@ -2143,10 +5997,9 @@ HTML_CONTENT = """
             await pywebview.api.set_user_gender(savedGender);
         }
         
-        checkStatus();
-        updateMemoryBadge();
-        setInterval(checkStatus, 30000);
-        setInterval(updateMemoryBadge, 5000);
+        // One read of the current state; later changes are pushed as events
+        applyStatus(await pywebview.api.check_api_status());
+        applyMemoryBadge(await pywebview.api.get_memory_stats());
     }
 
     sendBtn.addEventListener('click', handleSend);
@@ -2208,34 +6061,21 @@ HTML_CONTENT = """
         addMessage(captionsEnabled ? '📺 Captions enabled (bot/system only)' : '📺 Captions disabled', 'system');
     });
 
-    async function checkStatus() {
-        if (!pywebviewReady || !window.pywebview) return;
-        try {
-            const result = await pywebview.api.check_api_status();
-            statusDot.className = `status-dot ${result.online ? 'online' : ''}`;
-            statusText.textContent = result.online ? 'Connected' : 'Offline';
-            if (!wakeWordActive) {
-                aiOrb.classList.toggle('active', result.online);
-            }
-        } catch (error) { 
-            console.error('Status check error:', error);
-            statusDot.className = 'status-dot';
-            statusText.textContent = 'Error';
+    function applyStatus(status) {
+        statusDot.className = `status-dot ${status.online ? 'online' : ''}`;
+        statusText.textContent = status.online ? 'Connected' : 'Offline';
+        statusText.title = status.reason || '';
+        if (!wakeWordActive) {
+            aiOrb.classList.toggle('active', status.online);
         }
     }
 
-    async function updateMemoryBadge() {
-        if (!pywebviewReady || !window.pywebview) return;
-        try {
-            const stats = await pywebview.api.get_memory_stats();
-            let badges = `🧠 ${stats.conversation_length} | ${stats.actions_performed} acts`;
-            if (stats.wake_word_active) badges += ' | 🎤';
-            if (stats.proactive_mode) badges += ' | 👁️';
-            if (stats.captions_enabled) badges += ' | 📺';
-            memoryBadge.textContent = badges;
-        } catch (e) {
-            console.error('Memory badge error:', e);
-        }
+    function applyMemoryBadge(stats) {
+        let badges = `🧠 ${stats.conversation_length} | ${stats.actions_performed} acts`;
+        if (stats.wake_word_active) badges += ' | 🎤';
+        if (stats.proactive_mode) badges += ' | 👁️';
+        if (stats.captions_enabled) badges += ' | 📺';
+        memoryBadge.textContent = badges;
     }
 
     async function handleSend() {
@@ -2281,7 +6121,6 @@ HTML_CONTENT = """
             } else {
                 addMessage(`Error: ${result.error || 'Unknown error'}`, 'system');
             }
-            updateMemoryBadge();
         } catch (e) {
             console.error('[X] Error in handleSend:', e);
             addMessage(`Error: ${e}`, 'system');
@@ -2292,17 +6131,50 @@ HTML_CONTENT = """
         }
     }
     
-    function handleWakeWordDetected() {
-        addMessage('🎤 Wake word detected', 'wake-word');
-    }
-    
-    function handleWakeCommand(command, response) {
-        addMessage(command, 'user');
-        if (response) addMessage(response, 'assistant');
-    }
-    
-    function handleProactiveSuggestion(suggestion) {
-        addMessage('💡 ' + suggestion, 'suggestion');
+    // Events pushed from Python (UIEventChannel), applied once per frame
+    const uiHandlers = {
+        wake_word: () => addMessage('🎤 Wake word detected', 'wake-word'),
+        wake_command: (e) => {
+            addMessage(e.command, 'user');
+            if (e.response) addMessage(e.response, 'assistant');
+        },
+        suggestion: (e) => addMessage('💡 ' + e.text, 'suggestion'),
+        voice_result: (e) => {
+            input.value = e.text;
+            input.focus();
+        },
+        voice_error: (e) => addMessage('🎤 ' + e.message, 'system'),
+        voice_end: () => {},
+        status: applyStatus,
+        memory: applyMemoryBadge,
+    };
+    let uiQueue = [], uiFlushScheduled = false;
+
+    window.__mistaiDispatch = function(events) {
+        uiQueue.push(...events);
+        if (uiFlushScheduled) return;
+        uiFlushScheduled = true;
+        // rAF does not fire while the window is minimized
+        if (document.hidden) setTimeout(drainUiEvents, 50);
+        else requestAnimationFrame(drainUiEvents);
+    };
+
+    function drainUiEvents() {
+        uiFlushScheduled = false;
+        const events = uiQueue;
+        uiQueue = [];
+        for (const e of events) {
+            const handler = uiHandlers[e.type];
+            if (!handler) {
+                console.warn('Unknown UI event:', e.type);
+                continue;
+            }
+            try {
+                handler(e);
+            } catch (err) {
+                console.error('UI event error:', e.type, err);
+            }
+        }
     }
 
     function addMessage(text, type) {
@@ -2319,28 +6191,47 @@ HTML_CONTENT = """
 </html>
 """
 
+STARTUP.record("module load", STARTUP.origin, time.perf_counter() - STARTUP.origin)
+
+
 def main():
     """Main entry point for the assistant"""
-    # Show splash screen first (only if display available)
-    if os.name == 'nt' or os.environ.get('DISPLAY'):
-        print("[Splash] Showing splash screen...")
-        show_splash_screen()
-    
-    print(f"\n[Rocket] Starting MistAI v{VERSION}...")
-    
-    api = Api()
-
-    window = webview.create_window(
-        f"MistAI Desktop Assistant v{VERSION}",
-        html=HTML_CONTENT,
-        js_api=api,
-        width=800,
-        height=700,
-        resizable=True,
+    setup_logging()
+    log.info("Starting MistAI v%s...", VERSION)
+
+    with STARTUP.phase("api init"):
+        api = Api()
+
+    # Initialization overlaps the splash instead of following it
+    progress = Queue()
+    warm_thread = threading.Thread(
+        target=api.warm_up_subsystems, args=(progress.put,), name="mistai-startup", daemon=True
     )
+    warm_thread.start()
+
+    # Show splash while starting up (only if display available)
+    if os.name == 'nt' or os.environ.get('DISPLAY'):
+        log.info("Showing splash screen...")
+        with STARTUP.phase("splash"):
+            show_splash_screen(api.core_ready, progress)
+
+    with STARTUP.phase("window create"):
+        window = webview.create_window(
+            f"MistAI Desktop Assistant v{VERSION}",
+            html=HTML_CONTENT,
+            js_api=api,
+            width=800,
+            height=700,
+            resizable=True,
+        )
     api.window = window
+    api.ui_events.attach(window)
 
     webview.start(debug=False, gui="edgechromium")
+    api.ui_events.close()
+    api.health.close()
+    api.command_loop.shutdown()
+    shutdown_logging()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
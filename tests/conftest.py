@@ -0,0 +1,7 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# assistant.py lives at the repo root; the synthetic scenes in tools/vision_bench.py
+sys.path[:0] = [ROOT, os.path.join(ROOT, "tools")]
@@ -0,0 +1,17 @@
+"""Click accuracy on synthetic UIs: every hit lands inside its target box"""
+
+import pytest
+
+from vision_bench import CLICK_PASSES, CLICK_SCENARIOS, run_click_scenario
+
+
+@pytest.mark.parametrize(
+    "dark_theme, font_scale, factor", [s[1:] for s in CLICK_SCENARIOS], ids=[s[0] for s in CLICK_SCENARIOS]
+)
+def test_click_scenario(tmp_path, dark_theme, font_scale, factor):
+    """Cold clicks, warm-cache clicks and find_text_on_screen all hit every target"""
+    passes = run_click_scenario(dark_theme, font_scale, factor, use_tesseract=False, workdir=str(tmp_path))
+    for mode, stats in zip(CLICK_PASSES, passes):
+        assert not stats["lost"], f"{mode}: not found {stats['lost']}"
+        assert not stats["misses"], f"{mode}: clicked outside {stats['misses']}"
+        assert stats["hits"] == stats["targets"], mode
@@ -0,0 +1,138 @@
+"""Capture-to-click coordinates on synthetic screens at every display scale"""
+
+import numpy as np
+import pytest
+
+import assistant
+from vision_bench import DISPLAY_SCALES, inside, render_at_scale, render_chat_scene, render_toolbar_scene
+
+
+@pytest.mark.parametrize("origin", [(0, 0), (1920, 0), (-1280, -200)])
+@pytest.mark.parametrize("factor", DISPLAY_SCALES)
+def test_transform_round_trips(factor, origin):
+    """Boxes survive crop/resize/scale chains to within a screen unit"""
+    rng = np.random.default_rng(7)
+    base = assistant.CoordTransform(1 / factor, 1 / factor, origin[0] / factor, origin[1] / factor)
+    chains = {
+        "frame": base,
+        "crop": base.crop(137, 91),
+        "crop+upscale": base.crop(137, 91).resize(assistant.OCR_UPSCALE),
+        "upscale+crop": base.resize(3).crop(40, 12),
+    }
+    for name, transform in chains.items():
+        # Screen coordinates are whole units, each 1/sx image pixels wide
+        tolerance = np.ceil(1 / transform.sx)
+        for box in rng.integers(0, 900, size=(20, 4)).tolist():
+            box[2], box[3] = box[2] % 300 + 8, box[3] % 80 + 8
+            back = transform.inverse_box(*transform.box(*box))
+            assert max(abs(a - b) for a, b in zip(back, box)) <= tolerance, (name, box, back)
+
+
+MONITORS = [(0, 0, 2560, 1440), (-1920, 180, 1920, 1080), (2560, 0, 3840, 2160)]
+LAYOUTS = [[factor] * len(MONITORS) for factor in DISPLAY_SCALES] + [[1.5, 1.0, 2.0], [1.0, 1.25, 1.75]]
+
+
+@pytest.mark.parametrize("factors", LAYOUTS, ids=lambda f: "/".join(map(str, f)))
+def test_monitor_mapping(factors):
+    """Screen points resolve to the right monitor and back, uniform and mixed scales"""
+    capture = assistant.ScreenCapture(backend="synthetic")
+    capture._monitors = list(MONITORS)
+    capture._scale = 1 / factors[0]
+    if len(set(factors)) > 1:
+        capture._screen_rects = capture._stack_rects(MONITORS, [1 / f for f in factors])
+    for index, region in enumerate(MONITORS):
+        transform = capture.transform(region)
+        assert transform.sx == pytest.approx(1 / factors[index], abs=1e-3)
+        point = transform.point(region[2] // 2, region[3] // 2)
+        assert capture.monitor_at(*point) == index
+        screen_rect = transform.point(0, 0) + transform.point(region[2], region[3])
+        assert capture.region_for_screen_rect(*screen_rect) == region
+
+
+@pytest.mark.parametrize("override, scale, stacked", [("1.5", 1 / 1.5, False), ("1.5,1.0,2.0", 1 / 1.5, True)])
+def test_display_scale_override(monkeypatch, override, scale, stacked):
+    """MISTAI_DISPLAY_SCALE takes one factor or one per monitor, primary first"""
+    monkeypatch.setenv("MISTAI_DISPLAY_SCALE", override)
+    capture = assistant.ScreenCapture(backend="synthetic")
+    capture._monitors = list(MONITORS)
+    assert capture.scale() == pytest.approx(scale)
+    geometry = capture.geometry()
+    # Stacked monitor rects are whole screen units
+    assert geometry[0][1] == pytest.approx(scale, abs=1e-3)
+    assert (geometry[2][1] == pytest.approx(0.5, abs=1e-3)) is stacked
+
+
+def test_display_scale_override_mismatch(monkeypatch):
+    """A per-monitor override for a different monitor count falls back to the primary's factor"""
+    monkeypatch.setenv("MISTAI_DISPLAY_SCALE", "1.5,1.0")
+    capture = assistant.ScreenCapture(backend="synthetic")
+    capture._monitors = list(MONITORS)
+    assert [entry[1] for entry in capture.geometry()] == pytest.approx([1 / 1.5] * len(MONITORS))
+
+
+# Borderless labels have no button contour; find_text_on_screen's OCR pass covers them
+TEXT_ONLY_STYLES = {"icon"}
+
+
+class BoxOracleOCR:
+    """Stand-in for pytesseract that names button candidates by position
+
+    image_to_string() answers, in the order find_buttons_on_screen OCRs
+    them, with the label of the rendered button holding the candidate's
+    center (targets in capture pixels), or "" for anything else.
+    """
+
+    def __init__(self, targets):
+        self.targets = targets
+        self.pending = []
+
+    def candidates(self, rects):
+        self.pending = rects.tolist()
+
+    def image_to_string(self, image, config=""):
+        if not self.pending:
+            return ""
+        x, y, w, h = self.pending.pop(0)
+        for label, box in self.targets:
+            if inside((x + w // 2, y + h // 2), box):
+                return label
+        return ""
+
+
+@pytest.mark.parametrize("factor", DISPLAY_SCALES)
+@pytest.mark.parametrize("dark_theme", [False, True], ids=["light", "dark"])
+@pytest.mark.parametrize("render", [render_toolbar_scene, render_chat_scene], ids=["toolbar", "chat"])
+def test_button_clicks(monkeypatch, render, dark_theme, factor):
+    """find_buttons_on_screen on a scaled capture clicks inside every outlined button
+
+    Text-only buttons (TEXT_ONLY_STYLES) may be missed, but every button
+    returned must land inside a target with its label.
+    """
+    frame, boxes = render_at_scale(render, factor, dark_theme)
+    # Where the renderer put each target in the frame, independent of any transform
+    oracle = BoxOracleOCR([(label, tuple(int(round(v * factor)) for v in box)) for label, box, _ in boxes])
+    real_candidates = assistant.button_candidate_rects
+
+    def spy_candidates(gray, *args, **kwargs):
+        contours, rects = real_candidates(gray, *args, **kwargs)
+        oracle.candidates(rects)
+        return contours, rects
+
+    monkeypatch.setattr(assistant, "pytesseract", oracle)
+    monkeypatch.setattr(assistant, "button_candidate_rects", spy_candidates)
+    monkeypatch.setattr(assistant, "ocr_available", lambda: True)
+
+    capture = assistant.ScreenCapture(backend="synthetic")
+    capture._monitors = [(0, 0, frame.shape[1], frame.shape[0])]
+    capture._scale = 1 / factor
+    vision = assistant.ScreenVision(capture)
+    buttons = vision.find_buttons_on_screen(frame.copy(), capture.transform(capture.primary_region()))
+
+    clicks = [((x + w // 2, y + h // 2), text) for x, y, w, h, text in buttons]
+    for point, text in clicks:
+        assert any(label == text and inside(point, box) for label, box, _ in boxes), (text, point)
+    for label, target, style in boxes:
+        if style in TEXT_ONLY_STYLES:
+            continue
+        named = [point for point, text in clicks if text == label]
+        assert any(inside(point, target) for point in named), (label, target, named)
@@ -0,0 +1,449 @@
+"""
+MistAI vision benchmarks
+
+Developer tool for measuring the vision hot path without a live desktop.
+Renders synthetic screens (or loads a screenshot) and reports how much
+work each stage does. The scenes and fakes here are shared with the tests
+in tests/, which assert coordinate and click accuracy on them.
+
+Usage:
+    python tools/vision_bench.py buttons
+    python tools/vision_bench.py buttons --image screenshot.png --ocr
+    python tools/vision_bench.py clicks
+    python tools/vision_bench.py clicks --tesseract
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+
+import assistant
+
+
+# ==========================================
+# SYNTHETIC SCENES
+# ==========================================
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+LABELS = ["Send", "Cancel", "Open File", "Save", "Settings", "Log in", "Sign up", "Next", "Reply", "Share"]
+
+
+def draw_button(img, x, y, label, style, scale=0.7, dark_theme=False):
+    """Draw one button and return its (x, y, w, h)"""
+    (tw, th), _ = cv2.getTextSize(label, FONT, scale, 2)
+    w, h = tw + 40, th + 24
+    fg, bg = (235, 30) if dark_theme else (20, 245)
+
+    if style == "filled":
+        cv2.rectangle(img, (x, y), (x + w, y + h), 60 if not dark_theme else 200, -1)
+        cv2.putText(img, label, (x + 20, y + h - 12), FONT, scale, 255 - (60 if not dark_theme else 200), 2)
+    elif style == "outline":
+        cv2.rectangle(img, (x, y), (x + w, y + h), 150, 1)
+        cv2.putText(img, label, (x + 20, y + h - 12), FONT, scale, fg, 2)
+    elif style == "icon":
+        cv2.circle(img, (x + 12, y + h // 2), 9, fg, 2)
+        cv2.putText(img, label, (x + 34, y + h - 12), FONT, scale, fg, 2)
+    elif style == "focused":
+        cv2.rectangle(img, (x, y), (x + w, y + h), 60, -1)
+        cv2.rectangle(img, (x - 6, y - 6), (x + w + 6, y + h + 6), 120, 1)
+        cv2.putText(img, label, (x + 20, y + h - 12), FONT, scale, 255, 2)
+    return (x, y, w, h)
+
+
+def render_toolbar_scene(width=1920, height=1080, dark_theme=False):
+    """Rows of buttons in every style; boxes are (label, box, style)"""
+    img = np.full((height, width), 30 if dark_theme else 245, np.uint8)
+    boxes = []
+    styles = ["filled", "outline", "icon", "focused"]
+    for row in range(8):
+        x = 60
+        for col in range(8):
+            label = LABELS[(row + col) % len(LABELS)]
+            style = styles[(row + col) % 4]
+            box = draw_button(img, x, 140 + row * 110, label, style, dark_theme=dark_theme)
+            boxes.append((label, box, style))
+            x += box[2] + 60
+    return img, boxes
+
+
+def render_chat_scene(width=1920, height=1080, dark_theme=False):
+    """Chat list with avatars joined to message bubbles and nested timestamps
+
+    The joined avatar + bubble contours are L-shaped, so their bounding
+    rects swallow the timestamp and reaction labels next to them - the
+    overlapping candidates the old filter OCRed several times.
+    """
+    fg = 235 if dark_theme else 20
+    img = np.full((height, width), 30 if dark_theme else 245, np.uint8)
+    boxes = []
+    for i in range(9):
+        y = 120 + i * 105
+        # Avatar joined to its bubble: one L-shaped contour
+        cv2.circle(img, (80, y + 20), 18, fg, 2)
+        cv2.line(img, (98, y + 20), (170, y + 20), fg, 2)
+        cv2.rectangle(img, (170, y + 10), (560, y + 70), fg, 2)
+        cv2.putText(img, "message text", (190, y + 50), FONT, 0.7, fg, 2)
+        # Author label under the avatar, inside the L-shape's bounding rect
+        cv2.putText(img, "Alexandra", (62, y + 66), FONT, 0.7, fg, 2)
+        label = LABELS[i % len(LABELS)]
+        boxes.append((label, draw_button(img, 760, y + 10, label, "outline", dark_theme=dark_theme), "outline"))
+    return img, boxes
+
+
+CLICK_LABELS = [
+    "Send", "Cancel", "Open File", "Save", "Settings", "Log in", "Sign up", "Next",
+    "Reply", "Share", "Download", "Upload", "Delete", "Archive", "Refresh", "Help",
+]
+MENU_LABELS = ["File", "Edit", "View", "Window"]
+
+
+def text_words(label, x, baseline, scale):
+    """[(word, (x, y, w, h))] for text drawn by cv2.putText at (x, baseline)"""
+    words = []
+    for i, word in enumerate(label.split()):
+        prefix = " ".join(label.split()[:i]) + (" " if i else "")
+        offset = cv2.getTextSize(prefix, FONT, scale, 2)[0][0] if prefix else 0
+        (w, h), base = cv2.getTextSize(word, FONT, scale, 2)
+        words.append((word, (x + offset, baseline - h, w, h + base)))
+    return words
+
+
+def render_click_scene(width=1536, height=1024, dark_theme=False, font_scale=0.7):
+    """Unique click targets: a text menu bar plus a grid of buttons in every style
+
+    Returns (image, targets) where each target is {"label", "box", "words"}
+    in image pixels, words being what a perfect OCR would report.
+    """
+    fg = 235 if dark_theme else 20
+    img = np.full((height, width), 30 if dark_theme else 245, np.uint8)
+    targets = []
+    x = 40
+    for label in MENU_LABELS:
+        words = text_words(label, x, 120, font_scale)
+        cv2.putText(img, label, (x, 120), FONT, font_scale, fg, 2)
+        wx, wy, ww, wh = words[0][1]
+        targets.append({"label": label, "box": (wx - 4, wy - 4, ww + 8, wh + 8), "words": words})
+        x += ww + 40
+
+    styles = ["filled", "outline", "icon", "focused"]
+    row_height = int(110 * font_scale / 0.7)
+    for i, label in enumerate(CLICK_LABELS):
+        style = styles[i % 4]
+        bx = 60 + (i % 4) * int(width / 4.5)
+        by = 200 + (i // 4) * row_height
+        box = draw_button(img, bx, by, label, style, scale=font_scale, dark_theme=dark_theme)
+        text_x = bx + (34 if style == "icon" else 20)
+        targets.append({"label": label, "box": box, "words": text_words(label, text_x, by + box[3] - 12, font_scale)})
+    return img, targets
+
+
+SCENES = {
+    "toolbar-light": lambda: render_toolbar_scene(),
+    "toolbar-dark": lambda: render_toolbar_scene(dark_theme=True),
+    "chat-light": lambda: render_chat_scene(),
+    "chat-dark": lambda: render_chat_scene(dark_theme=True),
+}
+
+
+# ==========================================
+# BENCHMARKS
+# ==========================================
+def ocr_candidates(gray, rects):
+    """Run the same per-candidate OCR as find_buttons_on_screen"""
+    import pytesseract
+
+    for x, y, w, h in rects.tolist():
+        region = cv2.resize(gray[y:y + h, x:x + w], None, fx=3, fy=3, interpolation=cv2.INTER_CUBIC)
+        pytesseract.image_to_string(region, config="--oem 3 --psm 7")
+
+
+def bench_buttons(args):
+    if args.image:
+        image = cv2.imread(args.image, cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            print(f"Could not read {args.image}")
+            return 1
+        scenes = {os.path.basename(args.image): image}
+    else:
+        scenes = {name: render()[0] for name, render in SCENES.items()}
+
+    print(f"{'scene':<24}{'contours':>10}{'old OCR':>10}{'new OCR':>10}{'removed':>10}{'filter ms':>11}")
+    total_old = total_new = 0
+    for name, gray in scenes.items():
+        contours, old_rects = assistant.button_candidate_rects(gray, merge=False)
+        start = time.perf_counter()
+        _, new_rects = assistant.button_candidate_rects(gray)
+        filter_ms = (time.perf_counter() - start) * 1000
+
+        total_old += len(old_rects)
+        total_new += len(new_rects)
+        print(
+            f"{name:<24}{contours:>10}{len(old_rects):>10}{len(new_rects):>10}"
+            f"{len(old_rects) - len(new_rects):>10}{filter_ms:>11.1f}"
+        )
+
+        if args.ocr:
+            for label, rects in (("old", old_rects), ("new", new_rects)):
+                start = time.perf_counter()
+                ocr_candidates(gray, rects)
+                print(f"   {label} OCR pass: {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    if total_old:
+        saved = total_old - total_new
+        print(f"\nOCR calls: {total_old} -> {total_new} ({saved} removed, {saved / total_old:.0%})")
+    return 0
+
+
+DISPLAY_SCALES = (1.0, 1.25, 1.5, 1.75, 2.0)
+
+
+def render_at_scale(render, factor, dark_theme=False):
+    """Render a scene in screen units, then as the capture sees it at factor
+
+    Returns (capture frame, the scene's boxes in screen units).
+    """
+    img, boxes = render(width=1536, height=1024, dark_theme=dark_theme)
+    if factor == 1.0:
+        return img, boxes
+    size = (int(round(img.shape[1] * factor)), int(round(img.shape[0] * factor)))
+    return cv2.resize(img, size, interpolation=cv2.INTER_LINEAR), boxes
+
+
+def inside(point, box):
+    x, y, w, h = box
+    return x <= point[0] < x + w and y <= point[1] < y + h
+
+
+class SyntheticCapture(assistant.ScreenCapture):
+    """ScreenCapture serving crops of a rendered frame as one monitor
+
+    After react() the next grab shows a toast in the bottom-right corner,
+    standing in for the app responding to a click.
+    """
+
+    def __init__(self, frame, factor):
+        super().__init__(backend="synthetic")
+        self.frame = frame
+        self._monitors = [(0, 0, frame.shape[1], frame.shape[0])]
+        self._scale = 1 / factor
+        self._reacting = False
+
+    def react(self):
+        self._reacting = True
+
+    def _grab(self, region, slot, gray):
+        left, top, width, height = region or self.primary_region()
+        frame = self.frame
+        if self._reacting:
+            self._reacting = False
+            frame = frame.copy()
+            frame[-80:, -200:] = 255 - frame[-80:, -200:]
+        crop = frame[top:top + height, left:left + width]
+        if gray:
+            out = self._buffer(slot, crop.shape)
+            out[:] = crop
+        else:
+            out = self._buffer(slot, crop.shape + (3,))
+            cv2.cvtColor(crop, cv2.COLOR_GRAY2BGR, dst=out)
+        return out
+
+
+class FakePyAutoGUI:
+    """Records clicks; the screen is width x height screen units"""
+
+    def __init__(self, width, height, on_click=None):
+        self.width, self.height = width, height
+        self.cursor = (0, 0)
+        self.clicks = []
+        self.on_click = on_click
+
+    def size(self):
+        return (self.width, self.height)
+
+    def position(self):
+        return self.cursor
+
+    def moveTo(self, x, y, duration=0):
+        self.cursor = (x, y)
+
+    def click(self, *args, **kwargs):
+        self.clicks.append(self.cursor)
+        if self.on_click:
+            self.on_click()
+
+
+class OracleOCR:
+    """Stand-in for pytesseract that reads the scene's ground truth
+
+    image_to_data() reports every word of the scene, scaled to whatever
+    resize of the frame it was given. image_to_string() answers for the
+    button candidates in the order find_buttons_on_screen OCRs them (the
+    candidate list is captured by wrapping button_candidate_rects), with
+    the label whose text sits inside the candidate. It reads perfectly, so
+    any miss is a geometry bug rather than an OCR one.
+    """
+
+    Output = types.SimpleNamespace(DICT="dict")
+
+    def __init__(self, targets, factor, frame_shape):
+        # Ground truth in capture pixels
+        self.words = [
+            (line, word, tuple(int(round(v * factor)) for v in box))
+            for line, t in enumerate(targets, 1)
+            for word, box in t["words"]
+        ]
+        self.labels = [(t["label"], [tuple(int(round(v * factor)) for v in b) for _, b in t["words"]]) for t in targets]
+        self.frame_shape = frame_shape
+        self.pending = []
+        self.calls = {"image_to_data": 0, "image_to_string": 0}
+
+    def candidates(self, rects):
+        self.pending = rects.tolist()
+
+    def image_to_data(self, image, config="", output_type=None):
+        self.calls["image_to_data"] += 1
+        sx = image.shape[1] / float(self.frame_shape[1])
+        sy = image.shape[0] / float(self.frame_shape[0])
+        data = {k: [] for k in ("text", "conf", "left", "top", "width", "height", "block_num", "par_num", "line_num")}
+        # Words of one label share a line, as Tesseract would report them
+        for line, word, (x, y, w, h) in self.words:
+            for key, value in zip(
+                ("text", "conf", "left", "top", "width", "height", "block_num", "par_num", "line_num"),
+                (word, 95, int(x * sx), int(y * sy), int(w * sx), int(h * sy), line, 1, 1),
+            ):
+                data[key].append(value)
+        return data
+
+    def image_to_string(self, image, config=""):
+        self.calls["image_to_string"] += 1
+        if not self.pending:
+            return ""
+        rx, ry, rw, rh = self.pending.pop(0)
+        for label, boxes in self.labels:
+            if all(rx <= x and ry <= y and x + w <= rx + rw and y + h <= ry + rh for x, y, w, h in boxes):
+                return label
+        return ""
+
+
+CLICK_SCENARIOS = [
+    (f"{theme}-font{font}-x{factor}", theme == "dark", font, factor)
+    for theme in ("light", "dark")
+    for font in (0.6, 0.9)
+    for factor in (1.0, 1.5)
+]
+
+
+CLICK_PASSES = ("cold", "warm", "find")
+
+
+def run_click_scenario(dark_theme, font_scale, factor, use_tesseract, workdir):
+    """Click every target twice (cold, then with warm caches), then look each
+    one up with find_text_on_screen alone; returns per-pass stats"""
+    screen, targets = render_click_scene(dark_theme=dark_theme, font_scale=font_scale)
+    frame, _ = render_at_scale(lambda **kw: (screen, targets), factor)
+
+    vision = assistant.ScreenVision(SyntheticCapture(frame, factor))
+    vision._click_cache = assistant.ClickTargetCache(cache_dir=os.path.join(workdir, "click_cache"))
+    vision._template_library = assistant.TemplateLibrary(library_dir=os.path.join(workdir, "templates"))
+    gui = FakePyAutoGUI(screen.shape[1], screen.shape[0], on_click=vision.screen_capture.react)
+
+    saved = {name: getattr(assistant, name) for name in ("pyautogui", "pytesseract", "button_candidate_rects", "command_sleep", "ocr_available")}
+    ocr = None if use_tesseract else OracleOCR(targets, factor, frame.shape)
+    real_candidates = assistant.button_candidate_rects
+
+    def spy_candidates(gray, *args, **kwargs):
+        contours, rects = real_candidates(gray, *args, **kwargs)
+        if ocr:
+            ocr.candidates(rects)
+        return contours, rects
+
+    assistant.pyautogui = gui
+    assistant.command_sleep = lambda seconds: None
+    assistant.button_candidate_rects = spy_candidates
+    if ocr:
+        assistant.pytesseract = ocr
+        assistant.ocr_available = lambda: True
+
+    passes = []
+    try:
+        for mode in CLICK_PASSES:
+            stats = {"targets": len(targets), "hits": 0, "misses": [], "lost": [], "ms": [], "ocr_calls": 0}
+            for target in targets:
+                calls_before = sum(ocr.calls.values()) if ocr else 0
+                clicks_before = len(gui.clicks)
+                start = time.perf_counter()
+                if mode == "find":
+                    box = vision.find_text_on_screen(target["label"], save_debug=False)
+                    point = (box[0] + box[2] // 2, box[1] + box[3] // 2) if box else None
+                else:
+                    clicked = vision.click_on_text(target["label"])
+                    point = gui.clicks[-1] if clicked and len(gui.clicks) > clicks_before else None
+                stats["ms"].append((time.perf_counter() - start) * 1000)
+                if ocr:
+                    stats["ocr_calls"] += sum(ocr.calls.values()) - calls_before
+                if point is None:
+                    stats["lost"].append(target["label"])
+                elif inside(point, target["box"]):
+                    stats["hits"] += 1
+                else:
+                    stats["misses"].append((target["label"], point, target["box"]))
+            passes.append(stats)
+    finally:
+        for name, value in saved.items():
+            setattr(assistant, name, value)
+    return passes
+
+
+def bench_clicks(args):
+    if args.tesseract and not assistant.ocr_available():
+        print("Tesseract is not available")
+        return 1
+    scenarios = [s for s in CLICK_SCENARIOS if not args.scenario or args.scenario in s[0]]
+    print(f"{'scenario':<24}{'pass':>6}{'hits':>7}{'miss':>6}{'lost':>6}{'p50 ms':>9}{'max ms':>9}{'OCR/target':>12}")
+    failures = 0
+    for name, dark_theme, font_scale, factor in scenarios:
+        with tempfile.TemporaryDirectory(prefix="mistai_clicks_") as workdir:
+            passes = run_click_scenario(dark_theme, font_scale, factor, args.tesseract, workdir)
+        for label, stats in zip(CLICK_PASSES, passes):
+            ms = sorted(stats["ms"])
+            ocr_per_target = "-" if args.tesseract else f"{stats['ocr_calls'] / stats['targets']:.1f}"
+            print(
+                f"{name:<24}{label:>6}{stats['hits']:>4}/{stats['targets']:<2}{len(stats['misses']):>6}"
+                f"{len(stats['lost']):>6}{ms[len(ms) // 2]:>9.1f}{ms[-1]:>9.1f}{ocr_per_target:>12}"
+            )
+            for target_label, point, box in stats["misses"]:
+                print(f"   miss '{target_label}': clicked {point}, target {box}")
+            for target_label in stats["lost"]:
+                print(f"   lost '{target_label}': not found")
+            failures += len(stats["misses"]) + len(stats["lost"])
+    print(f"\n{'All clicks landed on target' if not failures else f'{failures} click check(s) failed'}")
+    return 1 if failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MistAI vision benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    buttons = sub.add_parser("buttons", help="button candidate filtering and OCR call counts")
+    buttons.add_argument("--image", help="benchmark a screenshot instead of synthetic scenes")
+    buttons.add_argument("--ocr", action="store_true", help="also time the OCR pass (needs Tesseract)")
+    buttons.set_defaults(func=bench_buttons)
+
+    clicks = sub.add_parser("clicks", help="click accuracy, latency and OCR calls on synthetic UIs")
+    clicks.add_argument("--scenario", help="only run scenarios whose name contains this")
+    clicks.add_argument("--tesseract", action="store_true", help="use real Tesseract instead of the ground-truth OCR")
+    clicks.set_defaults(func=bench_clicks)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())